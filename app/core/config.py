@@ -2,11 +2,15 @@
 Configuration and database setup for RepEditor Python backend
 """
 import os
-from typing import Optional
+import time
+from typing import Optional, Dict, Any, Tuple, Type
 from pydantic_settings import BaseSettings
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool
 
 
 class Settings(BaseSettings):
@@ -14,6 +18,13 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    # Test each connection on checkout (one round trip): serverless Postgres/proxies drop idle
+    # connections on their own schedule, which pool_recycle alone can't track. Set false to skip.
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
     
     # API Keys
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
@@ -69,6 +80,7 @@ class Settings(BaseSettings):
     
     TRIAD_FAIL_ON_INVALID: bool = os.getenv("TRIAD_FAIL_ON_INVALID", "true").lower() == "true"
     TRIAD_INVARIANT_WORD_CAPS: bool = os.getenv("TRIAD_INVARIANT_WORD_CAPS", "true").lower() == "true"
+    TRIAD_EXECUTION_MODE: str = os.getenv("TRIAD_EXECUTION_MODE", "serial")  # serial | speculative
     
     # Environment
     NODE_ENV: str = os.getenv("NODE_ENV", "development")
@@ -95,15 +107,103 @@ settings = Settings()
 
 
 # Database engine setup
+class PoolStats:
+    """Checkout wait and utilization for one engine's connection pool"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+    
+    def record(self, wait_ms: float):
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+    
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        checked_out = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        return {
+            "pool": pool.status(),
+            "checked_out": checked_out,
+            "capacity": capacity,
+            "utilization": checked_out / capacity if capacity else 0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": self.wait_ms_total / self.checkouts if self.checkouts else 0,
+            "max_wait_ms": self.wait_ms_max
+        }
+
+
+def instrumented_pool(base: Type[Pool], stats: PoolStats) -> Type[Pool]:
+    """Pool class that times every checkout (including waits for a free connection)"""
+    
+    class InstrumentedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                stats.timeouts += 1
+                raise
+            finally:
+                stats.record((time.perf_counter() - start) * 1000)
+    
+    return InstrumentedPool
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Drop connections before the server/proxy idles them out
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _async_database_url(url: str) -> Tuple[Optional[URL], Dict[str, Any]]:
+    """asyncpg URL for a Postgres DATABASE_URL (libpq-only query params moved/dropped)"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return None, {}
+    query = dict(parsed.query)
+    connect_args: Dict[str, Any] = {}
+    sslmode = query.pop("sslmode", None)
+    if sslmode:
+        connect_args["ssl"] = sslmode
+    query.pop("channel_binding", None)
+    return parsed.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+sync_pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
 engine = create_engine(
     settings.DATABASE_URL,
-    poolclass=NullPool,  # Replit-friendly: no persistent connections
+    poolclass=instrumented_pool(QueuePool, sync_pool_stats),
     echo=False,  # Set to True for SQL query logging
-    pool_pre_ping=True,  # Verify connections before using
+    **_pool_kwargs()
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# asyncpg-backed engine for async routes (Postgres only)
+_async_url, _async_connect_args = _async_database_url(settings.DATABASE_URL)
+async_engine: Optional[AsyncEngine] = create_async_engine(
+    _async_url,
+    poolclass=instrumented_pool(AsyncAdaptedQueuePool, async_pool_stats),
+    connect_args=_async_connect_args,
+    echo=False,
+    **_pool_kwargs()
+) if _async_url is not None else None
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+) if async_engine is not None else None
+
 
 def get_db():
     """FastAPI dependency for database sessions"""
@@ -112,3 +212,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency for async (asyncpg) database sessions"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database sessions require a PostgreSQL DATABASE_URL")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Checkout wait / utilization metrics for both engines"""
+    stats = {"sync": sync_pool_stats.snapshot(engine.pool)}
+    if async_engine is not None:
+        stats["async"] = async_pool_stats.snapshot(async_engine.sync_engine.pool)
+    return stats
@@ -17,9 +17,14 @@ from fastapi.staticfiles import StaticFiles
 import uvicorn
 
 # --- Config imports (tolerant to missing attrs) ---
-from app.core.config import settings, engine
+from app.core.config import settings, engine, async_engine
 from app.models.database import Base  # noqa: F401
 from app.routes import chat, files, health, config, auth, repos, ai, ssh
+from app.services.llm_clients import llm_clients
+from app.services.session_cache import session_cache
+from app.services.code_search import code_search
+from app.services.symbol_index import symbol_index
+from app.services.process_runner import bind_loop
 
 # -------------------------------------------------------------------
 # Helpers
@@ -58,11 +63,32 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"[db] ⚠️ Database connection check failed: {e}")
 
+    # Shared LLM connection pools (one per provider + key), reused across requests
+    assistant_key = s("OPENAISDK_API_KEY") or s("OPENAI_API_KEY")
+    if assistant_key:
+        llm_clients.openai(assistant_key)
+        print("[llm] ✅ OpenAI client pool ready")
+
+    # Lets worker threads (tree index, tool executor) share the async process runner
+    bind_loop(asyncio.get_running_loop())
+
     yield
 
     print("[RepEditor] Shutting down gracefully…")
+    try:
+        await llm_clients.aclose()
+    except Exception:
+        pass
+    try:
+        await session_cache.flush()
+    except Exception:
+        pass
+    code_search.save_all()
+    symbol_index.save_all()
     try:
         engine.dispose()
+        if async_engine is not None:
+            await async_engine.dispose()
     except Exception:
         pass
 
@@ -1,16 +1,19 @@
 """Model adapter abstraction layer"""
 
-from .base import ModelAdapter
+from .base import ModelAdapter, ModelResponse
 from .openai_adapter import OpenAIAdapter
 from .anthropic_adapter import AnthropicAdapter
 from .local_adapter import LocalModelAdapter
+from .cached_adapter import CachedModelAdapter
 from .factory import get_model_adapter
 
 # Google adapter is lazy-loaded due to protobuf dependency issues
 __all__ = [
     "ModelAdapter",
+    "ModelResponse",
     "OpenAIAdapter",
     "AnthropicAdapter",
     "LocalModelAdapter",
+    "CachedModelAdapter",
     "get_model_adapter"
 ]
@@ -12,6 +12,7 @@ class ModelResponse:
     tokens_out: Optional[int] = None
     latency_ms: Optional[int] = None
     raw_response: Optional[Dict[str, Any]] = None
+    cached: bool = False  # Served from the response cache, not a provider call
 
 
 class ModelAdapter(ABC):
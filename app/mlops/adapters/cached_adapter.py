@@ -0,0 +1,110 @@
+"""Caching model adapter - Serves repeated deterministic calls from the response cache"""
+
+import time
+from typing import Dict, Any, Optional
+from .base import ModelAdapter, ModelResponse
+from app.mlops.response_cache import response_cache, ResponseCache, RESPONSE_CACHE_MAX_TEMPERATURE
+
+class CachedModelAdapter(ModelAdapter):
+    """
+    Wraps any ModelAdapter with a content-addressed response cache
+
+    Calls are keyed by (provider, model, prompt hash, temperature, max_tokens,
+    json mode, schema/extra kwargs). Only calls at or below max_temperature are
+    cached, so sampling-heavy stages keep their variety. Hits come back with
+    cached=True so they are never logged as provider calls.
+    """
+
+    def __init__(
+        self,
+        inner: ModelAdapter,
+        cache: ResponseCache = response_cache,
+        ttl: Optional[float] = None,
+        max_temperature: float = RESPONSE_CACHE_MAX_TEMPERATURE
+    ):
+        super().__init__(inner.model_name, **inner.config)
+        self.inner = inner
+        self.cache = cache
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+
+    @property
+    def provider_name(self) -> str:
+        return self.inner.provider_name
+
+    async def _cached(
+        self,
+        call,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool,
+        extra: Dict[str, Any],
+        **kwargs
+    ) -> ModelResponse:
+        if temperature > self.max_temperature:
+            self.cache.record_bypass()
+            return await call(prompt=prompt, temperature=temperature, max_tokens=max_tokens, **kwargs)
+
+        start = time.time()
+        prompt_hash = self.cache.hash_prompt(prompt)
+        key = self.cache.make_key(
+            self.provider_name, self.model_name, prompt_hash, temperature, max_tokens, json_mode, extra
+        )
+
+        entry = await self.cache.get(key)
+        if entry is not None:
+            return ModelResponse(
+                content=entry["content"],
+                tokens_in=entry["tokens_in"],
+                tokens_out=entry["tokens_out"],
+                latency_ms=int((time.time() - start) * 1000),
+                raw_response={"cached": True, "cache_key": key},
+                cached=True
+            )
+
+        response = await call(prompt=prompt, temperature=temperature, max_tokens=max_tokens, **kwargs)
+        if response.content:
+            await self.cache.put(
+                key,
+                self.provider_name,
+                self.model_name,
+                prompt_hash,
+                response.content,
+                tokens_in=response.tokens_in,
+                tokens_out=response.tokens_out,
+                ttl=self.ttl
+            )
+        return response
+
+    async def generate(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        **kwargs
+    ) -> ModelResponse:
+        """Generate completion, served from cache when possible"""
+        return await self._cached(
+            self.inner.generate, prompt, temperature, max_tokens,
+            json_mode=False, extra=kwargs, **kwargs
+        )
+
+    async def generate_json(
+        self,
+        prompt: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 8192,
+        **kwargs
+    ) -> ModelResponse:
+        """Generate JSON response, served from cache when possible"""
+        return await self._cached(
+            self.inner.generate_json, prompt, temperature, max_tokens,
+            json_mode=True, extra={"json_schema": json_schema, **kwargs},
+            json_schema=json_schema, **kwargs
+        )
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get model metadata"""
+        return {**self.inner.get_model_info(), "cached": True}
@@ -1,29 +1,42 @@
 """Model adapter factory"""
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base import ModelAdapter
 from .openai_adapter import OpenAIAdapter
 from .anthropic_adapter import AnthropicAdapter
 from .local_adapter import LocalModelAdapter
+from .cached_adapter import CachedModelAdapter
+from app.mlops.response_cache import RESPONSE_CACHE_ENABLED
 
 def get_model_adapter(
     provider: str,
     model_name: str,
+    cache: Optional[bool] = None,
     **config
 ) -> ModelAdapter:
-    """Factory function to get the appropriate model adapter"""
+    """
+    Factory function to get the appropriate model adapter
+    
+    cache: wrap the adapter in CachedModelAdapter (defaults to MLOPS_RESPONSE_CACHE).
+        Pass cache=False where every call must reach the provider (evaluation).
+    """
     
     provider_lower = provider.lower()
     
     if provider_lower == "openai":
-        return OpenAIAdapter(model_name, **config)
+        adapter = OpenAIAdapter(model_name, **config)
     elif provider_lower == "anthropic":
-        return AnthropicAdapter(model_name, **config)
+        adapter = AnthropicAdapter(model_name, **config)
     elif provider_lower == "google":
         # Lazy load Google adapter to avoid protobuf dependency issues
         from .google_adapter import GoogleAdapter
-        return GoogleAdapter(model_name, **config)
+        adapter = GoogleAdapter(model_name, **config)
     elif provider_lower == "local":
-        return LocalModelAdapter(model_name, **config)
+        adapter = LocalModelAdapter(model_name, **config)
     else:
         raise ValueError(f"Unknown provider: {provider}. Supported: openai, anthropic, google, local")
+    
+    use_cache = RESPONSE_CACHE_ENABLED if cache is None else cache
+    if use_cache:
+        adapter = CachedModelAdapter(adapter)
+    return adapter
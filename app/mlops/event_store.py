@@ -1,20 +1,243 @@
 """MLOps Event Store - Captures all model interactions for training data"""
 
+import os
+import gzip
+import time
+import queue
+import asyncio
+import atexit
 import sqlite3
 import json
 import hashlib
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from contextlib import contextmanager
 
+from app.mlops.latency_sketch import LatencySketch
+
+
+EVENT_WRITE_BEHIND = os.getenv("EVENT_STORE_WRITE_BEHIND", "true").lower() == "true"
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_STORE_BATCH_SIZE", "200"))
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_STORE_FLUSH_INTERVAL", "0.5"))  # seconds
+EVENT_QUEUE_MAX = int(os.getenv("EVENT_STORE_QUEUE_MAX", "10000"))
+ID_BLOCK_SIZE = 1000
+
+# SQLite tuning (WAL lets readers run alongside the writer thread)
+EVENT_JOURNAL_MODE = os.getenv("EVENT_STORE_JOURNAL_MODE", "WAL")
+EVENT_CACHE_KB = int(os.getenv("EVENT_STORE_CACHE_KB", "16384"))  # page cache per connection
+EVENT_MMAP_BYTES = int(os.getenv("EVENT_STORE_MMAP_BYTES", str(256 * 1024 * 1024)))
+EVENT_BUSY_TIMEOUT_MS = int(os.getenv("EVENT_STORE_BUSY_TIMEOUT_MS", "5000"))
+EVENT_MAINTENANCE_INTERVAL = float(os.getenv("EVENT_STORE_MAINTENANCE_INTERVAL", "300"))  # seconds
+
+# Insert statements per table, in flush order (model_calls before the triad_jobs that reference them)
+INSERTS = {
+    "prompts": "INSERT OR IGNORE INTO prompts (hash, content, created_at) VALUES (?, ?, ?)",
+    "responses": "INSERT OR IGNORE INTO responses (hash, content, created_at) VALUES (?, ?, ?)",
+    "model_calls": """INSERT INTO model_calls
+        (id, timestamp, model_provider, model_name, call_type, prompt_hash, response_hash,
+         latency_ms, tokens_in, tokens_out, success, error_message, metadata, seq)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "triad_jobs": """INSERT INTO triad_jobs
+        (id, timestamp, user_context, strategist_call_id, planner_call_id,
+         validator_call_id, final_output, success, total_latency_ms, error_stage)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+    "metrics": "INSERT INTO metrics (timestamp, metric_type, metric_name, value, labels) VALUES (?, ?, ?, ?, ?)",
+}
+
+_FLUSH = object()
+_STOP = object()
+
+
+class EventWriter:
+    """Background thread that group-commits queued event rows in one transaction per batch"""
+    
+    def __init__(
+        self,
+        store: "MLOpsEventStore",
+        batch_size: int = EVENT_BATCH_SIZE,
+        flush_interval: float = EVENT_FLUSH_INTERVAL,
+        max_queue: int = EVENT_QUEUE_MAX
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {
+            "enqueued": 0,
+            "rows_written": 0,
+            "batches": 0,
+            "failed_rows": 0,
+            "row_fallbacks": 0,
+            "inline_writes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0
+        }
+    
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+    
+    def enqueue(self, rows: List[Tuple[str, tuple]]):
+        """Queue rows for the next batch; never blocks - overflow is written directly"""
+        self._ensure_started()
+        overflow = []
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+                self.stats["enqueued"] += 1
+            except queue.Full:
+                overflow.append(row)
+        if not overflow:
+            return
+        # Writer can't keep up - never drop events, write them ourselves (off the event loop if we're on it)
+        self.stats["inline_writes"] += len(overflow)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            loop.run_in_executor(None, self.write_rows, overflow)
+        else:
+            self.write_rows(overflow)
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            taken = 1
+            stop = item is _STOP
+            batch = [] if item is _FLUSH or stop else [item]
+            deadline = time.monotonic() + self.flush_interval
+            
+            # Collect until the batch is full, the interval elapses, or a flush/stop marker arrives
+            while batch and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+            
+            # task_done must run for everything taken, or flush() would wait forever
+            try:
+                if batch:
+                    self._flush(batch)
+            except Exception as e:
+                print(f"[mlops] ⚠️ Event writer error: {e}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+            if stop:
+                break
+    
+    def write_rows(self, rows: List[Tuple[str, tuple]]) -> int:
+        """
+        Commit rows as one transaction (retried once); if that still fails,
+        write them one at a time so a single bad row can't take the batch
+        with it. Returns the number of rows written.
+        """
+        for attempt in range(2):
+            try:
+                with self.store._get_conn() as conn:
+                    self.store._write_rows(conn, rows)
+                return len(rows)
+            except Exception as e:
+                error = e
+                if attempt == 0:
+                    time.sleep(0.1)
+        
+        print(f"[mlops] ⚠️ Event batch of {len(rows)} rows failed ({error}), writing rows individually")
+        self.stats["row_fallbacks"] += 1
+        written = 0
+        for row in rows:
+            try:
+                with self.store._get_conn() as conn:
+                    self.store._write_rows(conn, [row])
+                written += 1
+            except Exception as e:
+                self.stats["failed_rows"] += 1
+                print(f"[mlops] ⚠️ Dropping unwritable {row[0]} event: {e}")
+        return written
+    
+    def _flush(self, batch: List[Tuple[str, tuple]]):
+        start = time.time()
+        written = self.write_rows(batch)
+        
+        elapsed_ms = (time.time() - start) * 1000
+        try:
+            self.store.maintain()
+        except Exception as e:
+            print(f"[mlops] ⚠️ Event store maintenance failed: {e}")
+        self.stats["batches"] += 1
+        self.stats["rows_written"] += written
+        self.stats["last_flush_ms"] = elapsed_ms
+        self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"], elapsed_ms)
+        self.stats["total_flush_ms"] += elapsed_ms
+    
+    def flush(self):
+        """Block until every row queued so far is committed"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+    
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=30)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "avg_flush_ms": self.stats["total_flush_ms"] / batches if batches else 0,
+            "avg_batch_size": self.stats["rows_written"] / batches if batches else 0
+        }
+
+
 class MLOpsEventStore:
     """SQLite-based event store for ML observability and training data capture"""
     
-    def __init__(self, db_path: str = "data/mlops/events.db"):
+    def __init__(self, db_path: str = "data/mlops/events.db", write_behind: bool = EVENT_WRITE_BEHIND):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._sketch = LatencySketch()  # bin layout shared by writes and queries
+        
+        # One long-lived connection per thread (sqlite3 connections aren't shared across threads)
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._last_maintenance = time.time()
         self._init_db()
+        
+        # model_call ids are handed out from reserved blocks so logging never waits on an INSERT.
+        # Blocks interleave across processes, so ids are not commit-ordered; seq is (see _commit_seqs)
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._block_end = 0
+        
+        self.writer = EventWriter(self) if write_behind else None
     
     def _init_db(self):
         """Initialize event store schema"""
@@ -33,7 +256,8 @@ class MLOpsEventStore:
                     tokens_out INTEGER,
                     success BOOLEAN NOT NULL,
                     error_message TEXT,
-                    metadata TEXT  -- JSON
+                    metadata TEXT,  -- JSON
+                    seq INTEGER  -- commit order (ids are reserved in per-process blocks)
                 );
                 
                 CREATE TABLE IF NOT EXISTS prompts (
@@ -96,30 +320,259 @@ class MLOpsEventStore:
                     status TEXT NOT NULL  -- 'canary', 'active', 'deprecated'
                 );
                 
+                CREATE TABLE IF NOT EXISTS id_blocks (
+                    name TEXT PRIMARY KEY,
+                    next_id INTEGER NOT NULL
+                );
+                
                 CREATE INDEX IF NOT EXISTS idx_model_calls_timestamp ON model_calls(timestamp);
                 CREATE INDEX IF NOT EXISTS idx_model_calls_type ON model_calls(call_type);
                 CREATE INDEX IF NOT EXISTS idx_triad_jobs_timestamp ON triad_jobs(timestamp);
                 CREATE INDEX IF NOT EXISTS idx_metrics_timestamp ON metrics(timestamp);
+                
+                -- Per-minute aggregates of model_calls, maintained on insert
+                CREATE TABLE IF NOT EXISTS model_call_rollups (
+                    bucket TEXT NOT NULL,  -- 'YYYY-MM-DDTHH:MM' (UTC)
+                    call_type TEXT NOT NULL,
+                    model_provider TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    latency_count INTEGER NOT NULL DEFAULT 0,
+                    latency_sum INTEGER NOT NULL DEFAULT 0,
+                    latency_max INTEGER NOT NULL DEFAULT 0,
+                    tokens_in_count INTEGER NOT NULL DEFAULT 0,
+                    tokens_in_sum INTEGER NOT NULL DEFAULT 0,
+                    tokens_out_count INTEGER NOT NULL DEFAULT 0,
+                    tokens_out_sum INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (bucket, call_type, model_provider, model_name)
+                );
+                
+                -- Per-minute latency sketch bins (see LatencySketch), merged by summing counts
+                CREATE TABLE IF NOT EXISTS latency_sketch_bins (
+                    bucket TEXT NOT NULL,
+                    call_type TEXT NOT NULL,
+                    model_provider TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (bucket, call_type, model_provider, model_name, bin)
+                );
             """)
+            
+            # Commit-order key for incremental exports; rows from before it existed keep their id
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(model_calls)")}
+            if "seq" not in columns:
+                conn.execute("ALTER TABLE model_calls ADD COLUMN seq INTEGER")
+                conn.execute("UPDATE model_calls SET seq = id")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_model_calls_seq ON model_calls(seq)")
+            conn.execute(
+                """INSERT OR IGNORE INTO id_blocks (name, next_id)
+                   SELECT 'model_calls_seq', COALESCE(MAX(seq), 0) + 1 FROM model_calls"""
+            )
+            
+            # Backfill rollups for calls logged before the table existed
+            has_rollups = conn.execute("SELECT 1 FROM model_call_rollups LIMIT 1").fetchone()
+            has_calls = conn.execute("SELECT 1 FROM model_calls LIMIT 1").fetchone()
+            if has_calls and not has_rollups:
+                conn.execute("""
+                    INSERT INTO model_call_rollups
+                    SELECT
+                        substr(timestamp, 1, 16), call_type, model_provider, model_name,
+                        COUNT(*), SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END),
+                        COUNT(latency_ms), COALESCE(SUM(latency_ms), 0), COALESCE(MAX(latency_ms), 0),
+                        COUNT(tokens_in), COALESCE(SUM(tokens_in), 0),
+                        COUNT(tokens_out), COALESCE(SUM(tokens_out), 0)
+                    FROM model_calls
+                    GROUP BY 1, 2, 3, 4
+                """)
+            
+            has_bins = conn.execute("SELECT 1 FROM latency_sketch_bins LIMIT 1").fetchone()
+            if has_calls and not has_bins:
+                sketch = LatencySketch()
+                bins: Dict[tuple, int] = {}
+                cursor = conn.execute(
+                    """SELECT substr(timestamp, 1, 16), call_type, model_provider, model_name, latency_ms
+                       FROM model_calls WHERE latency_ms IS NOT NULL"""
+                )
+                for bucket, call_type, provider, model, latency in cursor:
+                    key = (bucket, call_type, provider, model, sketch.bin_index(latency))
+                    bins[key] = bins.get(key, 0) + 1
+                conn.executemany(
+                    "INSERT INTO latency_sketch_bins VALUES (?, ?, ?, ?, ?, ?)",
+                    [(*key, count) for key, count in bins.items()]
+                )
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection: WAL, relaxed fsync, sized page cache, mmap I/O, busy timeout"""
+        # check_same_thread=False only so close() can checkpoint/close every thread's connection
+        conn = sqlite3.connect(self.db_path, timeout=EVENT_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA journal_mode={EVENT_JOURNAL_MODE}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{EVENT_CACHE_KB}")
+        conn.execute(f"PRAGMA mmap_size={EVENT_MMAP_BYTES}")
+        conn.execute(f"PRAGMA busy_timeout={EVENT_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._conns_lock:
+            self._conns.append(conn)
+        return conn
     
     @contextmanager
     def _get_conn(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Context manager for this thread's persistent connection (one transaction per use)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
         try:
             yield conn
             conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
-        finally:
-            conn.close()
+    
+    def maintain(self, force: bool = False):
+        """Checkpoint the WAL and refresh query planner stats (at most every maintenance interval)"""
+        if not force and time.time() - self._last_maintenance < EVENT_MAINTENANCE_INTERVAL:
+            return
+        self._last_maintenance = time.time()
+        with self._get_conn() as conn:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            conn.execute("PRAGMA optimize")
     
     def _hash_content(self, content: str) -> str:
         """Generate SHA256 hash of content"""
         return hashlib.sha256(content.encode()).hexdigest()
     
+    def _allocate_call_id(self) -> int:
+        """Next model_calls id, reserving a new block from the database when exhausted"""
+        with self._id_lock:
+            if self._next_id >= self._block_end:
+                with self._get_conn() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    row = conn.execute("SELECT next_id FROM id_blocks WHERE name = 'model_calls'").fetchone()
+                    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM model_calls").fetchone()[0]
+                    start = max(row["next_id"] if row else 1, max_id + 1)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO id_blocks (name, next_id) VALUES ('model_calls', ?)",
+                        (start + ID_BLOCK_SIZE,)
+                    )
+                self._next_id = start
+                self._block_end = start + ID_BLOCK_SIZE
+            call_id = self._next_id
+            self._next_id += 1
+            return call_id
+    
+    def _write_rows(self, conn: sqlite3.Connection, rows: List[Tuple[str, tuple]]):
+        """Insert rows grouped per table with executemany (caller owns the transaction)"""
+        by_table: Dict[str, List[tuple]] = {}
+        for table, params in rows:
+            by_table.setdefault(table, []).append(params)
+        for table, sql in INSERTS.items():
+            if table in by_table:
+                params = by_table[table]
+                if table == "model_calls":
+                    params = self._commit_seqs(conn, params)
+                conn.executemany(sql, params)
+        if "model_calls" in by_table:
+            self._update_rollups(conn, by_table["model_calls"])
+    
+    def _commit_seqs(self, conn: sqlite3.Connection, calls: List[tuple]) -> List[tuple]:
+        """
+        Append seq numbers to model_calls rows. The counter is bumped inside the
+        write transaction and SQLite has one writer at a time, so seq follows
+        commit order across threads and processes (unlike block-allocated ids).
+        """
+        conn.execute(
+            "UPDATE id_blocks SET next_id = next_id + ? WHERE name = 'model_calls_seq'", (len(calls),)
+        )
+        end = conn.execute("SELECT next_id FROM id_blocks WHERE name = 'model_calls_seq'").fetchone()[0]
+        start = end - len(calls)
+        return [(*call, start + i) for i, call in enumerate(calls)]
+    
+    def _update_rollups(self, conn: sqlite3.Connection, calls: List[tuple]):
+        """Fold a batch of model_calls rows into their per-minute rollups"""
+        agg: Dict[tuple, List[int]] = {}
+        bins: Dict[tuple, int] = {}
+        for (_, timestamp, provider, model, call_type, _, _, latency, tokens_in, tokens_out, success, _, _) in calls:
+            key = (timestamp[:16], call_type, provider, model)
+            a = agg.setdefault(key, [0] * 9)
+            a[0] += 1
+            a[1] += 1 if success else 0
+            if latency is not None:
+                a[2] += 1
+                a[3] += latency
+                a[4] = max(a[4], latency)
+                bin_key = (*key, self._sketch.bin_index(latency))
+                bins[bin_key] = bins.get(bin_key, 0) + 1
+            if tokens_in is not None:
+                a[5] += 1
+                a[6] += tokens_in
+            if tokens_out is not None:
+                a[7] += 1
+                a[8] += tokens_out
+        conn.executemany(
+            """INSERT INTO model_call_rollups
+               (bucket, call_type, model_provider, model_name, calls, successes,
+                latency_count, latency_sum, latency_max, tokens_in_count, tokens_in_sum,
+                tokens_out_count, tokens_out_sum)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (bucket, call_type, model_provider, model_name) DO UPDATE SET
+                calls = calls + excluded.calls,
+                successes = successes + excluded.successes,
+                latency_count = latency_count + excluded.latency_count,
+                latency_sum = latency_sum + excluded.latency_sum,
+                latency_max = MAX(latency_max, excluded.latency_max),
+                tokens_in_count = tokens_in_count + excluded.tokens_in_count,
+                tokens_in_sum = tokens_in_sum + excluded.tokens_in_sum,
+                tokens_out_count = tokens_out_count + excluded.tokens_out_count,
+                tokens_out_sum = tokens_out_sum + excluded.tokens_out_sum""",
+            [(*key, *values) for key, values in agg.items()]
+        )
+        conn.executemany(
+            """INSERT INTO latency_sketch_bins
+               (bucket, call_type, model_provider, model_name, bin, count)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (bucket, call_type, model_provider, model_name, bin) DO UPDATE SET
+                count = count + excluded.count""",
+            [(*key, count) for key, count in bins.items()]
+        )
+    
+    def _write(self, rows: List[Tuple[str, tuple]]):
+        """Hand rows to the write-behind queue, or commit them now when it's disabled"""
+        if self.writer is not None:
+            self.writer.enqueue(rows)
+        else:
+            with self._get_conn() as conn:
+                self._write_rows(conn, rows)
+            self.maintain()
+    
+    def flush(self):
+        """Wait for queued events to be committed"""
+        if self.writer is not None:
+            self.writer.flush()
+    
+    def close(self):
+        """Drain queued events, checkpoint and close connections (called at interpreter exit)"""
+        if self.writer is not None:
+            self.writer.close()
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.execute("PRAGMA optimize")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """Queue depth and flush latency of the write-behind queue"""
+        if self.writer is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.writer.get_stats()}
+    
     def log_model_call(
         self,
         model_provider: str,
@@ -132,48 +585,43 @@ class MLOpsEventStore:
         tokens_out: Optional[int] = None,
         success: bool = True,
         error_message: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
-    ) -> int:
-        """Log a model API call"""
+        metadata: Optional[Dict[str, Any]] = None,
+        cached: bool = False
+    ) -> Optional[int]:
+        """
+        Log a model API call
+        
+        Cached responses are not provider calls: they are skipped (returning
+        None) so rollups, latency sketches, alerts and training exports only
+        see real calls. Cache hits are counted by the response cache itself.
+        """
+        if cached:
+            return None
         prompt_hash = self._hash_content(prompt)
         response_hash = self._hash_content(response) if response else None
+        now = datetime.utcnow().isoformat()
+        call_id = self._allocate_call_id()
         
-        with self._get_conn() as conn:
-            # Store prompt
-            conn.execute(
-                "INSERT OR IGNORE INTO prompts (hash, content, created_at) VALUES (?, ?, ?)",
-                (prompt_hash, prompt, datetime.utcnow().isoformat())
-            )
-            
-            # Store response
-            if response:
-                conn.execute(
-                    "INSERT OR IGNORE INTO responses (hash, content, created_at) VALUES (?, ?, ?)",
-                    (response_hash, response, datetime.utcnow().isoformat())
-                )
-            
-            # Store model call
-            cursor = conn.execute(
-                """INSERT INTO model_calls 
-                   (timestamp, model_provider, model_name, call_type, prompt_hash, response_hash,
-                    latency_ms, tokens_in, tokens_out, success, error_message, metadata)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    datetime.utcnow().isoformat(),
-                    model_provider,
-                    model_name,
-                    call_type,
-                    prompt_hash,
-                    response_hash,
-                    latency_ms,
-                    tokens_in,
-                    tokens_out,
-                    success,
-                    error_message,
-                    json.dumps(metadata) if metadata else None
-                )
-            )
-            return cursor.lastrowid
+        rows = [("prompts", (prompt_hash, prompt, now))]
+        if response:
+            rows.append(("responses", (response_hash, response, now)))
+        rows.append(("model_calls", (
+            call_id,
+            now,
+            model_provider,
+            model_name,
+            call_type,
+            prompt_hash,
+            response_hash,
+            latency_ms,
+            tokens_in,
+            tokens_out,
+            success,
+            error_message,
+            json.dumps(metadata) if metadata else None
+        )))
+        self._write(rows)
+        return call_id
     
     def log_triad_job(
         self,
@@ -188,51 +636,49 @@ class MLOpsEventStore:
         error_stage: Optional[str] = None
     ):
         """Log a complete Triad pipeline execution"""
-        with self._get_conn() as conn:
-            conn.execute(
-                """INSERT INTO triad_jobs 
-                   (id, timestamp, user_context, strategist_call_id, planner_call_id, 
-                    validator_call_id, final_output, success, total_latency_ms, error_stage)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    job_id,
-                    datetime.utcnow().isoformat(),
-                    json.dumps(user_context),
-                    strategist_call_id,
-                    planner_call_id,
-                    validator_call_id,
-                    json.dumps(final_output) if final_output else None,
-                    success,
-                    total_latency_ms,
-                    error_stage
-                )
-            )
+        self._write([("triad_jobs", (
+            job_id,
+            datetime.utcnow().isoformat(),
+            json.dumps(user_context),
+            strategist_call_id,
+            planner_call_id,
+            validator_call_id,
+            json.dumps(final_output) if final_output else None,
+            success,
+            total_latency_ms,
+            error_stage
+        ))])
     
     def log_metric(self, metric_type: str, metric_name: str, value: float, labels: Optional[Dict[str, str]] = None):
         """Log a metric for observability"""
-        with self._get_conn() as conn:
-            conn.execute(
-                "INSERT INTO metrics (timestamp, metric_type, metric_name, value, labels) VALUES (?, ?, ?, ?, ?)",
-                (
-                    datetime.utcnow().isoformat(),
-                    metric_type,
-                    metric_name,
-                    value,
-                    json.dumps(labels) if labels else None
-                )
-            )
+        self._write([("metrics", (
+            datetime.utcnow().isoformat(),
+            metric_type,
+            metric_name,
+            value,
+            json.dumps(labels) if labels else None
+        ))])
     
-    def export_training_data(
+    def iter_training_records(
         self,
-        output_path: str,
         call_type: Optional[str] = None,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
-    ) -> int:
-        """Export model calls to JSONL for training"""
+        end_date: Optional[str] = None,
+        after_seq: int = 0,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream successful model calls (joined with prompt/response) in commit order
+        
+        Keyset-paginated on seq: each chunk is a fresh `seq > last` query, so
+        memory is bounded by chunk_size and no read transaction stays open
+        between chunks. seq (not id) is the resume key: rows committed after a
+        previous export always get a larger seq, whichever process wrote them.
+        """
         query = """
             SELECT 
                 mc.id,
+                mc.seq,
                 mc.timestamp,
                 mc.model_provider,
                 mc.model_name,
@@ -246,7 +692,7 @@ class MLOpsEventStore:
             FROM model_calls mc
             LEFT JOIN prompts p ON mc.prompt_hash = p.hash
             LEFT JOIN responses r ON mc.response_hash = r.hash
-            WHERE mc.success = 1
+            WHERE mc.success = 1 AND mc.seq > ?
         """
         params = []
         
@@ -259,17 +705,17 @@ class MLOpsEventStore:
         if end_date:
             query += " AND mc.timestamp <= ?"
             params.append(end_date)
+        query += " ORDER BY mc.seq LIMIT ?"
         
-        with self._get_conn() as conn:
-            rows = conn.execute(query, params).fetchall()
-        
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_file, 'w') as f:
+        self.flush()
+        last_seq = after_seq
+        while True:
+            with self._get_conn() as conn:
+                rows = conn.execute(query, [last_seq, *params, chunk_size]).fetchall()
             for row in rows:
-                record = {
+                yield {
                     "id": row["id"],
+                    "seq": row["seq"],
                     "timestamp": row["timestamp"],
                     "model_provider": row["model_provider"],
                     "model_name": row["model_name"],
@@ -280,50 +726,114 @@ class MLOpsEventStore:
                     "tokens_out": row["tokens_out"],
                     "metadata": json.loads(row["metadata"]) if row["metadata"] else None
                 }
+            if len(rows) < chunk_size:
+                break
+            last_seq = rows[-1]["seq"]
+    
+    def export_training_data(
+        self,
+        output_path: str,
+        call_type: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        after_seq: int = 0
+    ) -> int:
+        """Export model calls to JSONL for training (gzip when output_path ends in .gz)"""
+        output_file = Path(output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        count = 0
+        opener = gzip.open if output_file.suffix == ".gz" else open
+        with opener(output_file, 'wt') as f:
+            for record in self.iter_training_records(call_type, start_date, end_date, after_seq=after_seq):
                 f.write(json.dumps(record) + '\n')
+                count += 1
         
-        return len(rows)
+        return count
     
     def get_performance_metrics(
         self,
         call_type: Optional[str] = None,
-        hours: int = 24
+        hours: int = 24,
+        model_provider: Optional[str] = None,
+        model_name: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Get performance metrics for the last N hours"""
-        query = """
-            SELECT 
-                COUNT(*) as total_calls,
-                SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END) as successful_calls,
-                AVG(latency_ms) as avg_latency_ms,
-                MAX(latency_ms) as max_latency_ms,
-                AVG(tokens_in) as avg_tokens_in,
-                AVG(tokens_out) as avg_tokens_out,
-                SUM(tokens_in) as total_tokens_in,
-                SUM(tokens_out) as total_tokens_out
-            FROM model_calls
-            WHERE timestamp >= datetime('now', '-' || ? || ' hours')
         """
-        params = [hours]
+        Get performance metrics for the last N hours
         
-        if call_type:
-            query += " AND call_type = ?"
-            params.append(call_type)
+        Whole minutes are read from model_call_rollups; only the partial first
+        minute of the window is scanned from model_calls, so cost stays flat as
+        the table grows.
+        """
+        window_start = datetime.utcnow() - timedelta(hours=hours)
+        first_bucket = (window_start.replace(second=0, microsecond=0) + timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M")
+        
+        filters = ""
+        filter_params = []
+        for column, value in (("call_type", call_type), ("model_provider", model_provider), ("model_name", model_name)):
+            if value:
+                filters += f" AND {column} = ?"
+                filter_params.append(value)
         
         with self._get_conn() as conn:
-            row = conn.execute(query, params).fetchone()
+            rollup = conn.execute(
+                f"""SELECT
+                        COALESCE(SUM(calls), 0), COALESCE(SUM(successes), 0),
+                        COALESCE(SUM(latency_count), 0), COALESCE(SUM(latency_sum), 0),
+                        COALESCE(SUM(tokens_in_count), 0), COALESCE(SUM(tokens_in_sum), 0),
+                        COALESCE(SUM(tokens_out_count), 0), COALESCE(SUM(tokens_out_sum), 0),
+                        MAX(CASE WHEN latency_count > 0 THEN latency_max END)
+                    FROM model_call_rollups
+                    WHERE bucket >= ?{filters}""",
+                [first_bucket, *filter_params]
+            ).fetchone()
+            edge = conn.execute(
+                f"""SELECT
+                        COUNT(*), COALESCE(SUM(CASE WHEN success = 1 THEN 1 ELSE 0 END), 0),
+                        COUNT(latency_ms), COALESCE(SUM(latency_ms), 0),
+                        COUNT(tokens_in), COALESCE(SUM(tokens_in), 0),
+                        COUNT(tokens_out), COALESCE(SUM(tokens_out), 0),
+                        MAX(latency_ms)
+                    FROM model_calls
+                    WHERE timestamp >= ? AND timestamp < ?{filters}""",
+                [window_start.isoformat(), first_bucket, *filter_params]
+            ).fetchone()
+            
+            # Latency percentiles: merge per-minute sketch bins, plus raw latencies of the partial minute
+            sketch = LatencySketch()
+            sketch.add_bins(conn.execute(
+                f"""SELECT bin, SUM(count) FROM latency_sketch_bins
+                    WHERE bucket >= ?{filters}
+                    GROUP BY bin""",
+                [first_bucket, *filter_params]
+            ))
+            for (latency,) in conn.execute(
+                f"""SELECT latency_ms FROM model_calls
+                    WHERE timestamp >= ? AND timestamp < ? AND latency_ms IS NOT NULL{filters}""",
+                [window_start.isoformat(), first_bucket, *filter_params]
+            ):
+                sketch.add(latency)
+        
+        # Counts and sums add up across both sources; the max is taken separately
+        total_calls, successful_calls, latency_count, latency_sum, tin_count, tin_sum, tout_count, tout_sum = (
+            a + b for a, b in zip(rollup[:8], edge[:8])
+        )
+        maxima = [m for m in (rollup[8], edge[8]) if m is not None]
         
         return {
-            "total_calls": row["total_calls"],
-            "successful_calls": row["successful_calls"],
-            "success_rate": row["successful_calls"] / row["total_calls"] if row["total_calls"] > 0 else 0,
-            "avg_latency_ms": row["avg_latency_ms"],
-            "max_latency_ms": row["max_latency_ms"],
-            "avg_tokens_in": row["avg_tokens_in"],
-            "avg_tokens_out": row["avg_tokens_out"],
-            "total_tokens_in": row["total_tokens_in"],
-            "total_tokens_out": row["total_tokens_out"]
+            "total_calls": total_calls,
+            "successful_calls": successful_calls,
+            "success_rate": successful_calls / total_calls if total_calls > 0 else 0,
+            "avg_latency_ms": latency_sum / latency_count if latency_count else None,
+            "max_latency_ms": max(maxima) if maxima else None,
+            **sketch.percentiles(),
+            "avg_tokens_in": tin_sum / tin_count if tin_count else None,
+            "avg_tokens_out": tout_sum / tout_count if tout_count else None,
+            "total_tokens_in": tin_sum if tin_count else None,
+            "total_tokens_out": tout_sum if tout_count else None
         }
 
 
 # Global singleton
 event_store = MLOpsEventStore()
+atexit.register(event_store.close)
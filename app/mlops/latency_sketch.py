@@ -0,0 +1,65 @@
+"""Latency sketch - Mergeable log-bucketed histogram for percentile estimates"""
+
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+# Relative accuracy of reported quantiles (2% -> p95 of 10000ms is within ±200ms)
+SKETCH_RELATIVE_ACCURACY = 0.02
+
+
+class LatencySketch:
+    """
+    DDSketch-style histogram: value v lands in bin ceil(log_gamma(v)).
+
+    Bins are plain counts, so sketches for any set of time buckets merge by
+    adding counts per bin - the event store keeps them per minute and sums
+    them over a window in SQL.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+
+    def bin_index(self, value: float) -> int:
+        """Bin for a latency in ms (values under 1ms share bin 0)"""
+        return max(0, math.ceil(math.log(max(value, 1.0)) / self._log_gamma))
+
+    def bin_value(self, index: int) -> float:
+        """Representative value of a bin (within relative_accuracy of anything in it)"""
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        index = self.bin_index(value)
+        self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+
+    def add_bins(self, bins: Iterable[Tuple[int, int]]):
+        """Merge (bin, count) pairs, e.g. rows summed from the database"""
+        for index, count in bins:
+            self.bins[index] = self.bins.get(index, 0) + count
+            self.count += count
+
+    def merge(self, other: "LatencySketch"):
+        self.add_bins(other.bins.items())
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0..1), None when empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return self.bin_value(index)
+        return self.bin_value(max(self.bins))
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """p50/p95/p99 in the key format used by the metrics dicts"""
+        return {
+            "p50_latency_ms": self.quantile(0.50),
+            "p95_latency_ms": self.quantile(0.95),
+            "p99_latency_ms": self.quantile(0.99)
+        }
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 from app.mlops.event_store import event_store
+from app.mlops.response_cache import response_cache
 
 
 class ObservabilitySystem:
@@ -61,6 +62,8 @@ class ObservabilitySystem:
             "window_minutes": window_minutes,
             "overall": overall,
             "by_stage": by_stage,
+            "response_cache": response_cache.get_stats(),
+            "event_writer": event_store.get_writer_stats(),
             "health_status": self._calculate_health_status(overall)
         }
         
@@ -78,6 +81,10 @@ class ObservabilitySystem:
         if metrics["avg_latency_ms"] and metrics["avg_latency_ms"] > thresholds["avg_latency_ms"]:
             return "degraded"
         
+        # Check tail latency (SLA is on p95)
+        if metrics["p95_latency_ms"] and metrics["p95_latency_ms"] > thresholds["p95_latency_ms"]:
+            return "degraded"
+        
         # All good
         return "healthy"
     
@@ -132,6 +139,7 @@ class ObservabilitySystem:
         checks = [
             ("success_rate", metrics["success_rate"], thresholds["success_rate"], ">="),
             ("avg_latency_ms", metrics["avg_latency_ms"], thresholds["avg_latency_ms"], "<="),
+            ("p95_latency_ms", metrics["p95_latency_ms"], thresholds["p95_latency_ms"], "<="),
         ]
         
         for name, value, threshold, operator in checks:
@@ -202,12 +210,31 @@ class ObservabilitySystem:
         prom_metrics.append(f"vecto_avg_latency_ms {overall['avg_latency_ms'] or 0}")
         prom_metrics.append(f"vecto_total_tokens_in {overall['total_tokens_in'] or 0}")
         prom_metrics.append(f"vecto_total_tokens_out {overall['total_tokens_out'] or 0}")
+        for quantile, key in (("0.5", "p50_latency_ms"), ("0.95", "p95_latency_ms"), ("0.99", "p99_latency_ms")):
+            prom_metrics.append(f'vecto_latency_ms{{quantile="{quantile}"}} {overall[key] or 0}')
         
         # Stage-specific metrics
         for stage, stage_metrics in metrics["by_stage"].items():
             prom_metrics.append(f'vecto_stage_calls{{stage="{stage}"}} {stage_metrics["total_calls"]}')
             prom_metrics.append(f'vecto_stage_success_rate{{stage="{stage}"}} {stage_metrics["success_rate"]}')
             prom_metrics.append(f'vecto_stage_avg_latency_ms{{stage="{stage}"}} {stage_metrics["avg_latency_ms"] or 0}')
+            for quantile, key in (("0.5", "p50_latency_ms"), ("0.95", "p95_latency_ms"), ("0.99", "p99_latency_ms")):
+                prom_metrics.append(f'vecto_stage_latency_ms{{stage="{stage}",quantile="{quantile}"}} {stage_metrics[key] or 0}')
+        
+        # Response cache metrics
+        cache = metrics["response_cache"]
+        prom_metrics.append(f'vecto_response_cache_hits{{tier="memory"}} {cache["memory_hits"]}')
+        prom_metrics.append(f'vecto_response_cache_hits{{tier="disk"}} {cache["disk_hits"]}')
+        prom_metrics.append(f"vecto_response_cache_misses {cache['misses']}")
+        prom_metrics.append(f"vecto_response_cache_hit_rate {cache['hit_rate']}")
+        
+        # Event store write-behind queue
+        writer = metrics["event_writer"]
+        if writer["enabled"]:
+            prom_metrics.append(f"vecto_event_queue_depth {writer['queue_depth']}")
+            prom_metrics.append(f"vecto_event_flush_latency_ms {writer['last_flush_ms']}")
+            prom_metrics.append(f"vecto_event_flush_latency_avg_ms {writer['avg_flush_ms']}")
+            prom_metrics.append(f"vecto_event_rows_written {writer['rows_written']}")
         
         return "\n".join(prom_metrics)
 
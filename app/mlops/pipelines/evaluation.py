@@ -1,14 +1,98 @@
 """Evaluation pipeline - Metrics, validation, and model scoring"""
 
+import os
 import json
+import gzip
+import time
 import asyncio
+import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator
 from app.mlops.adapters import get_model_adapter
 from app.mlops.event_store import event_store
 
 
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "4"))
+
+
+def _iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream JSONL records (gzip when the file ends in .gz)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class RateLimiter:
+    """Spaces calls evenly to stay under a requests-per-minute budget"""
+    
+    def __init__(self, requests_per_minute: Optional[float] = None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, requests_per_minute: Optional[float] = None) -> RateLimiter:
+    """Shared limiter per provider (EVAL_RPM_<PROVIDER> env var when no explicit limit)"""
+    if requests_per_minute is None:
+        env_rpm = os.getenv(f"EVAL_RPM_{provider.upper()}")
+        requests_per_minute = float(env_rpm) if env_rpm else None
+    limiter = _rate_limiters.get(provider)
+    if limiter is None or limiter.interval != (60.0 / requests_per_minute if requests_per_minute else 0.0):
+        limiter = _rate_limiters[provider] = RateLimiter(requests_per_minute)
+    return limiter
+
+
+class EvalAggregate:
+    """Running evaluation metrics, updated one result at a time"""
+    
+    def __init__(self):
+        self.count = 0
+        self.successful = 0
+        self.total_latency = 0
+        self.total_tokens_in = 0
+        self.total_tokens_out = 0
+        self.json_valid = 0
+    
+    def add(self, result: Dict[str, Any]):
+        self.count += 1
+        if not result.get('success'):
+            return
+        self.successful += 1
+        self.total_latency += result.get('latency_ms') or 0
+        self.total_tokens_in += result.get('tokens_in') or 0
+        self.total_tokens_out += result.get('tokens_out') or 0
+        if result.get('json_valid'):
+            self.json_valid += 1
+    
+    def summary(self) -> Dict[str, Any]:
+        ok = self.successful
+        return {
+            "success_rate": ok / self.count if self.count else 0,
+            "avg_latency_ms": self.total_latency / ok if ok > 0 else None,
+            "total_tokens_in": self.total_tokens_in,
+            "total_tokens_out": self.total_tokens_out,
+            "avg_tokens_in": self.total_tokens_in / ok if ok > 0 else None,
+            "avg_tokens_out": self.total_tokens_out / ok if ok > 0 else None,
+            "json_validity_rate": self.json_valid / self.count if self.count else 0
+        }
+
+
 class EvaluationPipeline:
     """Evaluate model performance on validation datasets"""
     
@@ -22,42 +106,83 @@ class EvaluationPipeline:
         model_name: str,
         validation_file: str,
         metrics: List[str] = None,
+        concurrency: int = EVAL_CONCURRENCY,
+        requests_per_minute: Optional[float] = None,
+        resume: bool = False,
         **adapter_config
     ) -> Dict[str, Any]:
         """
         Evaluate a model on a validation dataset
         
+        Records are evaluated concurrently (bounded by `concurrency` and the
+        provider's rate limit). Each result is appended to a JSONL checkpoint
+        as it completes, so an interrupted run can pick up where it stopped.
+        
         Args:
             provider: Model provider ('openai', 'anthropic', 'google', 'local')
             model_name: Model name/ID
-            validation_file: Path to validation JSONL file
+            validation_file: Path to validation JSONL file (.gz supported)
             metrics: List of metrics to compute ('accuracy', 'bleu', 'rouge', etc.)
+            concurrency: Max in-flight model calls
+            requests_per_minute: Provider rate limit (defaults to EVAL_RPM_<PROVIDER>)
+            resume: Skip records that already succeeded in this run's checkpoint (failed ones run again)
             adapter_config: Additional config for model adapter
             
         Returns:
             Evaluation results
         """
-        print(f"[eval] Starting evaluation: {provider}/{model_name}")
+        print(f"[eval] Starting evaluation: {provider}/{model_name} (concurrency {concurrency})")
         
         if metrics is None:
             metrics = ['latency', 'token_efficiency', 'json_validity']
         
-        adapter = get_model_adapter(provider, model_name, **adapter_config)
+        # Never cached: evaluation measures the provider, not the response cache
+        adapter = get_model_adapter(provider, model_name, **{**adapter_config, "cache": False})
+        limiter = get_rate_limiter(provider, requests_per_minute)
         
-        # Load validation data
-        with open(validation_file, 'r') as f:
-            val_records = [json.loads(line) for line in f]
+        # Checkpoint is keyed by provider/model/dataset so --resume finds it again
+        run_key = hashlib.sha256(f"{provider}|{model_name}|{Path(validation_file).resolve()}".encode()).hexdigest()[:10]
+        safe_model = model_name.replace("/", "_")
+        checkpoint_file = self.results_dir / f"eval_{provider}_{safe_model}_{run_key}.checkpoint.jsonl"
         
-        results = []
-        total_latency = 0
-        total_tokens_in = 0
-        total_tokens_out = 0
-        json_valid_count = 0
+        aggregate = EvalAggregate()
+        done = set()
+        if resume and checkpoint_file.exists():
+            good_bytes = 0
+            latest: Dict[int, Dict[str, Any]] = {}  # index -> most recent result, without the texts
+            with open(checkpoint_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # torn last line from an interrupted run
+                    result = json.loads(line)
+                    result.pop('prediction', None)
+                    result.pop('ground_truth', None)
+                    latest[result['index']] = result
+                    good_bytes += len(line)
+            with open(checkpoint_file, 'r+b') as f:
+                f.truncate(good_bytes)
+            # Only successes count as done; failed records (e.g. transient errors) are retried
+            for index, result in latest.items():
+                if result.get('success'):
+                    done.add(index)
+                    aggregate.add(result)
+            print(f"[eval] Resuming: {len(done)} records already evaluated, {len(latest) - len(done)} failed ones to retry")
+        elif checkpoint_file.exists():
+            checkpoint_file.unlink()
         
-        for i, record in enumerate(val_records):
-            print(f"[eval] Processing record {i+1}/{len(val_records)}")
-            
+        total = sum(1 for _ in _iter_records(validation_file))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        
+        async def produce():
+            for i, record in enumerate(_iter_records(validation_file)):
+                if i not in done:
+                    await queue.put((i, record))
+            for _ in range(concurrency):
+                await queue.put(None)
+        
+        async def evaluate_one(i: int, record: Dict[str, Any]) -> Dict[str, Any]:
             try:
+                await limiter.acquire()
                 # Generate prediction
                 response = await adapter.generate(
                     prompt=record['prompt'],
@@ -67,6 +192,7 @@ class EvaluationPipeline:
                 
                 # Compute metrics
                 record_metrics = {
+                    'index': i,
                     'latency_ms': response.latency_ms,
                     'tokens_in': response.tokens_in,
                     'tokens_out': response.tokens_out,
@@ -80,28 +206,34 @@ class EvaluationPipeline:
                     try:
                         json.loads(response.content)
                         record_metrics['json_valid'] = True
-                        json_valid_count += 1
                     except:
                         record_metrics['json_valid'] = False
                 
-                total_latency += response.latency_ms or 0
-                total_tokens_in += response.tokens_in or 0
-                total_tokens_out += response.tokens_out or 0
-                
-                results.append(record_metrics)
+                return record_metrics
                 
             except Exception as e:
                 print(f"[eval] ❌ Error on record {i}: {str(e)}")
-                results.append({
+                return {
+                    'index': i,
                     'success': False,
                     'error': str(e),
                     'prediction': None,
                     'ground_truth': record.get('response')
-                })
+                }
         
-        # Aggregate metrics
-        successful_count = sum(1 for r in results if r.get('success'))
-        success_rate = successful_count / len(results) if results else 0
+        with open(checkpoint_file, 'a') as checkpoint:
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    result = await evaluate_one(*item)
+                    checkpoint.write(json.dumps(result) + '\n')
+                    checkpoint.flush()
+                    aggregate.add(result)
+                    print(f"[eval] Processed record {item[0] + 1}/{total} ({aggregate.count}/{total} done)")
+            
+            await asyncio.gather(produce(), *(worker() for _ in range(concurrency)))
         
         evaluation = {
             "model": {
@@ -110,29 +242,21 @@ class EvaluationPipeline:
             },
             "dataset": {
                 "file": validation_file,
-                "record_count": len(val_records)
-            },
-            "metrics": {
-                "success_rate": success_rate,
-                "avg_latency_ms": total_latency / successful_count if successful_count > 0 else None,
-                "total_tokens_in": total_tokens_in,
-                "total_tokens_out": total_tokens_out,
-                "avg_tokens_in": total_tokens_in / successful_count if successful_count > 0 else None,
-                "avg_tokens_out": total_tokens_out / successful_count if successful_count > 0 else None,
-                "json_validity_rate": json_valid_count / len(results) if results else 0
+                "record_count": total
             },
-            "results": results,
+            "metrics": aggregate.summary(),
+            "results_file": str(checkpoint_file),
             "evaluated_at": datetime.utcnow().isoformat()
         }
         
         # Save results
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        result_file = self.results_dir / f"eval_{provider}_{model_name}_{timestamp}.json"
+        result_file = self.results_dir / f"eval_{provider}_{safe_model}_{timestamp}.json"
         with open(result_file, 'w') as f:
             json.dump(evaluation, f, indent=2)
         
-        print(f"[eval] ✓ Evaluation complete: {success_rate:.1%} success rate")
-        print(f"[eval] ✓ Results saved to {result_file}")
+        print(f"[eval] ✓ Evaluation complete: {evaluation['metrics']['success_rate']:.1%} success rate")
+        print(f"[eval] ✓ Results saved to {result_file} (per-record: {checkpoint_file})")
         
         return evaluation
     
@@ -1,13 +1,21 @@
 """Training data pipeline - Export event store data to versioned datasets"""
 
+import io
 import json
 import gzip
+import time
+import hashlib
+import importlib.util
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from app.mlops.event_store import event_store
 
 
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+PROGRESS_EVERY = 10000  # records between progress lines
+
+
 class TrainingPipeline:
     """Export and version training datasets from event store"""
     
@@ -22,50 +30,66 @@ class TrainingPipeline:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         format: str = "jsonl",
-        compress: bool = True
+        compress: bool = True,
+        compression: str = "gzip",
+        resume: bool = False,
+        after_seq: int = 0
     ) -> Dict[str, Any]:
         """
         Export training dataset from event store
         
+        Single pass: records stream from the event store in commit order, are
+        converted on the fly and written straight into the (compressed) output.
+        
         Args:
             name: Dataset name (e.g. 'strategist_v1')
             call_type: Filter by call type ('strategist', 'planner', 'validator')
             start_date: ISO date string for filtering
             end_date: ISO date string for filtering
             format: Output format ('jsonl', 'openai', 'anthropic')
-            compress: Whether to gzip compress output
+            compress: Whether to compress output
+            compression: 'gzip' or 'zstd' (zstd needs the zstandard package)
+            resume: Only export calls newer than the last export of this dataset
+            after_seq: Only export calls committed after this seq (see event_store)
             
         Returns:
             Export metadata
         """
+        if resume:
+            previous = self._latest_export(name, call_type, format)
+            if previous:
+                # Exports from before seq existed recorded ids, which equal seq for those rows
+                after_seq = max(after_seq, previous.get("last_seq", previous.get("last_id")) or 0)
+                print(f"[training] Resuming {name} after seq {after_seq}")
+        
+        if compress and compression == "zstd" and not ZSTD_AVAILABLE:
+            print("[training] ⚠️ zstandard not installed, falling back to gzip")
+            compression = "gzip"
+        
         version = datetime.now().strftime("%Y%m%d_%H%M%S")
         base_filename = f"{name}_{version}"
+        suffix = f"_{format}" if format in ("openai", "anthropic") else ""
+        final_file = self.output_dir / f"{base_filename}{suffix}.jsonl"
+        if compress:
+            final_file = Path(str(final_file) + (".zst" if compression == "zstd" else ".gz"))
         
-        # Export raw data
-        temp_file = self.output_dir / f"{base_filename}.jsonl"
-        record_count = event_store.export_training_data(
-            output_path=str(temp_file),
-            call_type=call_type,
-            start_date=start_date,
-            end_date=end_date
-        )
-        
-        # Convert format if needed
-        if format in ("openai", "anthropic"):
-            formatted_file = self.output_dir / f"{base_filename}_{format}.jsonl"
-            self._convert_format(temp_file, formatted_file, format)
-            final_file = formatted_file
-        else:
-            final_file = temp_file
+        # Write to a temp name so an interrupted export never looks complete
+        partial_file = final_file.with_name(final_file.name + ".partial")
+        record_count = 0
+        last_seq = after_seq
+        start = time.time()
+        with self._open_output(partial_file, compress, compression) as f_out:
+            for record in event_store.iter_training_records(call_type, start_date, end_date, after_seq=after_seq):
+                f_out.write(json.dumps(self._convert_record(record, format)) + '\n')
+                record_count += 1
+                last_seq = record["seq"]
+                if record_count % PROGRESS_EVERY == 0:
+                    rate = record_count / max(time.time() - start, 1e-6)
+                    print(f"[training] {record_count} records ({rate:.0f} records/sec)")
+        partial_file.rename(final_file)
         
-        # Compress if requested
-        if compress:
-            compressed_file = Path(str(final_file) + ".gz")
-            with open(final_file, 'rb') as f_in:
-                with gzip.open(compressed_file, 'wb') as f_out:
-                    f_out.writelines(f_in)
-            final_file.unlink()  # Remove uncompressed
-            final_file = compressed_file
+        duration = time.time() - start
+        records_per_sec = record_count / duration if duration > 0 else 0
         
         # Save metadata
         metadata = {
@@ -76,7 +100,12 @@ class TrainingPipeline:
             "end_date": end_date,
             "format": format,
             "compressed": compress,
+            "compression": compression if compress else None,
             "record_count": record_count,
+            "after_seq": after_seq,
+            "last_seq": last_seq,
+            "duration_sec": round(duration, 3),
+            "records_per_sec": round(records_per_sec, 1),
             "file_path": str(final_file),
             "created_at": datetime.utcnow().isoformat()
         }
@@ -85,77 +114,246 @@ class TrainingPipeline:
         with open(metadata_file, 'w') as f:
             json.dump(metadata, f, indent=2)
         
-        print(f"[training] ✓ Exported {record_count} records to {final_file}")
+        print(f"[training] ✓ Exported {record_count} records to {final_file} ({records_per_sec:.0f} records/sec)")
         
         return metadata
     
-    def _convert_format(self, input_file: Path, output_file: Path, format: str):
-        """Convert raw JSONL to provider-specific format"""
-        with open(input_file, 'r') as f_in:
-            with open(output_file, 'w') as f_out:
-                for line in f_in:
-                    record = json.loads(line)
-                    
-                    if format == "openai":
-                        # OpenAI fine-tuning format
-                        converted = {
-                            "messages": [
-                                {"role": "user", "content": record["prompt"]},
-                                {"role": "assistant", "content": record["response"]}
-                            ]
-                        }
-                    elif format == "anthropic":
-                        # Anthropic fine-tuning format
-                        converted = {
-                            "prompt": record["prompt"],
-                            "completion": record["response"]
-                        }
-                    else:
-                        converted = record
-                    
-                    f_out.write(json.dumps(converted) + '\n')
+    @staticmethod
+    def _open_output(path: Path, compress: bool, compression: str, append: bool = False):
+        """Text-mode writer for plain, gzip or zstd output (appending adds a new gzip member / zstd frame)"""
+        mode = 'a' if append else 'w'
+        if not compress:
+            return open(path, mode)
+        if compression == "zstd":
+            import zstandard
+            return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, mode + 'b')), encoding="utf-8")
+        return gzip.open(path, mode + 't')
+    
+    def _latest_export(self, name: str, call_type: Optional[str], format: str) -> Optional[Dict[str, Any]]:
+        """Most recent export of the same dataset (name, call type and format)"""
+        for meta in self.list_datasets():
+            if meta["name"] == name and meta.get("call_type") == call_type and meta.get("format") == format:
+                return meta
+        return None
+    
+    def _convert_record(self, record: Dict[str, Any], format: str) -> Dict[str, Any]:
+        """Convert a raw record to provider-specific format"""
+        if format == "openai":
+            # OpenAI fine-tuning format
+            return {
+                "messages": [
+                    {"role": "user", "content": record["prompt"]},
+                    {"role": "assistant", "content": record["response"]}
+                ]
+            }
+        elif format == "anthropic":
+            # Anthropic fine-tuning format
+            return {
+                "prompt": record["prompt"],
+                "completion": record["response"]
+            }
+        return record
     
     def create_train_val_split(
         self,
         dataset_path: str,
         train_ratio: float = 0.8,
-        seed: int = 42
-    ) -> Dict[str, str]:
-        """Split dataset into train/validation sets"""
-        import random
-        random.seed(seed)
-        
-        dataset = Path(dataset_path)
-        base_name = dataset.stem.replace('.jsonl', '')
+        seed: int = 42,
+        key: str = "prompt",
+        k_folds: Optional[int] = None,
+        stratify_by: Optional[str] = None,
+        compress: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Split a dataset into train/val (or k folds) in one streaming pass
         
-        # Read all records
-        with open(dataset, 'r') as f:
-            records = f.readlines()
+        Each record goes to a split by a stable hash of its key, so splits are
+        reproducible across runs, exports and input orderings, and duplicates
+        of a prompt can't leak across splits.
         
-        # Shuffle and split
-        random.shuffle(records)
-        split_idx = int(len(records) * train_ratio)
-        train_records = records[:split_idx]
-        val_records = records[split_idx:]
+        With stratify_by the hash is salted per stratum, which keeps every
+        stratum near the requested fractions. A stratum large enough to owe a
+        split at least one record but hashed none into it gets one: the key
+        whose hash lies closest to that split's range is moved there (all its
+        copies), in a second pass over only the affected files. Memory stays
+        O(strata x splits) - independent of dataset size.
         
-        # Write splits
-        train_file = dataset.parent / f"{base_name}_train.jsonl"
-        val_file = dataset.parent / f"{base_name}_val.jsonl"
+        Args:
+            dataset_path: JSONL dataset (.gz / .zst read transparently)
+            train_ratio: Fraction of records in train (ignored for k-fold)
+            seed: Hash salt - change it to draw a different split
+            key: 'prompt' (content hash) or 'id'
+            k_folds: Write k fold files instead of train/val
+            stratify_by: Record field (e.g. 'call_type') to balance splits within, with per-stratum counts
+            compress: Compress outputs (defaults to matching the input)
+        """
+        dataset = Path(dataset_path)
+        compression = {".gz": "gzip", ".zst": "zstd"}.get(dataset.suffix)
+        if compress is None:
+            compress = compression is not None
+        out_compression = compression or "gzip"
+        base_name = dataset.name
+        for ext in (".gz", ".zst", ".jsonl"):
+            base_name = base_name[:-len(ext)] if base_name.endswith(ext) else base_name
+        out_suffix = ".jsonl" + ({"gzip": ".gz", "zstd": ".zst"}[out_compression] if compress else "")
         
-        with open(train_file, 'w') as f:
-            f.writelines(train_records)
+        if k_folds:
+            names = [f"fold{i}" for i in range(k_folds)]
+        else:
+            names = ["train", "val"]
+        paths = {n: dataset.parent / f"{base_name}_{n}{out_suffix}" for n in names}
+        ranges = self._split_ranges(names, train_ratio, k_folds)
+        counts = {n: 0 for n in names}
+        by_stratum: Dict[str, Dict[str, int]] = {}
+        # stratum -> split -> (distance, hash) of the key closest to that split's range (from outside it)
+        nearest: Dict[str, Dict[str, Tuple[float, float]]] = {}
         
-        with open(val_file, 'w') as f:
-            f.writelines(val_records)
+        outputs = {n: self._open_output(paths[n], compress, out_compression) for n in names}
+        try:
+            with self._open_input(dataset) as f_in:
+                for line in f_in:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    stratum = str(record.get(stratify_by, "unknown")) if stratify_by else ""
+                    h = self._split_hash(seed, stratum, self._split_key(record, key, line))
+                    name = self._split_for(h, ranges)
+                    if stratify_by:
+                        by_stratum.setdefault(stratum, {n: 0 for n in names})[name] += 1
+                        closest = nearest.setdefault(stratum, {})
+                        for target, (lo, hi) in ranges.items():
+                            if target != name:
+                                candidate = (lo - h if h < lo else h - hi, h)
+                                if target not in closest or candidate < closest[target]:
+                                    closest[target] = candidate
+                    outputs[name].write(line if line.endswith('\n') else line + '\n')
+                    counts[name] += 1
+        finally:
+            for f_out in outputs.values():
+                f_out.close()
         
-        print(f"[training] ✓ Split: {len(train_records)} train, {len(val_records)} val")
+        moves = self._missing_split_moves(by_stratum, nearest, ranges)
+        if moves:
+            moved = self._move_records(
+                paths, moves, ranges, seed, key, stratify_by, compress, out_compression
+            )
+            for (stratum, source, target), n in moved.items():
+                counts[source] -= n
+                counts[target] += n
+                by_stratum[stratum][source] -= n
+                by_stratum[stratum][target] += n
+            print(f"[training] Moved {sum(moved.values())} records into splits small strata were missing")
         
-        return {
-            "train": str(train_file),
-            "val": str(val_file),
-            "train_count": len(train_records),
-            "val_count": len(val_records)
-        }
+        if k_folds:
+            print(f"[training] ✓ {k_folds}-fold split: {', '.join(str(counts[n]) for n in names)}")
+            result = {
+                "folds": [str(paths[n]) for n in names],
+                "fold_counts": [counts[n] for n in names]
+            }
+        else:
+            print(f"[training] ✓ Split: {counts['train']} train, {counts['val']} val")
+            result = {
+                "train": str(paths["train"]),
+                "val": str(paths["val"]),
+                "train_count": counts["train"],
+                "val_count": counts["val"]
+            }
+        if stratify_by:
+            result["by_stratum"] = by_stratum
+        return result
+    
+    @staticmethod
+    def _split_key(record: Dict[str, Any], key: str, line: str) -> str:
+        """Value a record is hashed on (prompt text in any export format, or id)"""
+        if key == "id" and record.get("id") is not None:
+            return str(record["id"])
+        if record.get("prompt") is not None:
+            return record["prompt"]
+        messages = record.get("messages")
+        if messages:
+            return messages[0].get("content") or ""
+        return line
+    
+    @staticmethod
+    def _split_hash(seed: int, stratum: str, value: str) -> float:
+        """Stable hash of (seed, stratum, value) mapped to [0, 1)"""
+        digest = hashlib.sha256(f"{seed}\x00{stratum}\x00{value}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+    
+    @staticmethod
+    def _split_ranges(names: List[str], train_ratio: float, k_folds: Optional[int]) -> Dict[str, Tuple[float, float]]:
+        """Hash range [lo, hi) owned by each split"""
+        if k_folds:
+            return {n: (i / k_folds, (i + 1) / k_folds) for i, n in enumerate(names)}
+        return {"train": (0.0, train_ratio), "val": (train_ratio, 1.0)}
+    
+    @staticmethod
+    def _split_for(h: float, ranges: Dict[str, Tuple[float, float]]) -> str:
+        return next((n for n, (lo, hi) in ranges.items() if h < hi), list(ranges)[-1])
+    
+    def _missing_split_moves(
+        self,
+        by_stratum: Dict[str, Dict[str, int]],
+        nearest: Dict[str, Dict[str, Tuple[float, float]]],
+        ranges: Dict[str, Tuple[float, float]]
+    ) -> Dict[Tuple[str, float], str]:
+        """(stratum, key hash) -> split, for strata owing a split at least one record but holding none"""
+        moves = {}
+        for stratum, stratum_counts in by_stratum.items():
+            total = sum(stratum_counts.values())
+            for target, (lo, hi) in ranges.items():
+                if stratum_counts[target] or total * (hi - lo) < 1 - 1e-9 or target not in nearest[stratum]:
+                    continue
+                h = nearest[stratum][target][1]
+                source = self._split_for(h, ranges)
+                # Never empty the donor split or move one key twice
+                if (stratum, h) in moves or stratum_counts[source] <= 1:
+                    continue
+                moves[(stratum, h)] = target
+        return moves
+    
+    def _move_records(
+        self,
+        paths: Dict[str, Path],
+        moves: Dict[Tuple[str, float], str],
+        ranges: Dict[str, Tuple[float, float]],
+        seed: int,
+        key: str,
+        stratify_by: str,
+        compress: bool,
+        compression: str
+    ) -> Dict[Tuple[str, str, str], int]:
+        """Second pass: rewrite donor splits without the moved keys and append them to their targets"""
+        sources = {self._split_for(h, ranges) for _, h in moves}
+        moved_lines: Dict[str, List[str]] = {}
+        moved: Dict[Tuple[str, str, str], int] = {}
+        for source in sources:
+            tmp = paths[source].with_name(paths[source].name + ".tmp")
+            with self._open_input(paths[source]) as f_in, self._open_output(tmp, compress, compression) as f_out:
+                for line in f_in:
+                    record = json.loads(line)
+                    stratum = str(record.get(stratify_by, "unknown"))
+                    target = moves.get((stratum, self._split_hash(seed, stratum, self._split_key(record, key, line))))
+                    if target is None:
+                        f_out.write(line)
+                        continue
+                    moved_lines.setdefault(target, []).append(line)
+                    moved[(stratum, source, target)] = moved.get((stratum, source, target), 0) + 1
+            tmp.replace(paths[source])
+        for target, lines in moved_lines.items():
+            with self._open_output(paths[target], compress, compression, append=True) as f_out:
+                f_out.writelines(lines)
+        return moved
+    
+    @staticmethod
+    def _open_input(path: Path):
+        """Text-mode reader for plain, gzip or zstd datasets"""
+        if path.suffix == ".gz":
+            return gzip.open(path, 'rt')
+        if path.suffix == ".zst":
+            import zstandard
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')), encoding="utf-8")
+        return open(path, 'r')
     
     def list_datasets(self) -> List[Dict[str, Any]]:
         """List all exported datasets"""
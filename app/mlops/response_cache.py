@@ -0,0 +1,255 @@
+"""Response cache - Content-addressed cache for deterministic model calls"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+from contextlib import contextmanager, closing
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("MLOPS_RESPONSE_CACHE", "false").lower() == "true"
+RESPONSE_CACHE_TTL = float(os.getenv("MLOPS_RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("MLOPS_RESPONSE_CACHE_MAX_ENTRIES", "1000"))  # in-memory tier
+RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("MLOPS_RESPONSE_CACHE_MAX_TEMPERATURE", "0.3"))
+
+
+class ResponseCache:
+    """
+    Two-tier cache of model responses keyed by request content
+
+    Memory tier: bounded LRU of recent entries.
+    Persistent tier: SQLite table surviving restarts (data/mlops/response_cache.db),
+    created on first read/write - never at import, so a disabled cache leaves no file.
+    Both tiers honour per-entry TTLs.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/mlops/response_cache.db",
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl: float = RESPONSE_CACHE_TTL
+    ):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()  # key -> (expires_at, entry)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "bypassed": 0, "expired": 0}
+        self._db_ready = False
+        self._db_lock = threading.Lock()
+
+    def _init_db(self, conn: sqlite3.Connection):
+        """Initialize cache schema"""
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens_in INTEGER,
+                tokens_out INTEGER,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache(expires_at);
+        """)
+
+    def _db_exists(self) -> bool:
+        """False until the cache has written anything (reads of stats/purge then skip SQLite)"""
+        return self._db_ready or self.db_path.exists()
+
+    @contextmanager
+    def _get_conn(self):
+        """Context manager for database connections (creates the database on first use)"""
+        if not self._db_ready:
+            with self._db_lock:
+                if not self._db_ready:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    with closing(sqlite3.connect(self.db_path)) as conn:
+                        self._init_db(conn)
+                        conn.commit()
+                    self._db_ready = True
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    @staticmethod
+    def hash_prompt(prompt: str) -> str:
+        """SHA256 of the prompt (same hash the event store uses for prompts)"""
+        return hashlib.sha256(prompt.encode()).hexdigest()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        prompt_hash: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Content address of a request: every input that can change the response"""
+        material = json.dumps(
+            [provider, model, prompt_hash, temperature, max_tokens, json_mode, extra or {}],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._memory.get(key)
+        if item is None:
+            return None
+        expires_at, entry = item
+        if expires_at < time.time():
+            del self._memory[key]
+            self.stats["expired"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return entry
+
+    def _memory_put(self, key: str, expires_at: float, entry: Dict[str, Any]):
+        self._memory[key] = (expires_at, entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Persistent tier
+    # ------------------------------------------------------------------
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT content, tokens_in, tokens_out, expires_at FROM response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["expires_at"] < time.time():
+                conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.stats["expired"] += 1
+                return None
+            conn.execute("UPDATE response_cache SET hits = hits + 1 WHERE key = ?", (key,))
+        return row["expires_at"], {
+            "content": row["content"],
+            "tokens_in": row["tokens_in"],
+            "tokens_out": row["tokens_out"]
+        }
+
+    def _disk_put(self, key: str, provider: str, model: str, prompt_hash: str, entry: Dict[str, Any], expires_at: float):
+        with self._get_conn() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO response_cache
+                   (key, provider, model, prompt_hash, content, tokens_in, tokens_out, created_at, expires_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    key, provider, model, prompt_hash,
+                    entry["content"], entry["tokens_in"], entry["tokens_out"],
+                    time.time(), expires_at
+                )
+            )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response (memory first, then disk)"""
+        entry = self._memory_get(key)
+        if entry is not None:
+            self.stats["memory_hits"] += 1
+            return entry
+
+        found = await asyncio.to_thread(self._disk_get, key)
+        if found is not None:
+            expires_at, entry = found
+            self._memory_put(key, expires_at, entry)
+            self.stats["disk_hits"] += 1
+            return entry
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(
+        self,
+        key: str,
+        provider: str,
+        model: str,
+        prompt_hash: str,
+        content: str,
+        tokens_in: Optional[int] = None,
+        tokens_out: Optional[int] = None,
+        ttl: Optional[float] = None
+    ):
+        """Store a response in both tiers"""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        entry = {"content": content, "tokens_in": tokens_in, "tokens_out": tokens_out}
+        self._memory_put(key, expires_at, entry)
+        await asyncio.to_thread(self._disk_put, key, provider, model, prompt_hash, entry, expires_at)
+        self.stats["stores"] += 1
+
+    def record_bypass(self):
+        """Count a call that was not cacheable (e.g. temperature too high)"""
+        self.stats["bypassed"] += 1
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from both tiers"""
+        now = time.time()
+        for key in [k for k, (expires_at, _) in self._memory.items() if expires_at < now]:
+            del self._memory[key]
+        if not self._db_exists():
+            return 0
+        with self._get_conn() as conn:
+            removed = conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,)).rowcount
+        print(f"[cache] Purged {removed} expired responses")
+        return removed
+
+    def clear(self):
+        """Drop every cached response"""
+        self._memory.clear()
+        if not self._db_exists():
+            return
+        with self._get_conn() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for both tiers"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        disk_entries = 0
+        if self._db_exists():
+            with self._get_conn() as conn:
+                disk_entries = conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0,
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.max_entries,
+            "disk_entries": disk_entries,
+            "ttl_seconds": self.ttl
+        }
+
+
+# Global singleton
+response_cache = ResponseCache()
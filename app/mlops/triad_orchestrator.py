@@ -3,10 +3,11 @@
 import time
 import json
 import uuid
+import asyncio
 from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 
-from app.mlops.adapters import get_model_adapter
+from app.mlops.adapters import get_model_adapter, ModelResponse
 from app.mlops.event_store import event_store
 from app.core.config import settings
 
@@ -45,22 +46,27 @@ class TriadOrchestrator:
             timeout=settings.TRIAD_VALIDATOR_TIMEOUT_MS / 1000
         )
     
-    async def execute(self, user_context: Dict[str, Any]) -> Dict[str, Any]:
+    async def execute(self, user_context: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute the full Triad pipeline
         
         Args:
             user_context: Driver context including GPS, weather, time, etc.
+            mode: 'serial' or 'speculative' (defaults to TRIAD_EXECUTION_MODE)
             
         Returns:
             Final validated output or raises exception on failure
         """
+        if (mode or settings.TRIAD_EXECUTION_MODE) == "speculative":
+            return await self._execute_speculative(user_context)
+        
         job_id = str(uuid.uuid4())
         start_time = time.time()
         
         strategist_call_id = None
         planner_call_id = None
         validator_call_id = None
+        strategy_response = planning_response = validation_response = None
         error_stage = None
         
         try:
@@ -85,7 +91,8 @@ class TriadOrchestrator:
                 tokens_in=strategy_response.tokens_in,
                 tokens_out=strategy_response.tokens_out,
                 success=True,
-                metadata={"job_id": job_id}
+                metadata={"job_id": job_id},
+                cached=strategy_response.cached
             )
             
             print(f"[triad:{job_id}] ✓ Strategy generated ({strategy_response.latency_ms}ms)")
@@ -112,7 +119,8 @@ class TriadOrchestrator:
                 tokens_in=planning_response.tokens_in,
                 tokens_out=planning_response.tokens_out,
                 success=True,
-                metadata={"job_id": job_id}
+                metadata={"job_id": job_id},
+                cached=planning_response.cached
             )
             
             print(f"[triad:{job_id}] ✓ Plan generated ({planning_response.latency_ms}ms)")
@@ -145,7 +153,8 @@ class TriadOrchestrator:
                 tokens_in=validation_response.tokens_in,
                 tokens_out=validation_response.tokens_out,
                 success=True,
-                metadata={"job_id": job_id}
+                metadata={"job_id": job_id},
+                cached=validation_response.cached
             )
             
             print(f"[triad:{job_id}] ✓ Validation complete ({validation_response.latency_ms}ms)")
@@ -175,9 +184,7 @@ class TriadOrchestrator:
             
             # Log metrics
             event_store.log_metric("latency", "triad_total", total_latency)
-            event_store.log_metric("latency", "strategist", strategy_response.latency_ms)
-            event_store.log_metric("latency", "planner", planning_response.latency_ms)
-            event_store.log_metric("latency", "validator", validation_response.latency_ms)
+            self._log_stage_latencies(strategy_response, planning_response, validation_response)
             
             print(f"[triad:{job_id}] ✅ Pipeline complete ({total_latency}ms total)")
             
@@ -185,9 +192,9 @@ class TriadOrchestrator:
             
         except Exception as e:
             error_stage = self._determine_error_stage(
-                strategist_call_id,
-                planner_call_id,
-                validator_call_id
+                strategy_response,
+                planning_response,
+                validation_response
             )
             
             total_latency = int((time.time() - start_time) * 1000)
@@ -214,6 +221,189 @@ class TriadOrchestrator:
             else:
                 return {"error": str(e), "stage": error_stage}
     
+    async def _execute_speculative(self, user_context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Speculative Triad: strategist and planner run in parallel from the raw
+        context, then the validator reconciles the plan against the strategy.
+        
+        A failed stage cancels whatever is still running. Any plan that parses
+        goes to the validator, as in serial mode, so both modes accept the same
+        plans. Stage
+        overlap and the wall-clock saved vs. the serial path go to log_metric.
+        """
+        job_id = str(uuid.uuid4())
+        start_time = time.time()
+        
+        call_ids: Dict[str, Optional[int]] = {"strategist": None, "planner": None, "validator": None}
+        spans: Dict[str, Tuple[float, float]] = {}
+        tasks = []
+        error_stage = "initialization"
+        
+        async def timed(stage: str, call):
+            t0 = time.time()
+            result = await call
+            spans[stage] = (t0, time.time())
+            return result
+        
+        try:
+            # Stages 1+2 in parallel: Strategy (Claude) ∥ Plan from raw context (GPT-5)
+            print(f"[triad:{job_id}] Stages 1+2/3: Strategy ∥ Planning (speculative)")
+            strategy_prompt = self._build_strategy_prompt(user_context)
+            planning_prompt = self._build_planning_prompt(
+                user_context,
+                "Not yet available - plan directly from the driver context below."
+            )
+            
+            strategy_task = asyncio.create_task(timed("strategist", self.strategist.generate(
+                prompt=strategy_prompt,
+                temperature=settings.TRIAD_STRATEGIST_TEMPERATURE,
+                max_tokens=settings.TRIAD_STRATEGIST_MAX_OUTPUT_TOKENS
+            )))
+            planning_task = asyncio.create_task(timed("planner", self.planner.generate_json(
+                prompt=planning_prompt,
+                temperature=settings.TRIAD_PLANNER_TEMPERATURE,
+                max_tokens=settings.TRIAD_PLANNER_MAX_OUTPUT_TOKENS,
+                reasoning_effort="extended"
+            )))
+            tasks = [strategy_task, planning_task]
+            
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is strategy_task:
+                        error_stage = "strategist"
+                        strategy_response = task.result()
+                        call_ids["strategist"] = self._log_call(
+                            self.strategist, "strategist", strategy_prompt, strategy_response,
+                            job_id, mode="speculative"
+                        )
+                        print(f"[triad:{job_id}] ✓ Strategy generated ({strategy_response.latency_ms}ms)")
+                    else:
+                        error_stage = "planner"
+                        planning_response = task.result()
+                        call_ids["planner"] = self._log_call(
+                            self.planner, "planner", planning_prompt, planning_response,
+                            job_id, mode="speculative"
+                        )
+                        print(f"[triad:{job_id}] ✓ Plan generated ({planning_response.latency_ms}ms)")
+                        try:
+                            plan_data = json.loads(planning_response.content)
+                        except json.JSONDecodeError as e:
+                            raise ValueError(f"Planner returned invalid JSON: {e}")
+            
+            # Stage 3: Validation & reconciliation (Gemini)
+            error_stage = "validator"
+            print(f"[triad:{job_id}] Stage 3/3: Validation + reconciliation")
+            validation_prompt = self._build_validation_prompt(user_context, plan_data, strategy_response.content)
+            validation_response = await timed("validator", self.validator.generate_json(
+                prompt=validation_prompt,
+                temperature=settings.TRIAD_VALIDATOR_TEMPERATURE,
+                max_tokens=settings.TRIAD_VALIDATOR_MAX_OUTPUT_TOKENS,
+                reasoning_effort="low"
+            ))
+            call_ids["validator"] = self._log_call(
+                self.validator, "validator", validation_prompt, validation_response,
+                job_id, mode="speculative"
+            )
+            print(f"[triad:{job_id}] ✓ Validation complete ({validation_response.latency_ms}ms)")
+            
+            try:
+                final_output = json.loads(validation_response.content)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Validator returned invalid JSON: {e}")
+            
+            self._check_invariants(final_output)
+            
+            total_latency = int((time.time() - start_time) * 1000)
+            
+            event_store.log_triad_job(
+                job_id=job_id,
+                user_context=user_context,
+                strategist_call_id=call_ids["strategist"],
+                planner_call_id=call_ids["planner"],
+                validator_call_id=call_ids["validator"],
+                final_output=final_output,
+                success=True,
+                total_latency_ms=total_latency
+            )
+            
+            # Overlap timings: how much wall-clock the parallel stages saved
+            (s_start, s_end), (p_start, p_end) = spans["strategist"], spans["planner"]
+            overlap_ms = max(0, int((min(s_end, p_end) - max(s_start, p_start)) * 1000))
+            serial_estimate_ms = int(sum(end - begin for begin, end in spans.values()) * 1000)
+            labels = {"mode": "speculative"}
+            event_store.log_metric("latency", "triad_total", total_latency, labels)
+            self._log_stage_latencies(strategy_response, planning_response, validation_response, labels)
+            event_store.log_metric("latency", "triad_stage_overlap", overlap_ms, labels)
+            event_store.log_metric("latency", "triad_serial_estimate", serial_estimate_ms, labels)
+            event_store.log_metric("latency", "triad_saved", serial_estimate_ms - total_latency, labels)
+            
+            print(f"[triad:{job_id}] ✅ Pipeline complete ({total_latency}ms total, {overlap_ms}ms overlapped)")
+            
+            return final_output
+            
+        except Exception as e:
+            cancelled = [t for t in tasks if not t.done()]
+            for task in cancelled:
+                task.cancel()
+            if cancelled:
+                await asyncio.gather(*cancelled, return_exceptions=True)
+                print(f"[triad:{job_id}] Cancelled {len(cancelled)} remaining stage(s)")
+            
+            total_latency = int((time.time() - start_time) * 1000)
+            
+            event_store.log_triad_job(
+                job_id=job_id,
+                user_context=user_context,
+                strategist_call_id=call_ids["strategist"],
+                planner_call_id=call_ids["planner"],
+                validator_call_id=call_ids["validator"],
+                final_output=None,
+                success=False,
+                total_latency_ms=total_latency,
+                error_stage=error_stage
+            )
+            
+            event_store.log_metric("error_rate", f"triad_{error_stage}", 1.0, {"mode": "speculative"})
+            
+            print(f"[triad:{job_id}] ❌ Pipeline failed at {error_stage}: {str(e)}")
+            
+            if settings.TRIAD_FAIL_ON_INVALID:
+                raise
+            else:
+                return {"error": str(e), "stage": error_stage}
+    
+    def _log_call(
+        self,
+        adapter,
+        call_type: str,
+        prompt: str,
+        response,
+        job_id: str,
+        **metadata
+    ) -> Optional[int]:
+        """Log a successful stage call to the event store (cache hits aren't logged)"""
+        return event_store.log_model_call(
+            model_provider=adapter.provider_name,
+            model_name=adapter.model_name,
+            call_type=call_type,
+            prompt=prompt,
+            response=response.content,
+            latency_ms=response.latency_ms,
+            tokens_in=response.tokens_in,
+            tokens_out=response.tokens_out,
+            success=True,
+            metadata={"job_id": job_id, **metadata},
+            cached=response.cached
+        )
+    
+    def _log_stage_latencies(self, strategy, plan, validation, labels: Optional[Dict[str, str]] = None):
+        """Per-stage latency metrics, leaving out stages served from the response cache"""
+        for stage, response in (("strategist", strategy), ("planner", plan), ("validator", validation)):
+            if not response.cached:
+                event_store.log_metric("latency", stage, response.latency_ms, labels)
+    
     def _build_strategy_prompt(self, context: Dict[str, Any]) -> str:
         """Build prompt for strategic analysis stage"""
         return f"""You are a rideshare strategy expert analyzing current market conditions.
@@ -288,13 +478,26 @@ Respond with JSON:
   ]
 }}"""
 
-    def _build_validation_prompt(self, context: Dict[str, Any], plan: Dict[str, Any]) -> str:
-        """Build prompt for validation stage"""
+    def _build_validation_prompt(
+        self,
+        context: Dict[str, Any],
+        plan: Dict[str, Any],
+        strategy: Optional[str] = None
+    ) -> str:
+        """Build prompt for validation stage (strategy given when reconciling a speculative plan)"""
+        reconcile = f"""
+STRATEGIC ANALYSIS (produced in parallel with the plan):
+{strategy}
+
+RECONCILIATION:
+- The plan was made without the strategy above; adjust venues, staging area and reasoning where they conflict with it
+""" if strategy else ""
+        
         return f"""You are a quality assurance validator for rideshare recommendations.
 
 TACTICAL PLAN:
 {json.dumps(plan, indent=2)}
-
+{reconcile}
 VALIDATION TASKS:
 1. Check JSON structure (all required fields present)
 2. Verify venue count (minimum 4 venues)
@@ -337,16 +540,16 @@ Respond with the VALIDATED and CORRECTED JSON plan in the exact same format."""
     
     def _determine_error_stage(
         self,
-        strategist_id: Optional[int],
-        planner_id: Optional[int],
-        validator_id: Optional[int]
+        strategy: Optional[ModelResponse],
+        plan: Optional[ModelResponse],
+        validation: Optional[ModelResponse]
     ) -> str:
-        """Determine which stage failed"""
-        if validator_id:
+        """Determine which stage failed (from stage responses: cached stages have no call id)"""
+        if validation is not None:
             return "validator"
-        elif planner_id:
+        elif plan is not None:
             return "planner"
-        elif strategist_id:
+        elif strategy is not None:
             return "strategist"
         else:
             return "initialization"
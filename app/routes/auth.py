@@ -1,19 +1,22 @@
 """
 Authentication routes with GitHub OAuth and username/password support
 """
+import time
 import secrets
 import hashlib
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse, JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from authlib.integrations.starlette_client import OAuth
 import httpx
 
-from app.core.config import settings, get_db
+from app.core.config import settings, get_async_db
 from app.models.auth import User, AuthSession
+from app.services.session_cache import session_cache
 
 
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -61,7 +64,7 @@ def generate_session_token() -> str:
     return secrets.token_urlsafe(32)
 
 
-def create_session(db: Session, user_id: int, github_token: Optional[str] = None) -> AuthSession:
+async def create_session(db: AsyncSession, user_id: int, github_token: Optional[str] = None) -> AuthSession:
     """Create a new auth session for a user"""
     session_token = generate_session_token()
     expires_at = datetime.utcnow() + timedelta(days=30)
@@ -73,16 +76,16 @@ def create_session(db: Session, user_id: int, github_token: Optional[str] = None
         expires_at=expires_at
     )
     db.add(session)
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
 
 async def get_current_session(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> tuple[User, AuthSession]:
-    """Dependency to get the current authenticated user and session"""
+    """Dependency to get the current authenticated user and session (cached per token)"""
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(
@@ -91,34 +94,48 @@ async def get_current_session(
         )
     
     token = auth_header.replace("Bearer ", "")
+    start = time.perf_counter()
     
-    session = db.query(AuthSession).filter(
-        AuthSession.session_token == token,
-        AuthSession.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired session"
-        )
-    
-    user = db.query(User).filter(User.id == session.user_id).first()
-    if not user or not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found or inactive"
-        )
+    cached = session_cache.get(token)
+    if cached:
+        user, session = cached
+    else:
+        session = (await db.execute(
+            select(AuthSession).where(
+                AuthSession.session_token == token,
+                AuthSession.expires_at > datetime.utcnow()
+            )
+        )).scalars().first()
+        
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired session"
+            )
+        
+        user = await db.get(User, session.user_id)
+        if not user or not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found or inactive"
+            )
+        
+        # Detach so the objects outlive this request's DB session in the cache
+        db.expunge(session)
+        db.expunge(user)
+        session_cache.put(token, user, session)
     
-    session.last_activity = datetime.utcnow()
-    db.commit()
+    # last_activity is written in periodic batches, not per request
+    if session_cache.touch(session):
+        session_cache.schedule_flush()
     
+    session_cache.record_auth((time.perf_counter() - start) * 1000, cached=cached is not None)
     return user, session
 
 
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Dependency to get the current authenticated user"""
     user, _ = await get_current_session(request, db)
@@ -128,12 +145,12 @@ async def get_current_user(
 @router.post("/register")
 async def register(
     data: RegisterRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register a new user with username/password"""
-    existing = db.query(User).filter(
-        (User.username == data.username) | (User.email == data.email)
-    ).first()
+    existing = (await db.execute(
+        select(User).where(or_(User.username == data.username, User.email == data.email))
+    )).scalars().first()
     
     if existing:
         raise HTTPException(
@@ -147,10 +164,10 @@ async def register(
         password_hash=hash_password(data.password)
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
-    session = create_session(db, user.id)
+    session = await create_session(db, user.id)
     
     return {
         "ok": True,
@@ -167,10 +184,12 @@ async def register(
 @router.post("/login")
 async def login(
     data: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login with username/password"""
-    user = db.query(User).filter(User.username == data.username).first()
+    user = (await db.execute(
+        select(User).where(User.username == data.username)
+    )).scalars().first()
     
     if not user or not user.password_hash:
         raise HTTPException(
@@ -190,7 +209,7 @@ async def login(
             detail="Account is inactive"
         )
     
-    session = create_session(db, user.id)
+    session = await create_session(db, user.id)
     
     return {
         "ok": True,
@@ -208,7 +227,7 @@ async def login(
 @router.post("/logout")
 async def logout(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Logout and invalidate session"""
     auth_header = request.headers.get("Authorization")
@@ -220,17 +239,26 @@ async def logout(
     
     token = auth_header.replace("Bearer ", "")
     
-    session = db.query(AuthSession).filter(
-        AuthSession.session_token == token
-    ).first()
+    session = (await db.execute(
+        select(AuthSession).where(AuthSession.session_token == token)
+    )).scalars().first()
     
     if session:
-        db.delete(session)
-        db.commit()
+        await db.delete(session)
+        await db.commit()
+    session_cache.invalidate(token)
     
     return {"ok": True, "message": "Logged out successfully"}
 
 
+@router.get("/stats")
+async def auth_stats(
+    user: User = Depends(get_current_user)
+):
+    """Session cache hit rate, batched last_activity writes and per-request auth time (signed-in users only)"""
+    return {"ok": True, "session_cache": session_cache.get_stats()}
+
+
 @router.get("/me")
 async def get_me(
     user: User = Depends(get_current_user)
@@ -265,7 +293,7 @@ async def github_oauth_start(request: Request):
 @router.get("/github/callback")
 async def github_oauth_callback(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Handle GitHub OAuth callback"""
     try:
@@ -307,7 +335,9 @@ async def github_oauth_callback(
             detail="GitHub username not found"
         )
     
-    user = db.query(User).filter(User.github_username == github_username).first()
+    user = (await db.execute(
+        select(User).where(User.github_username == github_username)
+    )).scalars().first()
     
     if user:
         user.email = github_email or user.email
@@ -321,10 +351,10 @@ async def github_oauth_callback(
         )
         db.add(user)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
-    session = create_session(db, user.id, github_token=access_token)
+    session = await create_session(db, user.id, github_token=access_token)
     
     return {
         "ok": True,
@@ -342,7 +372,7 @@ async def github_oauth_callback(
 @router.post("/github/token")
 async def github_token_login(
     data: GitHubTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login with GitHub Personal Access Token"""
     async with httpx.AsyncClient() as client:
@@ -369,7 +399,9 @@ async def github_token_login(
             detail="GitHub username not found"
         )
     
-    user = db.query(User).filter(User.github_username == github_username).first()
+    user = (await db.execute(
+        select(User).where(User.github_username == github_username)
+    )).scalars().first()
     
     if user:
         user.email = github_email or user.email
@@ -383,10 +415,10 @@ async def github_token_login(
         )
         db.add(user)
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
-    session = create_session(db, user.id, github_token=data.token)
+    session = await create_session(db, user.id, github_token=data.token)
     
     return {
         "ok": True,
@@ -404,13 +436,15 @@ async def github_token_login(
 @router.get("/github/repos")
 async def get_github_repos(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List user's GitHub repositories"""
-    session = db.query(AuthSession).filter(
-        AuthSession.user_id == user.id,
-        AuthSession.expires_at > datetime.utcnow()
-    ).order_by(AuthSession.created_at.desc()).first()
+    session = (await db.execute(
+        select(AuthSession).where(
+            AuthSession.user_id == user.id,
+            AuthSession.expires_at > datetime.utcnow()
+        ).order_by(AuthSession.created_at.desc())
+    )).scalars().first()
     
     if not session or not session.github_token:
         raise HTTPException(
@@ -1,18 +1,32 @@
 """AI Chat Assistant API routes with full repo access"""
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
+from dataclasses import dataclass, field
 import json
 import os
+import time
 import subprocess
 from pathlib import Path
 import httpx
-import ast
+import inspect
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
-from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.process_runner import run_process
+from app.services.llm_clients import llm_clients
+from app.services.file_tree import file_tree
+from app.services.sql_pool import sql_pool, SQL_ROW_LIMIT
+from app.services.web_search import web_search_client
+from app.services.memory_store import memory_store
+from app.services.code_search import code_search, repo_root_for, CODE_SEARCH_TOOL_MAX_FILES
+from app.services.symbol_index import symbol_index, SYMBOL_READ_MAX_DEFS, SYMBOL_READ_MAX_LINES
+from app.services.read_cache import ReadCache, read_caches, current_read_cache
 
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
@@ -31,6 +45,7 @@ class ChatRequest(BaseModel):
     provider: Optional[str] = None  # openai, anthropic, gemini
     model: Optional[str] = None  # Model ID from provider
     params: Optional[Dict[str, Any]] = {}  # Model-specific parameters
+    conversation_id: Optional[str] = None  # Keeps the file read cache across turns
 
 
 class ChatResponse(BaseModel):
@@ -43,19 +58,78 @@ class ChatResponse(BaseModel):
 def read_file(file_path: str) -> str:
     """Read a file from the repository"""
     try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-        return f"File: {file_path}\n\n{content}"
+        content, _, _ = (current_read_cache.get() or ReadCache()).read(file_path)
+        return f"File: {file_path}\n\n{content if content is not None else '[binary file]'}"
     except Exception as e:
         return f"Error reading {file_path}: {str(e)}"
 
 
+async def read_files(files: List[Any], max_bytes: int = None) -> str:
+    """Read several files (or line ranges of them) concurrently in one tool call"""
+    specs = [{"path": f} if isinstance(f, str) else dict(f) for f in files[:READ_FILES_MAX_FILES]]
+    cache = current_read_cache.get() or ReadCache()
+    semaphore = asyncio.Semaphore(READ_FILES_CONCURRENCY)
+
+    async def load(spec: Dict[str, Any]):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(cache.read, spec["path"]), None
+            except (OSError, KeyError, TypeError) as e:
+                return None, e
+
+    loaded = await asyncio.gather(*(load(spec) for spec in specs))
+
+    budget = READ_FILES_MAX_TOTAL_BYTES
+    sections = []
+    for spec, (result, error) in zip(specs, loaded):
+        path = spec.get("path", "?")
+        if error is not None:
+            sections.append(f"=== {path} ===\nError: {error}")
+            continue
+        text, mtime, _ = result
+        if text is None:
+            sections.append(f"=== {path} ===\n[binary file]")
+            continue
+        if budget <= 0:
+            sections.append(f"=== {path} ===\n(skipped: output limit reached - read it in another call)")
+            continue
+
+        lines = text.split("\n")
+        if lines and lines[-1] == "":
+            lines.pop()
+        start = max(1, int(spec.get("start_line") or 1))
+        end = min(len(lines), int(spec.get("end_line") or len(lines)))
+        cap = min(int(spec.get("max_bytes") or max_bytes or READ_FILES_MAX_BYTES), budget)
+        header = f"=== {path} (lines {start}-{end} of {len(lines)}) ==="
+        if start > end:
+            sections.append(f"=== {path} ===\n(no lines in range; file has {len(lines)} lines)")
+            continue
+        if cache.seen_this_turn((os.path.abspath(path), mtime, start, end, cap)):
+            sections.append(f"{header}\n(unchanged since it was read earlier in this turn - see that result)")
+            continue
+
+        body = "\n".join(lines[start - 1:end])
+        encoded = body.encode("utf-8")
+        if len(encoded) > cap:
+            body = encoded[:cap].decode("utf-8", "ignore")
+            body += f"\n... truncated at {cap} bytes (continue with start_line={start + body.count(chr(10))})"
+        budget -= min(len(encoded), cap)
+        sections.append(f"{header}\n{body}")
+
+    if len(files) > len(specs):
+        sections.append(f"... {len(files) - len(specs)} more files not read (max {READ_FILES_MAX_FILES} per call)")
+    return "\n\n".join(sections) if sections else "No files requested"
+
+
 def write_file(file_path: str, content: str) -> str:
     """Write content to a file"""
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         with open(file_path, 'w') as f:
             f.write(content)
+        file_tree.invalidate(file_path)
+        code_search.notify_write(file_path)
+        symbol_index.notify_write(file_path)
         return f"✅ Successfully wrote to {file_path}"
     except Exception as e:
         return f"Error writing {file_path}: {str(e)}"
@@ -90,19 +164,87 @@ def search_files(pattern: str, directory: str = ".") -> str:
 
 
 def grep_code(pattern: str, directory: str = "app") -> str:
-    """Search for text/code patterns in files"""
+    """
+    Search for text/code patterns in files.
+    Patterns are Python `re` syntax (like grep -E/-P, not grep's basic regex):
+    |, (, ), +, ? and {} are operators - escape them to match literally.
+    """
     try:
-        result = subprocess.run(
-            ["grep", "-r", "-n", "-i", pattern, directory],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        return f"Matches for '{pattern}':\n\n{result.stdout if result.stdout else 'No matches found'}"
+        target = Path(directory).resolve()
+        if not target.exists():
+            return f"Matches for '{pattern}':\n\nNo matches found"
+        root = repo_root_for(target if target.is_dir() else target.parent)
+        scope = target.relative_to(root).as_posix() if target != root else ""
+
+        # Case-insensitive like grep -i; patterns that aren't valid regexes are searched literally
+        index = code_search.get(root)
+        try:
+            found = index.search(pattern, regex=True, path=scope, limit=CODE_SEARCH_TOOL_MAX_FILES)
+        except ValueError:
+            found = index.search(pattern, regex=False, path=scope, limit=CODE_SEARCH_TOOL_MAX_FILES)
+
+        lines = []
+        for result in found["results"]:
+            shown = os.path.join(directory, os.path.relpath(result["path"], scope or "."))
+            lines.extend(f"{shown}:{m['line']}:{m['text']}" for m in result["matches"])
+        if found["truncated"]:
+            lines.append(f"... {found['files_matched'] - CODE_SEARCH_TOOL_MAX_FILES} more files with matches (narrow the pattern or directory)")
+        return f"Matches for '{pattern}':\n\n{chr(10).join(lines) if lines else 'No matches found'}"
     except Exception as e:
         return f"Error searching code: {str(e)}"
 
 
+def _symbol_scope(directory: str) -> tuple:
+    """(index, scope within the repo) for a tool's directory argument"""
+    target = Path(directory).resolve()
+    root = repo_root_for(target if target.is_dir() else target.parent)
+    scope = target.relative_to(root).as_posix() if target != root else ""
+    return symbol_index.get(root), scope
+
+
+def find_symbol(name: str, kind: str = None, directory: str = ".") -> str:
+    """Locate definitions by name without reading files"""
+    try:
+        index, scope = _symbol_scope(directory)
+        matches = index.find(name, kind=kind, path=scope)
+        if not matches:
+            return f"No symbols found for '{name}'"
+        lines = []
+        for rel, s in matches:
+            location = os.path.join(directory, os.path.relpath(rel, scope or "."))
+            detail = f"  # {s.signature}" if s.kind == "import" else s.signature
+            lines.append(f"{location}:{s.line}-{s.end_line}  {s.kind} {s.qualname}{detail}")
+        return f"Symbols matching '{name}':\n\n" + "\n".join(lines)
+    except Exception as e:
+        return f"Error finding symbol: {str(e)}"
+
+
+def read_symbol(name: str, file_path: str = None, directory: str = ".") -> str:
+    """Return only the source of a definition (class, function, method)"""
+    try:
+        index, scope = _symbol_scope(file_path or directory)
+        matches = index.find(name, path=scope)
+        if not matches:
+            return f"No symbols found for '{name}'"
+        shown = matches[:SYMBOL_READ_MAX_DEFS]
+        base = file_path or directory
+        parts = []
+        for rel, s in shown:
+            source = index.source(rel, s)
+            if source is None:
+                continue
+            lines = source.split("\n")
+            if len(lines) > SYMBOL_READ_MAX_LINES:
+                source = "\n".join(lines[:SYMBOL_READ_MAX_LINES]) + f"\n... ({len(lines) - SYMBOL_READ_MAX_LINES} more lines)"
+            location = base if file_path else os.path.join(directory, os.path.relpath(rel, scope or "."))
+            parts.append(f"{location}:{s.line}-{s.end_line} ({s.kind} {s.qualname})\n\n{source}")
+        if len(matches) > len(shown):
+            parts.append(f"... {len(matches) - len(shown)} more definitions named '{name}' (pass file_path or a qualified name like Class.method)")
+        return "\n\n".join(parts) if parts else f"No symbols found for '{name}'"
+    except Exception as e:
+        return f"Error reading symbol: {str(e)}"
+
+
 def execute_command(command: str) -> str:
     """Execute a safe shell command"""
     # Whitelist safe commands
@@ -140,78 +282,43 @@ def get_repo_structure() -> str:
         return f"Error: {str(e)}"
 
 
-def git_status() -> str:
+async def git_status() -> str:
     """Get git repository status"""
     try:
-        result = subprocess.run(
-            ["git", "status", "--short"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        result = await run_process(["git", "status", "--short"], timeout=5)
         return f"Git status:\n\n{result.stdout if result.stdout else 'Working tree clean'}"
     except Exception as e:
         return f"Error: {str(e)}"
 
 
-def git_diff(file_path: str = "") -> str:
+async def git_diff(file_path: str = "") -> str:
     """Show git diff for file or all files"""
     try:
         cmd = ["git", "diff", file_path] if file_path else ["git", "diff"]
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        result = await run_process(cmd, timeout=10)
         return f"Git diff:\n\n{result.stdout if result.stdout else 'No changes'}"
     except Exception as e:
         return f"Error: {str(e)}"
 
 
-def web_search(query: str) -> str:
+async def web_search(query: str) -> str:
     """Search the web using Perplexity API"""
     try:
-        import aiohttp
-        import asyncio
-        
-        async def search():
-            headers = {
-                "Authorization": f"Bearer {settings.PERPLEXITY_API_KEY}",
-                "Content-Type": "application/json"
-            }
-            data = {
-                "model": "sonar-pro",
-                "messages": [{"role": "user", "content": query}]
-            }
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    "https://api.perplexity.ai/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as resp:
-                    result = await resp.json()
-                    return result.get("choices", [{}])[0].get("message", {}).get("content", "No results")
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(search())
-        loop.close()
+        result = await web_search_client.search(query)
         return f"Web search results:\n\n{result}"
     except Exception as e:
         return f"Web search unavailable: {str(e)}"
 
 
-def get_memory(key: str) -> str:
+def get_memory(key: str, version: str = None) -> str:
     """Read from persistent memory storage"""
     try:
-        memory_file = f"data/memory/{key}.latest.json"
-        if os.path.exists(memory_file):
-            with open(memory_file, 'r') as f:
-                data = json.load(f)
-                return f"Memory '{key}':\n\n{json.dumps(data.get('data', {}), indent=2)}"
-        return f"No memory found for key: {key}"
+        record = memory_store.read(key, version)
+        if record is None:
+            if version:
+                return f"No memory found for key: {key} (version: {version})"
+            return f"No memory found for key: {key}"
+        return f"Memory '{key}':\n\n{json.dumps(record['data'], indent=2)}"
     except Exception as e:
         return f"Error reading memory: {str(e)}"
 
@@ -219,56 +326,65 @@ def get_memory(key: str) -> str:
 def write_memory(key: str, data: str) -> str:
     """Write to persistent memory storage"""
     try:
-        os.makedirs("data/memory", exist_ok=True)
-        from datetime import datetime
-        
-        ts = datetime.now().isoformat().replace(':', '-').replace('.', '-')
-        
         # Parse data as JSON if possible
         try:
             parsed_data = json.loads(data)
         except:
             parsed_data = data
-        
-        payload = {
-            "version": ts,
-            "createdAt": datetime.now().isoformat(),
-            "data": parsed_data
-        }
-        
-        # Write versioned file
-        versioned_file = f"data/memory/{key}.{ts}.json"
-        with open(versioned_file, 'w') as f:
-            json.dump(payload, f, indent=2)
-        
-        # Write latest file
-        latest_file = f"data/memory/{key}.latest.json"
-        with open(latest_file, 'w') as f:
-            json.dump(payload, f, indent=2)
-        
+
+        ts = memory_store.write(key, parsed_data)
         return f"✅ Memory '{key}' saved (version: {ts})"
     except Exception as e:
         return f"Error writing memory: {str(e)}"
 
 
+def list_memory_versions(key: str = None) -> str:
+    """List stored versions of a memory key (or all keys)"""
+    try:
+        if not key:
+            keys = memory_store.keys()
+            return "Memory keys:\n" + "\n".join(keys) if keys else "No memories stored"
+        versions = memory_store.versions(key)
+        if not versions:
+            return f"No memory found for key: {key}"
+        lines = [f"{v['version']}  ({v['bytes']} bytes)" for v in versions]
+        return f"Memory '{key}' versions (oldest first):\n" + "\n".join(lines)
+    except Exception as e:
+        return f"Error listing memory: {str(e)}"
+
+
+def diff_memory(key: str, from_version: str = None, to_version: str = None) -> str:
+    """Unified diff between two versions of a memory key (default: previous -> latest)"""
+    try:
+        diff = memory_store.diff(key, from_version, to_version)
+        if diff is None:
+            return f"Nothing to diff for key: {key}"
+        return diff or "No differences"
+    except Exception as e:
+        return f"Error diffing memory: {str(e)}"
+
+
+def prune_memory(key: str, keep: int = 1) -> str:
+    """Drop old versions of a memory key"""
+    try:
+        dropped = memory_store.prune(key, keep)
+        return f"✅ Pruned {dropped} old version(s) of '{key}' (kept {keep})"
+    except Exception as e:
+        return f"Error pruning memory: {str(e)}"
+
+
 # Advanced database operations (Eidolon/Agent power)
 def sql_query(query: str) -> str:
     """Execute SQL SELECT query against PostgreSQL database"""
     try:
-        import psycopg2
-        conn = psycopg2.connect(settings.DATABASE_URL)
-        cur = conn.cursor()
-        cur.execute(query)
-        rows = cur.fetchall()
-        columns = [desc[0] for desc in cur.description] if cur.description else []
-        cur.close()
-        conn.close()
+        columns, rows, truncated = sql_pool.query(query, limit=SQL_ROW_LIMIT)
         
-        result = f"Query results ({len(rows)} rows):\n\nColumns: {', '.join(columns)}\n\n"
-        for row in rows[:50]:  # Limit to 50 rows
+        count = f"first {len(rows)} rows" if truncated else f"{len(rows)} rows"
+        result = f"Query results ({count}):\n\nColumns: {', '.join(columns)}\n\n"
+        for row in rows:
             result += str(row) + "\n"
-        if len(rows) > 50:
-            result += f"\n... and {len(rows) - 50} more rows"
+        if truncated:
+            result += f"\n... more rows not fetched (limit {SQL_ROW_LIMIT}); add WHERE/LIMIT to narrow the query"
         return result
     except Exception as e:
         return f"SQL query error: {str(e)}"
@@ -277,14 +393,7 @@ def sql_query(query: str) -> str:
 def sql_execute(statement: str) -> str:
     """Execute SQL INSERT/UPDATE/DELETE statement"""
     try:
-        import psycopg2
-        conn = psycopg2.connect(settings.DATABASE_URL)
-        cur = conn.cursor()
-        cur.execute(statement)
-        conn.commit()
-        affected = cur.rowcount
-        cur.close()
-        conn.close()
+        affected = sql_pool.execute(statement)
         return f"✅ SQL executed successfully. {affected} rows affected."
     except Exception as e:
         return f"SQL execute error: {str(e)}"
@@ -293,30 +402,7 @@ def sql_execute(statement: str) -> str:
 def get_database_schema(table_name: str = None) -> str:
     """Get database schema information"""
     try:
-        import psycopg2
-        conn = psycopg2.connect(settings.DATABASE_URL)
-        cur = conn.cursor()
-        
-        if table_name:
-            query = """
-                SELECT column_name, data_type, is_nullable, column_default
-                FROM information_schema.columns
-                WHERE table_name = %s
-                ORDER BY ordinal_position
-            """
-            cur.execute(query, (table_name,))
-        else:
-            query = """
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public'
-                ORDER BY table_name
-            """
-            cur.execute(query)
-        
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
+        rows = sql_pool.schema(table_name)
         
         result = f"Database schema{' for table: ' + table_name if table_name else ''}:\n\n"
         for row in rows:
@@ -326,24 +412,14 @@ def get_database_schema(table_name: str = None) -> str:
         return f"Schema query error: {str(e)}"
 
 
-def git_commit(message: str, files: str = ".") -> str:
+async def git_commit(message: str, files: str = ".") -> str:
     """Commit changes to git repository"""
     try:
         # Add files
-        result = subprocess.run(
-            ["git", "add", files],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        result = await run_process(["git", "add", files], timeout=10)
         
         # Commit
-        result = subprocess.run(
-            ["git", "commit", "-m", message],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        result = await run_process(["git", "commit", "-m", message], timeout=10)
         
         if result.returncode == 0:
             return f"✅ Committed: {message}\n\n{result.stdout}"
@@ -353,15 +429,10 @@ def git_commit(message: str, files: str = ".") -> str:
         return f"Git commit error: {str(e)}"
 
 
-def git_push(branch: str = "main") -> str:
+async def git_push(branch: str = "main") -> str:
     """Push changes to remote repository"""
     try:
-        result = subprocess.run(
-            ["git", "push", "origin", branch],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        result = await run_process(["git", "push", "origin", branch], timeout=30)
         
         if result.returncode == 0:
             return f"✅ Pushed to {branch}\n\n{result.stdout}"
@@ -432,6 +503,37 @@ TOOLS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_files",
+            "description": "Read many files at once (optionally just line ranges) in a single call. Prefer this over repeated read_file calls",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "files": {
+                        "type": "array",
+                        "description": "Files to read",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "path": {"type": "string", "description": "Path to the file"},
+                                "start_line": {"type": "integer", "description": "First line (1-based, default 1)"},
+                                "end_line": {"type": "integer", "description": "Last line, inclusive (default: end of file)"},
+                                "max_bytes": {"type": "integer", "description": "Byte cap for this file"}
+                            },
+                            "required": ["path"]
+                        }
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "Default byte cap per file"
+                    }
+                },
+                "required": ["files"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -495,13 +597,13 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "grep_code",
-            "description": "Search for text patterns in code files",
+            "description": "Search for text patterns in code files (case-insensitive Python regex via an indexed search, ranked by relevance). | ( ) + ? { } are regex operators; escape them with \\ to match literally",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "pattern": {
                         "type": "string",
-                        "description": "Text pattern to search for"
+                        "description": "Python regex (e.g. 'def (get|set)_\\w+') or plain text to search for"
                     },
                     "directory": {
                         "type": "string",
@@ -587,17 +689,72 @@ TOOLS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "find_symbol",
+            "description": "Find where classes, functions, methods or variables are defined (indexed, no file reads). Returns path:start-end lines and signatures",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Symbol name or qualified name (e.g. SessionCache.flush)"
+                    },
+                    "kind": {
+                        "type": "string",
+                        "enum": ["class", "function", "method", "variable", "import"],
+                        "description": "Only this kind (default: everything except imports)"
+                    },
+                    "directory": {
+                        "type": "string",
+                        "description": "Directory to search in (default: .)"
+                    }
+                },
+                "required": ["name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_symbol",
+            "description": "Read just the source of a definition instead of the whole file",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Symbol name or qualified name (e.g. SessionCache.flush)"
+                    },
+                    "file_path": {
+                        "type": "string",
+                        "description": "File containing the symbol, to disambiguate"
+                    },
+                    "directory": {
+                        "type": "string",
+                        "description": "Directory to search in (default: .)"
+                    }
+                },
+                "required": ["name"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
             "name": "get_memory",
-            "description": "Read from persistent memory storage (data/memory/)",
+            "description": "Read from persistent memory storage (data/memory/memory.log)",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "key": {
                         "type": "string",
                         "description": "Memory key to retrieve"
+                    },
+                    "version": {
+                        "type": "string",
+                        "description": "Specific version to read (default: latest)"
                     }
                 },
                 "required": ["key"]
@@ -625,6 +782,68 @@ TOOLS = [
             }
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_memory_versions",
+            "description": "List versions of a memory key, or all memory keys when no key is given",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "key": {
+                        "type": "string",
+                        "description": "Memory key (omit to list keys)"
+                    }
+                }
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "diff_memory",
+            "description": "Show a unified diff between two versions of a memory key",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "key": {
+                        "type": "string",
+                        "description": "Memory key"
+                    },
+                    "from_version": {
+                        "type": "string",
+                        "description": "Older version (default: the one before to_version)"
+                    },
+                    "to_version": {
+                        "type": "string",
+                        "description": "Newer version (default: latest)"
+                    }
+                },
+                "required": ["key"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "prune_memory",
+            "description": "Delete old versions of a memory key, keeping the newest ones",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "key": {
+                        "type": "string",
+                        "description": "Memory key"
+                    },
+                    "keep": {
+                        "type": "integer",
+                        "description": "Number of newest versions to keep (default: 1)"
+                    }
+                },
+                "required": ["key"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -732,10 +951,13 @@ TOOLS = [
 # Map function names to actual functions
 FUNCTION_MAP = {
     "read_file": read_file,
+    "read_files": read_files,
     "write_file": write_file,
     "list_directory": list_directory,
     "search_files": search_files,
     "grep_code": grep_code,
+    "find_symbol": find_symbol,
+    "read_symbol": read_symbol,
     "execute_command": execute_command,
     "get_repo_structure": get_repo_structure,
     "git_status": git_status,
@@ -743,6 +965,9 @@ FUNCTION_MAP = {
     "web_search": web_search,
     "get_memory": get_memory,
     "write_memory": write_memory,
+    "list_memory_versions": list_memory_versions,
+    "diff_memory": diff_memory,
+    "prune_memory": prune_memory,
     "sql_query": sql_query,
     "sql_execute": sql_execute,
     "get_database_schema": get_database_schema,
@@ -752,27 +977,8 @@ FUNCTION_MAP = {
 }
 
 
-@router.post("", response_model=ChatResponse)
-async def chat_with_assistant(request: ChatRequest):
-    """
-    Chat with AI assistant with FULL repository access
-    
-    GPT-5 can:
-    - Read any file in the repo
-    - Write/edit files
-    - Search code and files
-    - Execute safe shell commands
-    - List directories
-    - Analyze and refactor code
-    """
-    try:
-        # Use OPENAISDK_API_KEY for AI Assistant Builder
-        api_key = settings.OPENAISDK_API_KEY or settings.OPENAI_API_KEY
-        if not api_key:
-            raise HTTPException(status_code=500, detail="OPENAISDK_API_KEY not configured")
-        client = AsyncOpenAI(api_key=api_key)
-        
-        system_prompt = """You are the RepEditor AI Assistant - a code editor powered by AI with full repository access.
+# System prompt shared by /api/chat and /api/chat/stream
+SYSTEM_PROMPT = """You are the RepEditor AI Assistant - a code editor powered by AI with full repository access.
 
 CRITICAL: When you need information from a file, USE THE TOOLS IMMEDIATELY. Do not say "I will read" - just call read_file.
 
@@ -782,6 +988,8 @@ Your purpose: Help users edit, refactor, debug, and improve code in their reposi
 
 File System:
 - read_file, write_file, list_directory, search_files, grep_code, get_repo_structure
+- read_files (several files or line ranges in one call)
+- find_symbol, read_symbol (jump to a definition and read only its lines)
 
 Git Operations:
 - git_status, git_diff (read-only for safety)
@@ -791,6 +999,7 @@ Web Search:
 
 Memory System:
 - get_memory, write_memory (persistent JSON storage in data/memory/ with versioning)
+- list_memory_versions, diff_memory, prune_memory (inspect and trim version history)
 
 Shell Commands:
 - execute_command (safe whitelist: ls, grep, cat, head, tail, wc, tree, pwd, python, pip)
@@ -815,15 +1024,177 @@ You help users work with their code repositories:
 
 === WORKFLOW ===
 
-Need file content? → Call read_file() IMMEDIATELY
+Need file content? → Call read_file() IMMEDIATELY (read_files() for several files or line ranges)
 Need to modify code? → Call read_file() first, then write_file()
 Need to search? → Call grep_code() or search_files()
+Need a definition? → Call find_symbol() / read_symbol() instead of reading the whole file
 Need current status? → Call git_status() or list_directory()
 
 Act directly. Use tools, don't describe using them."""
 
+
+# Tool execution limits
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "60"))
+TOOL_MAX_CONCURRENCY_PER_TURN = int(os.getenv("TOOL_MAX_CONCURRENCY_PER_TURN", "4"))
+TOOL_THREAD_POOL_SIZE = int(os.getenv("TOOL_THREAD_POOL_SIZE", "8"))
+
+# read_files limits
+READ_FILES_MAX_FILES = int(os.getenv("READ_FILES_MAX_FILES", "20"))
+READ_FILES_MAX_BYTES = int(os.getenv("READ_FILES_MAX_BYTES", str(64 * 1024)))  # per file, unless overridden
+READ_FILES_MAX_TOTAL_BYTES = int(os.getenv("READ_FILES_MAX_TOTAL_BYTES", str(256 * 1024)))  # per call
+READ_FILES_CONCURRENCY = int(os.getenv("READ_FILES_CONCURRENCY", "8"))
+
+# Seconds between client-disconnect checks while a stream is idle
+STREAM_DISCONNECT_POLL = float(os.getenv("STREAM_DISCONNECT_POLL", "1.0"))
+
+# Sync tools run here so file/SQL/shell work never blocks the event loop
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_THREAD_POOL_SIZE, thread_name_prefix="chat-tool")
+
+# Tools with side effects run alone, in the order the model requested them
+SERIAL_TOOLS = {"write_file", "write_memory", "prune_memory", "sql_execute", "git_commit", "git_push", "execute_command"}
+
+
+async def run_tool(function_name: str, function_args: Dict[str, Any]) -> str:
+    """Run one tool with a timeout; async tools are awaited, sync tools offloaded to the pool"""
+    func = FUNCTION_MAP[function_name]
+    try:
+        if inspect.iscoroutinefunction(func):
+            call = func(**function_args)
+        else:
+            loop = asyncio.get_running_loop()
+            # Copy the context so sync tools see per-request state (e.g. the conversation's read cache)
+            call = loop.run_in_executor(
+                _tool_executor, functools.partial(contextvars.copy_context().run, func, **function_args)
+            )
+        return await asyncio.wait_for(call, timeout=TOOL_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        return f"Error: {function_name} timed out after {TOOL_TIMEOUT_SECONDS:g}s"
+    except Exception as e:
+        return f"Error running {function_name}: {str(e)}"
+
+
+async def execute_tool_calls(
+    tool_calls,
+    on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Execute the tool calls of one assistant message concurrently
+
+    Read-only tools run in parallel (capped per turn); SERIAL_TOOLS act as
+    barriers so writes keep their requested order. Results come back in the
+    original tool_call order. on_event receives tool_start/tool_end progress.
+    """
+    semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY_PER_TURN)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(tool_calls)
+
+    async def run_one(i: int, tool_call):
+        function_name = tool_call.function.name
+        try:
+            function_args = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError as e:
+            function_args = {}
+            function_result = f"Error: invalid arguments for {function_name}: {str(e)}"
+        else:
+            if function_name not in FUNCTION_MAP:
+                function_result = f"Error: unknown tool {function_name}"
+            else:
+                async with semaphore:
+                    if on_event:
+                        on_event("tool_start", {"id": tool_call.id, "function": function_name, "args": function_args})
+                    t0 = time.time()
+                    function_result = await run_tool(function_name, function_args)
+                    if on_event:
+                        on_event("tool_end", {
+                            "id": tool_call.id,
+                            "function": function_name,
+                            "result": function_result[:500],
+                            "duration_ms": round((time.time() - t0) * 1000, 1)
+                        })
+        results[i] = {
+            "tool_call_id": tool_call.id,
+            "function": function_name,
+            "args": function_args,
+            "result": function_result
+        }
+
+    batch = []
+    for i, tool_call in enumerate(tool_calls):
+        if tool_call.function.name in SERIAL_TOOLS:
+            await asyncio.gather(*batch)
+            batch = []
+            await run_one(i, tool_call)
+        else:
+            batch.append(run_one(i, tool_call))
+    await asyncio.gather(*batch)
+
+    return results
+
+
+def uses_responses(model: str) -> bool:
+    """Models served by /v1/responses instead of /v1/chat/completions"""
+    return any(x in model for x in ['codex', 'audio', 'realtime', 'image-', 'search'])
+
+
+def completion_kwargs(model: str, messages: List[Any], params: Dict[str, Any], with_tools: bool = True) -> Dict[str, Any]:
+    """Build chat.completions.create kwargs, applying the parameters each model family accepts"""
+    kwargs = {
+        "model": model,
+        "messages": messages,
+    }
+    if with_tools:
+        kwargs["tools"] = TOOLS
+        kwargs["tool_choice"] = "auto"
+    
+    # O1/O3 models: max_completion_tokens only
+    if model.startswith('o1-') or model.startswith('o3-'):
+        kwargs["max_completion_tokens"] = int(params.get("max_completion_tokens", "4000"))
+    
+    # GPT-5 clean models: reasoning_effort, verbosity, max_completion_tokens
+    elif model.startswith('gpt-5') and not uses_responses(model):
+        if "reasoning_effort" in params:
+            kwargs["reasoning_effort"] = params["reasoning_effort"]
+        if "verbosity" in params:
+            kwargs["verbosity"] = params["verbosity"]
+        kwargs["max_completion_tokens"] = int(params.get("max_completion_tokens", "4000"))
+    
+    # GPT-4o, GPT-4.1, GPT-5 special models: temperature, max_tokens
+    else:
+        if "temperature" in params:
+            kwargs["temperature"] = float(params["temperature"])
+        if "max_tokens" in params:
+            kwargs["max_tokens"] = int(params["max_tokens"])
+        elif "max_completion_tokens" in params:
+            kwargs["max_completion_tokens"] = int(params["max_completion_tokens"])
+        else:
+            kwargs["max_tokens"] = 4000
+    
+    return kwargs
+
+
+@router.post("", response_model=ChatResponse)
+async def chat_with_assistant(request: ChatRequest):
+    """
+    Chat with AI assistant with FULL repository access
+    
+    GPT-5 can:
+    - Read any file in the repo
+    - Write/edit files
+    - Search code and files
+    - Execute safe shell commands
+    - List directories
+    - Analyze and refactor code
+    """
+    try:
+        # Use OPENAISDK_API_KEY for AI Assistant Builder
+        api_key = settings.OPENAISDK_API_KEY or settings.OPENAI_API_KEY
+        if not api_key:
+            raise HTTPException(status_code=500, detail="OPENAISDK_API_KEY not configured")
+        client = llm_clients.openai(api_key)
+        
+        current_read_cache.set(read_caches.for_conversation(request.conversation_id))
+        
         # Build messages
-        messages = [{"role": "system", "content": system_prompt}]
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
         messages.extend(request.conversation_history)
         messages.append({"role": "user", "content": request.message})
         
@@ -832,7 +1203,7 @@ Act directly. Use tools, don't describe using them."""
         params = request.params or {}
         
         # Detect if this model uses /v1/responses instead of /v1/chat/completions
-        uses_responses_api = any(x in model for x in ['codex', 'audio', 'realtime', 'image-', 'search'])
+        uses_responses_api = uses_responses(model)
         
         if uses_responses_api:
             # Models that use /v1/responses API (codex, audio, realtime, image, search)
@@ -853,61 +1224,62 @@ Act directly. Use tools, don't describe using them."""
             
             # Call OpenAI /v1/responses endpoint directly
             try:
-                async with httpx.AsyncClient(timeout=60.0) as http_client:
-                    response = await http_client.post(
-                        "https://api.openai.com/v1/responses",
-                        headers={
-                            "Authorization": f"Bearer {api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json=request_body
-                    )
-                    response.raise_for_status()
-                    
-                    # Parse JSON response
-                    response_text = response.text
-                    
-                    # Parse the response
-                    try:
-                        data = json.loads(response_text)
-                    except json.JSONDecodeError:
-                        return ChatResponse(response=response_text, tool_calls=None)
-                    
-                    # Extract text from /v1/responses format
-                    # Response structure: {"id": "...", "output": [{"type": "message", "content": [{"type": "output_text", "text": "..."}]}]}
-                    output_text = None
-                    
-                    # Check if response has "output" field (new /v1/responses format)
-                    if isinstance(data, dict) and "output" in data:
-                        output_array = data["output"]
-                        if isinstance(output_array, list):
-                            # Find the message item in the output array
-                            for item in output_array:
-                                if isinstance(item, dict) and item.get("type") == "message":
-                                    content_list = item.get("content", [])
-                                    if isinstance(content_list, list):
-                                        for content_item in content_list:
-                                            if isinstance(content_item, dict) and content_item.get("type") == "output_text":
-                                                output_text = content_item.get("text")
-                                                break
-                                    if output_text:
-                                        break
-                    # Fallback: try direct field access
-                    elif isinstance(data, dict):
-                        output_text = data.get("text") or data.get("response") or data.get("content")
-                    
-                    # If still no text, show formatted JSON
-                    if not output_text:
-                        output_text = json.dumps(data, indent=2)
-                    
-                    # Ensure string output
-                    if not isinstance(output_text, str):
-                        output_text = str(output_text)
-                    
-                    return ChatResponse(
-                        response=output_text,
-                        tool_calls=None
-                    )
+                http_client = llm_clients.http("openai", api_key)
+                response = await http_client.post(
+                    "https://api.openai.com/v1/responses",
+                    headers={
+                        "Authorization": f"Bearer {api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json=request_body,
+                    timeout=60.0
+                )
+                response.raise_for_status()
+                
+                # Parse JSON response
+                response_text = response.text
+                
+                # Parse the response
+                try:
+                    data = json.loads(response_text)
+                except json.JSONDecodeError:
+                    return ChatResponse(response=response_text, tool_calls=None)
+                
+                # Extract text from /v1/responses format
+                # Response structure: {"id": "...", "output": [{"type": "message", "content": [{"type": "output_text", "text": "..."}]}]}
+                output_text = None
+                
+                # Check if response has "output" field (new /v1/responses format)
+                if isinstance(data, dict) and "output" in data:
+                    output_array = data["output"]
+                    if isinstance(output_array, list):
+                        # Find the message item in the output array
+                        for item in output_array:
+                            if isinstance(item, dict) and item.get("type") == "message":
+                                content_list = item.get("content", [])
+                                if isinstance(content_list, list):
+                                    for content_item in content_list:
+                                        if isinstance(content_item, dict) and content_item.get("type") == "output_text":
+                                            output_text = content_item.get("text")
+                                            break
+                                if output_text:
+                                    break
+                # Fallback: try direct field access
+                elif isinstance(data, dict):
+                    output_text = data.get("text") or data.get("response") or data.get("content")
+                
+                # If still no text, show formatted JSON
+                if not output_text:
+                    output_text = json.dumps(data, indent=2)
+                
+                # Ensure string output
+                if not isinstance(output_text, str):
+                    output_text = str(output_text)
+                
+                return ChatResponse(
+                    response=output_text,
+                    tool_calls=None
+                )
             except httpx.HTTPStatusError as e:
                 error_detail = e.response.json() if e.response.content else str(e)
                 raise HTTPException(
@@ -921,38 +1293,7 @@ Act directly. Use tools, don't describe using them."""
                 )
         
         # Standard chat/completions models with tool support
-        request_kwargs = {
-            "model": model,
-            "messages": messages,
-            "tools": TOOLS,
-            "tool_choice": "auto",
-        }
-        
-        # Handle parameters based on what was selected
-        # O1/O3 models: max_completion_tokens only
-        if model.startswith('o1-') or model.startswith('o3-'):
-            max_comp_tokens = params.get("max_completion_tokens", "4000")
-            request_kwargs["max_completion_tokens"] = int(max_comp_tokens)
-        
-        # GPT-5 clean models: reasoning_effort, verbosity, max_completion_tokens
-        elif model.startswith('gpt-5') and not uses_responses_api:
-            if "reasoning_effort" in params:
-                request_kwargs["reasoning_effort"] = params["reasoning_effort"]
-            if "verbosity" in params:
-                request_kwargs["verbosity"] = params["verbosity"]
-            max_comp_tokens = params.get("max_completion_tokens", "4000")
-            request_kwargs["max_completion_tokens"] = int(max_comp_tokens)
-        
-        # GPT-4o, GPT-4.1, GPT-5 special models: temperature, max_tokens
-        else:
-            if "temperature" in params:
-                request_kwargs["temperature"] = float(params["temperature"])
-            if "max_tokens" in params:
-                request_kwargs["max_tokens"] = int(params["max_tokens"])
-            elif "max_completion_tokens" in params:
-                request_kwargs["max_completion_tokens"] = int(params["max_completion_tokens"])
-            else:
-                request_kwargs["max_tokens"] = 4000
+        request_kwargs = completion_kwargs(model, messages, params, with_tools=True)
         
         # Initial call with tools
         response = await client.chat.completions.create(**request_kwargs)
@@ -968,54 +1309,23 @@ Act directly. Use tools, don't describe using them."""
             iteration += 1
             messages.append(response_message)
             
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
+            # Execute all tools of this message concurrently (results keep call order)
+            for executed in await execute_tool_calls(response_message.tool_calls):
+                tool_calls_made.append({
+                    "function": executed["function"],
+                    "args": executed["args"],
+                    "result": executed["result"][:500]  # Truncate for response
+                })
                 
-                # Execute the function
-                if function_name in FUNCTION_MAP:
-                    function_result = FUNCTION_MAP[function_name](**function_args)
-                    tool_calls_made.append({
-                        "function": function_name,
-                        "args": function_args,
-                        "result": function_result[:500]  # Truncate for response
-                    })
-                    
-                    # Add function result to messages
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": function_result
-                    })
+                # Add function result to messages
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": executed["tool_call_id"],
+                    "content": executed["result"]
+                })
             
             # Get response after tool execution (may trigger more tools)
-            follow_up_kwargs = {
-                "model": model,
-                "messages": messages,
-                "tools": TOOLS if iteration < max_iterations - 1 else None,
-                "tool_choice": "auto" if iteration < max_iterations - 1 else None,
-            }
-            
-            # Re-apply parameters for follow-up calls
-            if model.startswith('o1-') or model.startswith('o3-'):
-                max_comp_tokens = params.get("max_completion_tokens", "4000")
-                follow_up_kwargs["max_completion_tokens"] = int(max_comp_tokens)
-            elif model.startswith('gpt-5') and not any(x in model for x in ['codex', 'audio', 'realtime', 'image', 'search']):
-                if "reasoning_effort" in params:
-                    follow_up_kwargs["reasoning_effort"] = params["reasoning_effort"]
-                if "verbosity" in params:
-                    follow_up_kwargs["verbosity"] = params["verbosity"]
-                max_comp_tokens = params.get("max_completion_tokens", "4000")
-                follow_up_kwargs["max_completion_tokens"] = int(max_comp_tokens)
-            else:
-                if "temperature" in params:
-                    follow_up_kwargs["temperature"] = float(params["temperature"])
-                if "max_tokens" in params:
-                    follow_up_kwargs["max_tokens"] = int(params["max_tokens"])
-                elif "max_completion_tokens" in params:
-                    follow_up_kwargs["max_completion_tokens"] = int(params["max_completion_tokens"])
-                else:
-                    follow_up_kwargs["max_tokens"] = 4000
+            follow_up_kwargs = completion_kwargs(model, messages, params, with_tools=iteration < max_iterations - 1)
             
             response = await client.chat.completions.create(**follow_up_kwargs)
             response_message = response.choices[0].message
@@ -1031,6 +1341,166 @@ Act directly. Use tools, don't describe using them."""
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
+# ============================================================================
+# Streaming chat (Server-Sent Events)
+# ============================================================================
+
+@dataclass
+class StreamedFunction:
+    name: str = ""
+    arguments: str = ""
+
+
+@dataclass
+class StreamedToolCall:
+    """Tool call reassembled from streamed deltas"""
+    id: str = ""
+    function: StreamedFunction = field(default_factory=StreamedFunction)
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_completion(client, request_kwargs: Dict[str, Any], queue: asyncio.Queue):
+    """
+    Run one streamed completion, pushing token deltas to the queue
+
+    Returns (content, tool_calls). Cancelling the caller closes the
+    upstream HTTP stream, so the provider stops generating.
+    """
+    content_parts = []
+    tool_calls: Dict[int, StreamedToolCall] = {}
+    stream = await client.chat.completions.create(**request_kwargs, stream=True)
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content_parts.append(delta.content)
+                queue.put_nowait(sse_event("token", {"delta": delta.content}))
+            for tc in delta.tool_calls or []:
+                call = tool_calls.setdefault(tc.index, StreamedToolCall())
+                if tc.id:
+                    call.id = tc.id
+                if tc.function and tc.function.name:
+                    call.function.name += tc.function.name
+                if tc.function and tc.function.arguments:
+                    call.function.arguments += tc.function.arguments
+    finally:
+        await stream.close()
+    return "".join(content_parts), [tool_calls[i] for i in sorted(tool_calls)]
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming variant of POST /api/chat (text/event-stream)
+
+    Events: token {delta}, tool_start {id, function, args},
+    tool_end {id, function, result, duration_ms}, done {response, tool_calls}, error {detail}.
+    Upstream completions and running tools are cancelled when the client disconnects.
+    """
+    api_key = settings.OPENAISDK_API_KEY or settings.OPENAI_API_KEY
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OPENAISDK_API_KEY not configured")
+    model = request.model or "gpt-5"
+    if uses_responses(model):
+        raise HTTPException(status_code=400, detail=f"Streaming is not supported for {model}; use POST /api/chat")
+    client = llm_clients.openai(api_key)
+    params = request.params or {}
+    
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    messages.extend(request.conversation_history)
+    messages.append({"role": "user", "content": request.message})
+    
+    async def run_turns(queue: asyncio.Queue):
+        current_read_cache.set(read_caches.for_conversation(request.conversation_id))
+        tool_calls_made = []
+        max_iterations = 5
+        iteration = 0
+        
+        content, tool_calls = await stream_completion(
+            client, completion_kwargs(model, messages, params, with_tools=True), queue
+        )
+        while tool_calls and iteration < max_iterations:
+            iteration += 1
+            messages.append({
+                "role": "assistant",
+                "content": content or None,
+                "tool_calls": [
+                    {"id": c.id, "type": "function", "function": {"name": c.function.name, "arguments": c.function.arguments}}
+                    for c in tool_calls
+                ]
+            })
+            
+            executed_calls = await execute_tool_calls(
+                tool_calls, on_event=lambda event, data: queue.put_nowait(sse_event(event, data))
+            )
+            for executed in executed_calls:
+                tool_calls_made.append({
+                    "function": executed["function"],
+                    "args": executed["args"],
+                    "result": executed["result"][:500]
+                })
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": executed["tool_call_id"],
+                    "content": executed["result"]
+                })
+            
+            content, tool_calls = await stream_completion(
+                client, completion_kwargs(model, messages, params, with_tools=iteration < max_iterations - 1), queue
+            )
+        
+        queue.put_nowait(sse_event("done", {
+            "response": content or "Task completed.",
+            "tool_calls": tool_calls_made or None
+        }))
+    
+    async def event_stream():
+        queue: asyncio.Queue = asyncio.Queue()
+        worker = asyncio.create_task(run_turns(queue))
+        getter = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, worker}, timeout=STREAM_DISCONNECT_POLL, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter in done:
+                    yield getter.result()
+                    getter = None
+                elif worker in done:
+                    # Worker finished: flush what it queued, then report failures
+                    while not queue.empty():
+                        yield queue.get_nowait()
+                    if not worker.cancelled() and worker.exception():
+                        yield sse_event("error", {"detail": f"Chat error: {str(worker.exception())}"})
+                    break
+                elif await http_request.is_disconnected():
+                    # Nothing to send for a while (tools running) - check the client is still there
+                    break
+        finally:
+            if getter is not None:
+                getter.cancel()
+            if not worker.done():
+                worker.cancel()
+                print(f"[chat] Client disconnected, cancelled stream ({model})")
+                try:
+                    await worker
+                except BaseException:
+                    pass
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Provider models endpoint (separate router without prefix)
 from fastapi import APIRouter as BaseRouter
 providers_router = BaseRouter(prefix="/api/providers", tags=["providers"])
@@ -1049,7 +1519,7 @@ async def get_provider_models(provider: str):
             api_key = settings.OPENAISDK_API_KEY or settings.OPENAI_API_KEY
             if not api_key:
                 raise HTTPException(status_code=500, detail="OPENAISDK_API_KEY not configured")
-            client = AsyncOpenAI(api_key=api_key)
+            client = llm_clients.openai(api_key)
             models_response = await client.models.list()
             
             # Show ALL models (both /v1/chat/completions and /v1/responses)
@@ -6,9 +6,10 @@ from typing import Optional, List, Dict
 import os
 import json
 import secrets
-import subprocess
 from pathlib import Path
 
+from app.services.process_runner import run_process, ProcessTimeout
+
 router = APIRouter(prefix="/api/config", tags=["config"])
 
 
@@ -141,7 +142,7 @@ async def generate_ssh_key():
         public_key_path = ssh_dir / f'{key_name}.pub'
         
         # Generate ED25519 key (modern, secure)
-        result = subprocess.run(
+        result = await run_process(
             [
                 'ssh-keygen',
                 '-t', 'ed25519',
@@ -149,8 +150,6 @@ async def generate_ssh_key():
                 '-N', '',  # No passphrase
                 '-C', 'vecto-agent@replit'
             ],
-            capture_output=True,
-            text=True,
             timeout=10
         )
         
@@ -167,7 +166,7 @@ async def generate_ssh_key():
             'private_key_path': str(private_key_path),
             'message': 'SSH keypair generated successfully'
         }
-    except subprocess.TimeoutExpired:
+    except ProcessTimeout:
         raise HTTPException(status_code=500, detail="SSH key generation timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
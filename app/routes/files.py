@@ -1,44 +1,44 @@
 """File tree API endpoint"""
 
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Optional
 import os
+import asyncio
 from pathlib import Path
 
+from app.services.file_tree import file_tree
+
 router = APIRouter(prefix="/api/files", tags=["files"])
 
 
-def build_tree(directory: str = ".", prefix: str = "") -> List[Dict[str, Any]]:
-    """Build a tree structure of files and directories (matching Replit behavior)"""
-    items = []
-    try:
-        paths = sorted(Path(directory).iterdir(), key=lambda p: (not p.is_dir(), p.name))
-        
-        for path in paths:
-            # Only skip large build artifacts and version control
-            # Show hidden files (like .env, .replit, etc.) to match Replit's file tree
-            if path.name in ['__pycache__', 'node_modules', '.git', 'venv', '.venv', 'dist', 'build']:
-                continue
-            
-            item = {
-                "name": path.name,
-                "path": str(path),
-                "type": "directory" if path.is_dir() else "file",
-                "children": []
-            }
-            
-            if path.is_dir():
-                item["children"] = build_tree(str(path), prefix + "  ")
-            
-            items.append(item)
-    except Exception:
-        pass
-    
-    return items
+@router.get("/tree")
+async def get_file_tree(
+    request: Request,
+    response: Response,
+    path: str = Query("", description="Directory to list, relative to the workspace (default: root)"),
+    depth: Optional[int] = Query(None, ge=1, description="Levels to include (default: all)")
+):
+    """
+    Get the repository file tree (matching Replit behavior)
 
+    With depth, returns only that many levels below path; directories past
+    the limit have empty children and a child_count so the UI can expand
+    them lazily. Responses carry an ETag derived from directory mtimes and
+    answer If-None-Match with 304 when nothing in the subtree changed.
+    """
+    directory = os.path.normpath(path or ".")
+    root = Path(".").resolve()
+    target = Path(directory).resolve()
+    if root != target and root not in target.parents:
+        raise HTTPException(status_code=403, detail="Path escapes workspace")
+    if not target.is_dir():
+        raise HTTPException(status_code=404, detail="Directory not found")
 
-@router.get("/tree")
-async def get_file_tree():
-    """Get the complete repository file tree"""
-    return build_tree(".")
+    # The walk stats and scans directories - keep it off the event loop
+    items, etag = await asyncio.to_thread(file_tree.tree, directory, depth)
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return items
@@ -137,3 +137,47 @@ async def diagnostics():
             "type": "postgresql"
         }
     }
+
+
+@router.get("/diagnostics/llm-pools")
+async def llm_pool_diagnostics():
+    """
+    Connection pool stats for the shared LLM clients
+    A reuse_ratio near 1.0 means chat turns are riding existing connections
+    """
+    from app.services.llm_clients import llm_clients
+    from app.services.web_search import web_search_client
+    return {"ok": True, **llm_clients.get_stats(), "web_search": web_search_client.get_stats()}
+
+
+@router.get("/diagnostics/db-pools")
+async def db_pool_diagnostics():
+    """
+    Connection pool stats for the sync and asyncpg engines and the chat SQL tools
+    Rising avg_wait_ms or utilization near 1.0 means DB_POOL_SIZE/DB_MAX_OVERFLOW are too small
+    """
+    from app.core.config import get_pool_stats
+    from app.services.sql_pool import sql_pool
+    return {"ok": True, **get_pool_stats(), "sql_tools": sql_pool.get_stats()}
+
+
+@router.get("/diagnostics/memory")
+async def memory_diagnostics():
+    """
+    Assistant memory log stats
+    garbage_ratio is the share of memory.log held by pruned/expired versions (compaction reclaims it)
+    """
+    from app.services.memory_store import memory_store
+    return {"ok": True, **memory_store.get_stats()}
+
+
+@router.get("/diagnostics/code-search")
+async def code_search_diagnostics():
+    """
+    Per-repository trigram index stats for grep_code and /api/repos/search,
+    plus the symbol indexes behind find_symbol/read_symbol
+    A dead_ids count close to files means a sweep is due on the next refresh
+    """
+    from app.services.code_search import code_search
+    from app.services.symbol_index import symbol_index
+    return {"ok": True, "repos": code_search.get_stats(), "symbols": symbol_index.get_stats()}
@@ -1,17 +1,21 @@
 """Repository management - clone, browse, git operations"""
 
-from fastapi import APIRouter, HTTPException, Depends, Form, Query
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Depends, Form, Query, Request
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-import subprocess
 from pathlib import Path
+import asyncio
 import os
 
 from app.routes.auth import get_current_user, get_current_session
 from app.models.auth import AuthSession, User
-from app.core.config import get_db
-from sqlalchemy.orm import Session
+from app.core.config import get_async_db
+from app.services.process_runner import run_process, ProcessTimeout
+from app.services.tree_index import tree_index
+from app.services.code_search import code_search
+from app.services.symbol_index import symbol_index
+from app.services.file_content import content_response, file_etag, read_head, iter_file
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api/repos", tags=["repositories"])
 
@@ -21,15 +25,20 @@ CLONE_ROOT = (BASE_DIR / "repos").resolve()
 CLONE_ROOT.mkdir(parents=True, exist_ok=True)
 
 
-def run_command(cmd: List[str], cwd: Optional[Path] = None) -> str:
-    """Execute git command safely"""
+async def run_command(
+    cmd: List[str],
+    cwd: Optional[Path] = None,
+    timeout: float = 60,
+    request: Optional[Request] = None
+) -> str:
+    """Execute git command safely without blocking the event loop"""
     try:
-        result = subprocess.run(
+        result = await run_process(
             cmd,
-            cwd=str(cwd) if cwd else None,
-            capture_output=True,
-            text=True,
-            timeout=60
+            cwd=cwd,
+            timeout=timeout,
+            env={"GIT_TERMINAL_PROMPT": "0"},
+            request=request
         )
         if result.returncode != 0:
             raise HTTPException(
@@ -37,7 +46,9 @@ def run_command(cmd: List[str], cwd: Optional[Path] = None) -> str:
                 detail=f"Command failed: {' '.join(cmd)}\n{result.stderr}"
             )
         return result.stdout
-    except subprocess.TimeoutExpired:
+    except HTTPException:
+        raise
+    except ProcessTimeout:
         raise HTTPException(status_code=500, detail="Command timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -70,6 +81,7 @@ class GitPushRequest(BaseModel):
 @router.post("/select")
 async def select_repo(
     request: SelectRepoRequest,
+    http_request: Request,
     user_session: tuple[User, AuthSession] = Depends(get_current_session)
 ):
     """
@@ -99,11 +111,9 @@ async def select_repo(
     owner, repo = parts
     
     # Check if this is the current repository (avoid cloning into itself)
-    current_remote = subprocess.run(
+    current_remote = await run_process(
         ["git", "remote", "get-url", "origin"],
-        cwd=str(BASE_DIR),
-        capture_output=True,
-        text=True,
+        cwd=BASE_DIR,
         timeout=5
     )
     if current_remote.returncode == 0:
@@ -130,11 +140,11 @@ async def select_repo(
         # Clone or fetch
         if target.exists() and (target / ".git").exists():
             # Repo exists - update remote and fetch
-            run_command(["git", "remote", "set-url", "origin", remote_url], cwd=target)
-            run_command(["git", "fetch", "--all", "--prune"], cwd=target)
+            await run_command(["git", "remote", "set-url", "origin", remote_url], cwd=target)
+            await run_command(["git", "fetch", "--all", "--prune"], cwd=target, timeout=300, request=http_request)
         else:
             # Clone with shallow history
-            run_command(["git", "clone", "--depth", "1", remote_url, str(target)])
+            await run_command(["git", "clone", "--depth", "1", remote_url, str(target)], timeout=300, request=http_request)
         
         # Determine branch
         branch = request.branch
@@ -143,7 +153,9 @@ async def select_repo(
             branch = "main"
         
         # Checkout branch
-        run_command(["git", "checkout", branch], cwd=target)
+        await run_command(["git", "checkout", branch], cwd=target)
+        code_search.mark_stale(target)
+        symbol_index.mark_stale(target)
         
         # Store repo path in session (update in database if needed)
         # For now, return the path - UI will use it for subsequent calls
@@ -171,17 +183,24 @@ async def select_repo(
 async def get_repo_tree(
     repo_path: str = Query(..., description="Full path to repository"),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    max_entries: int = Query(8000, le=10000)
+    db: AsyncSession = Depends(get_async_db),
+    max_entries: int = Query(8000, le=10000, description="Page size"),
+    path: str = Query("", description="Directory to list, relative to the repository root"),
+    depth: Optional[int] = Query(None, ge=1, description="Levels below path to include (default: all)"),
+    offset: int = Query(0, ge=0, description="Entries to skip (paging)")
 ):
     """
     Get file tree for a repository
     
-    Returns list of all files and directories with:
+    Returns files and directories under path (ignored files excluded) with:
     - Relative path
     - Name
     - Type (file/dir)
     - Size (bytes, for files only)
+    - Child count (dirs only)
+    
+    Served from a per-repository index refreshed incrementally, so
+    listings don't re-walk the repository on every request.
     """
     root = Path(repo_path).resolve()
     
@@ -197,45 +216,76 @@ async def get_repo_tree(
     if not root.exists():
         raise HTTPException(status_code=404, detail="Repository not found")
     
-    # Build tree
-    items = []
-    count = 0
+    if ".." in Path(path).parts:
+        raise HTTPException(status_code=403, detail="Path escapes repository")
     
-    for p in sorted(root.rglob("*")):
-        # Skip .git internals
-        if ".git" in p.parts:
-            continue
-        
-        rel_path = p.relative_to(root)
-        item = {
-            "path": str(rel_path),
-            "name": p.name,
-            "kind": "dir" if p.is_dir() else "file",
-            "size": None if p.is_dir() else p.stat().st_size
-        }
-        items.append(item)
-        
-        count += 1
-        if count >= max_entries:
-            break
+    listing = await asyncio.to_thread(
+        tree_index.get(root).list, path, depth, offset, max_entries
+    )
+    if listing is None:
+        raise HTTPException(status_code=404, detail="Directory not found")
     
-    return {
-        "root": str(root),
-        "count": len(items),
-        "items": items
-    }
+    return {"root": str(root), **listing}
+
+
+@router.get("/search")
+async def search_repo(
+    repo_path: str = Query(..., description="Full path to repository"),
+    q: str = Query(..., min_length=1, description="Text or regex to search for"),
+    regex: bool = Query(False, description="Treat q as a regular expression"),
+    case_sensitive: bool = Query(False),
+    path: str = Query("", description="Only search under this directory (relative to the repository root)"),
+    limit: int = Query(100, ge=1, le=1000, description="Max files returned"),
+    max_per_file: int = Query(20, ge=1, le=500, description="Max matching lines returned per file"),
+    user: User = Depends(get_current_user)
+):
+    """
+    Search file contents in a repository
+    
+    Answered from a persisted per-repository trigram index (kept current
+    on writes and checkouts), verified line by line. Files are ranked by
+    match count, definition hits and filename matches.
+    """
+    root = Path(repo_path).resolve()
+    
+    # Security checks - allow CLONE_ROOT repos or BASE_DIR workspace
+    is_in_clone_root = CLONE_ROOT in root.parents or root == CLONE_ROOT
+    is_base_dir = root == BASE_DIR
+    
+    if not (is_in_clone_root or is_base_dir):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if not root.exists():
+        raise HTTPException(status_code=404, detail="Repository not found")
+    
+    if ".." in Path(path).parts:
+        raise HTTPException(status_code=403, detail="Path escapes repository")
+    
+    try:
+        found = await asyncio.to_thread(
+            code_search.get(root).search, q, regex, case_sensitive, path, limit, max_per_file
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"root": str(root), **found}
 
 
 @router.get("/file")
 async def get_file_content(
+    request: Request,
     repo_path: str = Query(..., description="Repository root path"),
     file_path: str = Query(..., description="Relative file path"),
+    start_line: Optional[int] = Query(None, ge=1, description="First line to return (1-based)"),
+    end_line: Optional[int] = Query(None, ge=1, description="Last line to return (inclusive)"),
     user: User = Depends(get_current_user)
 ):
     """
     Read file content from repository
     
-    Returns plain text content or [binary file] for binary files
+    Streams plain text content (Range and line ranges supported) or
+    [binary file] for binary files, with ETag/Last-Modified so unchanged
+    reloads cost a 304
     """
     root = Path(repo_path).resolve()
     
@@ -259,10 +309,17 @@ async def get_file_content(
         raise HTTPException(status_code=400, detail="Not a file")
     
     try:
-        content = file.read_text(encoding="utf-8")
-        return PlainTextResponse(content)
-    except UnicodeDecodeError:
-        return PlainTextResponse("[binary file]")
+        st = file.stat()
+        return content_response(
+            request,
+            size=st.st_size,
+            head=read_head(file),
+            read=lambda start, end: iter_file(file, start, end),
+            etag=file_etag(st),
+            mtime=st.st_mtime,
+            start_line=start_line,
+            end_line=end_line
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -282,8 +339,8 @@ async def git_config(
     if not root.exists():
         raise HTTPException(status_code=404, detail="Repository not found")
     
-    run_command(["git", "config", "user.name", request.name], cwd=root)
-    run_command(["git", "config", "user.email", request.email], cwd=root)
+    await run_command(["git", "config", "user.name", request.name], cwd=root)
+    await run_command(["git", "config", "user.email", request.email], cwd=root)
     
     return {"ok": True, "message": "Git config updated"}
 
@@ -304,10 +361,10 @@ async def git_commit(
         raise HTTPException(status_code=404, detail="Repository not found")
     
     # Stage files
-    run_command(["git", "add", request.paths], cwd=root)
+    await run_command(["git", "add", request.paths], cwd=root)
     
     # Commit with sign-off
-    run_command(["git", "commit", "-s", "-m", request.message], cwd=root)
+    await run_command(["git", "commit", "-s", "-m", request.message], cwd=root)
     
     return {"ok": True, "message": "Changes committed"}
 
@@ -315,6 +372,7 @@ async def git_commit(
 @router.post("/git/push")
 async def git_push(
     request: GitPushRequest,
+    http_request: Request,
     repo_path: str = Form(...),
     user: User = Depends(get_current_user)
 ):
@@ -328,7 +386,7 @@ async def git_push(
         raise HTTPException(status_code=404, detail="Repository not found")
     
     # Push to remote
-    run_command(["git", "push", request.remote, request.branch], cwd=root)
+    await run_command(["git", "push", request.remote, request.branch], cwd=root, timeout=300, request=http_request)
     
     return {"ok": True, "message": "Changes pushed to remote"}
 
@@ -347,8 +405,8 @@ async def git_status(
     if not root.exists():
         raise HTTPException(status_code=404, detail="Repository not found")
     
-    status = run_command(["git", "status", "--short"], cwd=root)
-    branch = run_command(["git", "branch", "--show-current"], cwd=root).strip()
+    status = await run_command(["git", "status", "--short"], cwd=root)
+    branch = (await run_command(["git", "branch", "--show-current"], cwd=root)).strip()
     
     return {
         "branch": branch,
@@ -4,16 +4,16 @@ Enables remote access to Replit workspaces via SSH
 """
 import os
 import json
-import subprocess
 import tempfile
 from pathlib import Path
 from typing import List, Dict, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from app.core.config import settings
+from app.services.process_runner import run_process, ProcessTimeout
 
 
 router = APIRouter(prefix="/api/ssh", tags=["ssh"])
@@ -53,7 +53,7 @@ async def generate_ssh_key(req: SSHKeyGen):
         public_key_path = ssh_dir / f'{key_name}.pub'
         
         # Generate ED25519 key (modern, secure)
-        result = subprocess.run(
+        result = await run_process(
             [
                 'ssh-keygen',
                 '-t', req.key_type,
@@ -61,8 +61,6 @@ async def generate_ssh_key(req: SSHKeyGen):
                 '-N', '',  # No passphrase
                 '-C', 'repeditor@replit'
             ],
-            capture_output=True,
-            text=True,
             timeout=10
         )
         
@@ -80,7 +78,7 @@ async def generate_ssh_key(req: SSHKeyGen):
             "instructions": "Add this public key to your Replit account at: https://replit.com/account#ssh-keys"
         })
     
-    except subprocess.TimeoutExpired:
+    except ProcessTimeout:
         raise HTTPException(status_code=500, detail="SSH key generation timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -155,7 +153,8 @@ async def connect_to_repl(req: ReplConnect):
 async def exec_ssh_command(
     repl_slug: str,
     repl_owner: str,
-    command: str
+    command: str,
+    request: Request
 ):
     """
     Execute command on remote Repl via SSH
@@ -166,11 +165,10 @@ async def exec_ssh_command(
         ssh_host = f"{repl_slug}.{repl_owner}.repl.co"
         
         # Execute command via SSH
-        result = subprocess.run(
+        result = await run_process(
             ['ssh', '-o', 'StrictHostKeyChecking=no', ssh_host, command],
-            capture_output=True,
-            text=True,
-            timeout=30
+            timeout=30,
+            request=request
         )
         
         return JSONResponse({
@@ -180,7 +178,7 @@ async def exec_ssh_command(
             "stderr": result.stderr
         })
     
-    except subprocess.TimeoutExpired:
+    except ProcessTimeout:
         raise HTTPException(status_code=504, detail="Command timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -230,6 +228,7 @@ async def list_replit_apps():
 async def browse_repl_files(
     repl_slug: str,
     repl_owner: str,
+    request: Request,
     path: str = "/home/runner"
 ):
     """Browse files in remote Repl via SSH"""
@@ -237,12 +236,11 @@ async def browse_repl_files(
         ssh_host = f"{repl_slug}.{repl_owner}.repl.co"
         
         # List files with details
-        result = subprocess.run(
+        result = await run_process(
             ['ssh', '-o', 'StrictHostKeyChecking=no', ssh_host, 
              f'ls -lAh --color=never {path}'],
-            capture_output=True,
-            text=True,
-            timeout=15
+            timeout=15,
+            request=request
         )
         
         if result.returncode != 0:
@@ -254,7 +252,7 @@ async def browse_repl_files(
             "output": result.stdout
         })
     
-    except subprocess.TimeoutExpired:
+    except ProcessTimeout:
         raise HTTPException(status_code=504, detail="Browse timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -264,19 +262,19 @@ async def browse_repl_files(
 async def read_repl_file(
     repl_slug: str,
     repl_owner: str,
-    file_path: str
+    file_path: str,
+    request: Request
 ):
     """Read file content from remote Repl via SSH"""
     try:
         ssh_host = f"{repl_slug}.{repl_owner}.repl.co"
         
         # Read file via SSH
-        result = subprocess.run(
+        result = await run_process(
             ['ssh', '-o', 'StrictHostKeyChecking=no', ssh_host, 
              f'cat {file_path}'],
-            capture_output=True,
-            text=True,
-            timeout=15
+            timeout=15,
+            request=request
         )
         
         if result.returncode != 0:
@@ -288,7 +286,7 @@ async def read_repl_file(
             "content": result.stdout
         })
     
-    except subprocess.TimeoutExpired:
+    except ProcessTimeout:
         raise HTTPException(status_code=504, detail="Read timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,524 @@
+"""
+Code search index - per-repository trigram index for literal and regex searches
+Backs the chat grep_code tool and /api/repos/search; persisted and refreshed incrementally
+"""
+import os
+import re
+import math
+import time
+import pickle
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse, sre_constants
+
+from app.services.tree_index import tree_index, RepoTreeIndex, regular_stat, open_regular
+from app.services.file_content import is_binary, SNIFF_BYTES
+
+
+CODE_SEARCH_INDEX_DIR = Path(os.getenv("CODE_SEARCH_INDEX_DIR", "data/code_search"))
+CODE_SEARCH_MAX_REPOS = int(os.getenv("CODE_SEARCH_MAX_REPOS", "8"))
+CODE_SEARCH_MAX_FILE_BYTES = int(os.getenv("CODE_SEARCH_MAX_FILE_BYTES", str(1024 * 1024)))
+CODE_SEARCH_REFRESH_INTERVAL = float(os.getenv("CODE_SEARCH_REFRESH_INTERVAL", "30"))  # seconds
+CODE_SEARCH_DEAD_RATIO = float(os.getenv("CODE_SEARCH_DEAD_RATIO", "0.5"))
+CODE_SEARCH_TOOL_MAX_FILES = int(os.getenv("CODE_SEARCH_TOOL_MAX_FILES", "50"))  # grep_code output
+CODE_SEARCH_MAX_LINE_CHARS = 300
+
+INDEX_FORMAT = 1
+UNINDEXED = -1  # binary files: tracked (so they aren't re-read) but never searched
+
+DEFINITION_LINE = re.compile(
+    r"^\s*(export\s+)?(async\s+)?(def|class|function|const|let|var|interface|type|struct|enum|fn|func)\b"
+)
+LOW_RANK_DIRS = {"test", "tests", "__tests__", "vendor", "dist", "build", "node_modules", "fixtures"}
+
+REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, "POSSESSIVE_REPEAT", None)}
+
+# Query plan: ("and" | "or", [trigram bytes or nested plans]); None matches every file
+Plan = Optional[Tuple[str, List[Union[bytes, tuple]]]]
+
+
+def trigrams(data: bytes) -> Set[bytes]:
+    """Case-folded (ASCII) trigrams that don't span a line break"""
+    data = data.lower()
+    return {bytes(t) for t in set(zip(data, data[1:], data[2:])) if 10 not in t}
+
+
+def _run_plan(runs: List[str]) -> Plan:
+    grams = set()
+    for run in runs:
+        grams |= trigrams(run.encode("utf-8"))
+    return ("and", sorted(grams)) if grams else None
+
+
+def _split_run(text: str) -> List[str]:
+    """Literal runs that can be matched byte-for-byte after lowercasing (non-ASCII breaks a run)"""
+    return [r for r in re.split(r"[\n\x80-\U0010ffff]", text) if len(r) >= 3]
+
+
+def literal_plan(text: str) -> Plan:
+    return _run_plan(_split_run(text))
+
+
+def regex_plan(pattern: str) -> Plan:
+    """Trigrams every match must contain, from the parsed regex (None when nothing is required)"""
+    try:
+        return _sequence_plan(sre_parse.parse(pattern))
+    except Exception:
+        return None
+
+
+def _sequence_plan(seq) -> Plan:
+    items: List[Union[bytes, tuple]] = []
+    run: List[str] = []
+
+    def flush():
+        plan = _run_plan(_split_run("".join(run)))
+        if plan:
+            items.append(plan)
+        run.clear()
+
+    for op, av in seq:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+        elif op is sre_constants.AT:
+            continue  # zero-width anchors don't break a literal run
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            plan = _sequence_plan(av[-1])
+            if plan:
+                items.append(plan)
+        elif op in REPEATS:
+            flush()
+            low, _, sub = av
+            plan = _sequence_plan(sub) if low >= 1 else None
+            if plan:
+                items.append(plan)
+        elif op is sre_constants.BRANCH:
+            flush()
+            branches = [_sequence_plan(b) for b in av[1]]
+            if all(branches):
+                items.append(("or", branches))
+        else:
+            flush()
+    flush()
+    return ("and", items) if items else None
+
+
+class CodeSearchIndex:
+    """
+    Trigram index of one repository's text files
+
+    postings maps each lowercased trigram to the (ascending) ids of files
+    containing it. A changed file gets a new id and its old id goes dead;
+    dead ids are filtered at query time and swept from the postings once
+    they pass dead_ratio. Candidates from the index are verified line by
+    with the real pattern (^/$ per line), so results match grep -n.
+    """
+
+    def __init__(self, root: Path, tree: RepoTreeIndex):
+        self.root = Path(root)
+        self.tree = tree
+        self.index_path = CODE_SEARCH_INDEX_DIR / f"{hashlib.sha1(str(self.root).encode()).hexdigest()[:16]}.idx"
+
+        self._lock = threading.RLock()
+        self.files: Dict[str, Tuple[int, int, int]] = {}  # rel path -> (file id, mtime_ns, size)
+        self.paths: Dict[int, str] = {}  # live file id -> rel path
+        self.unbounded: Set[int] = set()  # text files over the size cap: always candidates
+        self.postings: Dict[bytes, array] = {}
+        self.next_id = 0
+        self.dead = 0
+
+        self._loaded = False
+        self._stale = True
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._refreshing = False
+        self.stats = {"searches": 0, "refreshes": 0, "files_reindexed": 0, "last_refresh_ms": 0.0, "loaded_from_disk": False}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.index_path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        if state.get("format") != INDEX_FORMAT or state.get("root") != str(self.root):
+            return
+        self.files = state["files"]
+        self.postings = state["postings"]
+        self.unbounded = state["unbounded"]
+        self.next_id = state["next_id"]
+        self.dead = state["dead"]
+        self.paths = {fid: rel for rel, (fid, _, _) in self.files.items() if fid != UNINDEXED}
+        self.stats["loaded_from_disk"] = True
+        print(f"[code-search] ✅ Loaded index for {self.root} ({len(self.paths)} files)")
+
+    def save(self):
+        """Write the index atomically (skipped when nothing changed)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            CODE_SEARCH_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump({
+                    "format": INDEX_FORMAT,
+                    "root": str(self.root),
+                    "files": self.files,
+                    "postings": self.postings,
+                    "unbounded": self.unbounded,
+                    "next_id": self.next_id,
+                    "dead": self.dead
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def _retire(self, rel: str):
+        entry = self.files.pop(rel, None)
+        if entry and entry[0] != UNINDEXED:
+            self.paths.pop(entry[0], None)
+            self.unbounded.discard(entry[0])
+            self.dead += 1
+        self._dirty = True
+
+    def _index_file(self, rel: str, st: os.stat_result, checked: Optional[Dict] = None):
+        self._retire(rel)
+        f = open_regular(self.root, rel, checked)
+        if f is None:
+            return
+        try:
+            with f:
+                head = f.read(SNIFF_BYTES)
+                if is_binary(head):
+                    self.files[rel] = (UNINDEXED, st.st_mtime_ns, st.st_size)
+                    return
+                data = head + f.read(CODE_SEARCH_MAX_FILE_BYTES) if st.st_size <= CODE_SEARCH_MAX_FILE_BYTES else None
+        except OSError:
+            return
+        fid = self.next_id
+        self.next_id += 1
+        self.files[rel] = (fid, st.st_mtime_ns, st.st_size)
+        self.paths[fid] = rel
+        if data is None:
+            self.unbounded.add(fid)
+        else:
+            for gram in trigrams(data):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("I")
+                posting.append(fid)
+        self.stats["files_reindexed"] += 1
+
+    def update_file(self, rel: str):
+        """Re-index one file now (after a write), or drop it if it's gone"""
+        with self._lock:
+            self._load()
+            st = regular_stat(self.root, rel)
+            if st is None:
+                self._retire(rel)
+                return
+            self._index_file(rel, st)
+
+    def refresh(self):
+        """Reconcile with the working tree: re-read files whose size/mtime moved, drop deleted ones"""
+        with self._lock:
+            start = time.time()
+            self._load()
+            seen = set()
+            checked = {}
+            for rel in self.tree.files():
+                seen.add(rel)
+                st = regular_stat(self.root, rel)
+                entry = self.files.get(rel)
+                if st is None:
+                    # Gone, or a symlink (never followed out of the repo)
+                    if entry is not None:
+                        self._retire(rel)
+                    continue
+                if entry is None or entry[1] != st.st_mtime_ns or entry[2] != st.st_size:
+                    self._index_file(rel, st, checked)
+            for rel in [r for r in self.files if r not in seen]:
+                self._retire(rel)
+
+            if self.dead and self.dead > CODE_SEARCH_DEAD_RATIO * (self.dead + len(self.paths)):
+                self._sweep()
+            self._stale = False
+            self._last_refresh = time.time()
+            self.stats["refreshes"] += 1
+            self.stats["last_refresh_ms"] = (time.time() - start) * 1000
+            self.save()
+
+    def _sweep(self):
+        """Drop dead ids from every posting list"""
+        live = self.paths
+        for gram in list(self.postings):
+            kept = array("I", (fid for fid in self.postings[gram] if fid in live))
+            if kept:
+                self.postings[gram] = kept
+            else:
+                del self.postings[gram]
+        self.dead = 0
+        self._dirty = True
+
+    def mark_stale(self):
+        """Force a full refresh before the next search (e.g. after a checkout)"""
+        self._stale = True
+
+    def _ensure_fresh(self):
+        if self._stale:
+            self.refresh()
+        elif time.time() - self._last_refresh > CODE_SEARCH_REFRESH_INTERVAL and not self._refreshing:
+            # Edits made through our own tools are applied immediately; this catches outside changes
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, name="code-search-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"[code-search] ⚠️ Refresh failed for {self.root}: {e}")
+        finally:
+            self._refreshing = False
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _evaluate(self, plan) -> Optional[Set[int]]:
+        op, children = plan
+        if op == "or":
+            result: Set[int] = set()
+            for child in children:
+                result |= self._evaluate(child)
+            return result
+        grams = sorted((c for c in children if isinstance(c, bytes)), key=lambda g: len(self.postings.get(g, ())))
+        result = None
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            result = set(posting) if result is None else result.intersection(posting)
+            if not result:
+                return result
+        for child in children:
+            if not isinstance(child, bytes):
+                sub = self._evaluate(child)
+                result = sub if result is None else result & sub
+                if not result:
+                    return result
+        return result
+
+    def candidates(self, plan: Plan, path: str = "") -> List[str]:
+        """Live files that may match plan, restricted to path"""
+        with self._lock:
+            if plan is None:
+                ids = set(self.paths)
+            else:
+                ids = {fid for fid in self._evaluate(plan) if fid in self.paths} | self.unbounded
+            prefix = path.strip("/")
+            return sorted(
+                rel for rel in (self.paths[fid] for fid in ids)
+                if not prefix or rel == prefix or rel.startswith(f"{prefix}/")
+            )
+
+    def search(
+        self,
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = False,
+        path: str = "",
+        limit: int = 100,
+        max_per_file: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Ranked file/line hits for a literal or regex query.
+        Raises ValueError for an invalid regex.
+        """
+        start = time.time()
+        try:
+            flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+            pattern = re.compile(query if regex else re.escape(query), flags)
+        except re.error as e:
+            raise ValueError(f"invalid regex: {e}")
+        plan = regex_plan(query) if regex else literal_plan(query)
+
+        with self._lock:
+            self._load()
+            self._ensure_fresh()
+            self.stats["searches"] += 1
+            candidates = self.candidates(plan, path)
+
+        needle = None if regex else (query if case_sensitive else query.lower())
+
+        # Pass 1: count matches in every candidate and rank on counts and paths,
+        # keeping the text of the current top `limit` files so pass 2 needn't re-read
+        counted = []
+        texts = {}
+        rank = lambda c: (-c[0], c[1])
+        checked = {}
+        for rel in candidates:
+            text = self._read(rel, checked)
+            if text is None:
+                continue
+            if needle is None:
+                count = len(pattern.findall(text))
+            else:
+                count = (text if case_sensitive else text.lower()).count(needle)
+            if count:
+                counted.append((self._score(rel, count, needle, case_sensitive), rel, count))
+                texts[rel] = text
+                if len(texts) > 2 * limit:
+                    top = {c[1] for c in sorted(counted, key=rank)[:limit]}
+                    texts = {r: t for r, t in texts.items() if r in top}
+        counted.sort(key=rank)
+
+        # Pass 2: matching lines only for the files being returned
+        results = []
+        for score, rel, count in counted[:limit]:
+            matches = self._lines(texts[rel], pattern, max_per_file)
+            if any(DEFINITION_LINE.match(m["text"]) for m in matches):
+                score += 2
+            results.append({"path": rel, "score": round(score, 3), "match_count": count, "matches": matches})
+        results.sort(key=lambda r: (-r["score"], r["path"]))
+
+        return {
+            "query": query,
+            "regex": regex,
+            "case_sensitive": case_sensitive,
+            "path": path.strip("/"),
+            "files_indexed": len(self.paths),
+            "files_scanned": len(candidates),
+            "files_matched": len(counted),
+            "total_matches": sum(c[2] for c in counted),
+            "truncated": len(counted) > limit,
+            "elapsed_ms": round((time.time() - start) * 1000, 2),
+            "results": results
+        }
+
+    def _read(self, rel: str, checked: Optional[Dict] = None) -> Optional[str]:
+        f = open_regular(self.root, rel, checked)
+        if f is None:
+            return None
+        try:
+            with f:
+                return f.read().decode("utf-8", "replace")
+        except OSError:
+            return None
+
+    @staticmethod
+    def _lines(text: str, pattern: re.Pattern, max_per_file: int) -> List[Dict[str, Any]]:
+        """First max_per_file matching lines as {line, text}"""
+        matches = []
+        lineno = 1
+        counted_to = 0
+        last_line_start = -1
+        for m in pattern.finditer(text):
+            line_start = text.rfind("\n", 0, m.start()) + 1
+            if line_start == last_line_start:
+                continue
+            lineno += text.count("\n", counted_to, line_start)
+            counted_to = last_line_start = line_start
+            line_end = text.find("\n", line_start)
+            line = text[line_start:line_end if line_end != -1 else len(text)]
+            matches.append({"line": lineno, "text": line.rstrip("\r")[:CODE_SEARCH_MAX_LINE_CHARS]})
+            if len(matches) >= max_per_file:
+                break
+        return matches
+
+    @staticmethod
+    def _score(rel: str, count: int, needle: Optional[str], case_sensitive: bool) -> float:
+        """More matches and filename hits rank higher; deep and test/vendor paths lower (definitions add 2 later)"""
+        parts = rel.split("/")
+        score = math.log1p(count)
+        if needle and needle in (parts[-1] if case_sensitive else parts[-1].lower()):
+            score += 3
+        if LOW_RANK_DIRS.intersection(parts[:-1]):
+            score -= 1
+        return score - 0.05 * len(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "files": len(self.paths),
+            "dead_ids": self.dead,
+            "trigrams": len(self.postings),
+            "postings": sum(len(p) for p in self.postings.values()),
+            "index_path": str(self.index_path)
+        }
+
+
+class CodeSearchRegistry:
+    """One CodeSearchIndex per repository root, least-recently-used evicted (saved on eviction)"""
+
+    def __init__(self, max_repos: int = CODE_SEARCH_MAX_REPOS):
+        self.max_repos = max_repos
+        self._indexes: "OrderedDict[Path, CodeSearchIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, root: Path) -> CodeSearchIndex:
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self._indexes[root] = CodeSearchIndex(root, tree_index.get(root))
+            self._indexes.move_to_end(root)
+            while len(self._indexes) > self.max_repos:
+                _, evicted = self._indexes.popitem(last=False)
+                evicted.save()
+            return index
+
+    def notify_write(self, file_path: str):
+        """Re-index a written file in whichever open index contains it"""
+        path = Path(file_path).resolve()
+        with self._lock:
+            indexes = list(self._indexes.items())
+        for root, index in indexes:
+            if root in path.parents:
+                index.update_file(path.relative_to(root).as_posix())
+
+    def mark_stale(self, root: Path):
+        with self._lock:
+            index = self._indexes.get(root)
+        if index is not None:
+            index.mark_stale()
+
+    def save_all(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            try:
+                index.save()
+            except Exception as e:
+                print(f"[code-search] ⚠️ Failed to save index for {index.root}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {str(root): index.get_stats() for root, index in self._indexes.items()}
+
+
+def repo_root_for(path: Path) -> Path:
+    """Nearest enclosing git work tree, or path itself"""
+    for candidate in (path, *path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return path
+
+
+# Global singleton
+code_search = CodeSearchRegistry()
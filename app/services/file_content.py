@@ -0,0 +1,191 @@
+"""
+File content responses - chunked streaming, HTTP Range, line ranges and conditional GETs
+Shared by /api/repos/file (working tree) and /api/ai/file (git mirror blobs, streamed async)
+"""
+import os
+import codecs
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Optional, Iterator, AsyncIterator, Callable, Tuple, Union
+
+from fastapi import Request
+from fastapi.responses import Response, PlainTextResponse, StreamingResponse
+
+
+CONTENT_CHUNK_SIZE = int(os.getenv("FILE_CONTENT_CHUNK_SIZE", str(64 * 1024)))
+SNIFF_BYTES = 8192
+
+BINARY_PLACEHOLDER = "[binary file]"
+TEXT_MEDIA_TYPE = "text/plain; charset=utf-8"
+
+
+def is_binary(head: bytes) -> bool:
+    """Binary if the first few KB contain NUL or aren't valid UTF-8 (a cut-off trailing character is fine)"""
+    if b"\0" in head:
+        return True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def iter_file(path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Bytes [start, end] of a file (end inclusive) in CONTENT_CHUNK_SIZE chunks"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(CONTENT_CHUNK_SIZE if remaining is None else min(CONTENT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def iter_lines(chunks: Iterator[bytes], start_line: int = 1, end_line: Optional[int] = None) -> Iterator[bytes]:
+    """Lines start_line..end_line (1-based, inclusive) of a chunk stream, stopping early at end_line"""
+    lineno = 1
+    pending = b""
+    try:
+        for chunk in chunks:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if end_line is not None and lineno > end_line:
+                    return
+                if lineno >= start_line:
+                    yield line + b"\n"
+                lineno += 1
+        if pending and lineno >= start_line and (end_line is None or lineno <= end_line):
+            yield pending
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes], start_line: int = 1, end_line: Optional[int] = None) -> AsyncIterator[bytes]:
+    """iter_lines for an async chunk stream"""
+    lineno = 1
+    pending = b""
+    try:
+        async for chunk in chunks:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if end_line is not None and lineno > end_line:
+                    return
+                if lineno >= start_line:
+                    yield line + b"\n"
+                lineno += 1
+        if pending and lineno >= start_line and (end_line is None or lineno <= end_line):
+            yield pending
+    finally:
+        await chunks.aclose()
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) for a single 'bytes=' range, end inclusive.
+    Returns None for headers we don't handle (multipart ranges, other units) - serve the full body.
+    Raises ValueError when the range can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                raise ValueError("empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(f"malformed range {header!r}")
+    if start >= size or start > end:
+        raise ValueError(f"range {header!r} outside {size} bytes")
+    return start, end
+
+
+def not_modified(request: Request, etag: str, mtime: Optional[float]) -> bool:
+    """If-None-Match wins over If-Modified-Since (RFC 9110)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def content_response(
+    request: Request,
+    size: int,
+    head: bytes,
+    read: Callable[[int, Optional[int]], Union[Iterator[bytes], AsyncIterator[bytes]]],
+    etag: str,
+    mtime: Optional[float] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None
+) -> Response:
+    """
+    Build the response for a file
+
+    Args:
+        size: Total bytes
+        head: First SNIFF_BYTES of the content (binary detection)
+        read: read(start, end) -> chunk iterator (sync or async) over bytes [start, end]
+        etag: Quoted validator (size/mtime for files, blob SHA for git)
+        mtime: Last-Modified timestamp, when known
+        start_line/end_line: Stream only these lines (1-based, inclusive)
+    """
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": "no-cache"}
+    if mtime is not None:
+        headers["Last-Modified"] = formatdate(mtime, usegmt=True)
+
+    if not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    if is_binary(head):
+        return PlainTextResponse(BINARY_PLACEHOLDER, headers=headers)
+
+    if start_line is not None or end_line is not None:
+        chunks = read(0, None)
+        lines = aiter_lines if hasattr(chunks, "__aiter__") else iter_lines
+        return StreamingResponse(
+            lines(chunks, start_line or 1, end_line),
+            media_type=TEXT_MEDIA_TYPE,
+            headers=headers
+        )
+
+    headers["Accept-Ranges"] = "bytes"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(read(start, end), status_code=206, media_type=TEXT_MEDIA_TYPE, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(read(0, None), media_type=TEXT_MEDIA_TYPE, headers=headers)
+
+
+def file_etag(st: os.stat_result) -> str:
+    """Validator for a working-tree file (changes with size or mtime)"""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def read_head(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(SNIFF_BYTES)
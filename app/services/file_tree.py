@@ -0,0 +1,105 @@
+"""
+Workspace file tree snapshot - cached directory listings for /api/files/tree
+Listings are reused while a directory's mtime is unchanged and dropped when the chat tools write
+"""
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+
+# Large build artifacts and version control; hidden files (.env, .replit, ...) stay visible like Replit's tree
+SKIPPED_NAMES = {'__pycache__', 'node_modules', '.git', 'venv', '.venv', 'dist', 'build'}
+
+
+class FileTreeSnapshot:
+    """
+    Per-directory listing cache: dir -> (mtime_ns, [(name, is_dir)])
+
+    A listing is re-read only when its directory's mtime moves or a write
+    through invalidate() touched it (mtime granularity can hide same-tick
+    writes). ETags hash the mtime and generation of every directory in a
+    response; invalidation bumps the generation of the written path and its
+    ancestors only, so writes elsewhere don't invalidate a client's cache.
+    """
+
+    def __init__(self):
+        self._listings: Dict[str, Tuple[int, List[Tuple[str, bool]]]] = {}
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}  # dir -> writes seen through invalidate()
+        self.stats = {"hits": 0, "scans": 0, "invalidations": 0}
+
+    def _listing(self, directory: str) -> Tuple[int, List[Tuple[str, bool]]]:
+        """(mtime, entries) for directory, dirs first then by name"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return 0, []
+        with self._lock:
+            cached = self._listings.get(directory)
+        if cached and cached[0] == mtime:
+            self.stats["hits"] += 1
+            return cached
+        try:
+            with os.scandir(directory) as it:
+                entries = [(e.name, e.is_dir()) for e in it if e.name not in SKIPPED_NAMES]
+        except OSError:
+            entries = []
+        entries.sort(key=lambda e: (not e[1], e[0]))
+        with self._lock:
+            self._listings[directory] = (mtime, entries)
+        self.stats["scans"] += 1
+        return mtime, entries
+
+    def tree(self, directory: str = ".", depth: Optional[int] = None) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Nested listing of directory down to depth levels (None = unlimited)
+        and its ETag. Every directory carries child_count; children is empty
+        below the depth limit.
+        """
+        digest = hashlib.sha256(f"{directory}\0{depth}\0".encode())
+
+        def listing(current: str) -> List[Tuple[str, bool]]:
+            mtime, entries = self._listing(current)
+            digest.update(f"{current}\0{mtime}\0{self._generations.get(current, 0)}\0".encode())
+            return entries
+
+        def walk(current: str, level: int) -> List[Dict[str, Any]]:
+            entries = listing(current)
+            items = []
+            for name, is_dir in entries:
+                path = str(Path(current) / name)
+                item = {
+                    "name": name,
+                    "path": path,
+                    "type": "directory" if is_dir else "file",
+                    "children": []
+                }
+                if is_dir:
+                    if depth is None or level < depth:
+                        item["children"] = walk(path, level + 1)
+                        item["child_count"] = len(item["children"])
+                    else:
+                        item["child_count"] = len(listing(path))
+                items.append(item)
+            return items
+
+        items = walk(directory, 1)
+        return items, f'"{digest.hexdigest()[:32]}"'
+
+    def invalidate(self, file_path: str):
+        """Drop cached listings for a written path and every ancestor directory"""
+        path = Path(os.path.relpath(os.path.abspath(file_path)))
+        with self._lock:
+            for parent in [path, *path.parents]:
+                self._listings.pop(str(parent), None)
+                self._generations[str(parent)] = self._generations.get(str(parent), 0) + 1
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "directories": len(self._listings), "generations": len(self._generations)}
+
+
+# Global singleton
+file_tree = FileTreeSnapshot()
@@ -0,0 +1,118 @@
+"""
+LLM client registry - process-wide pooled HTTP clients for provider APIs
+One keep-alive (HTTP/2 when h2 is installed) connection pool per provider + API key
+"""
+import hashlib
+import importlib.util
+from typing import Dict, Any, Optional, Tuple
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+
+class PoolStats:
+    """Per-pool counters fed by the httpcore trace extension"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+
+    async def trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    async def on_request(self, request):
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": 1 - self.connections_opened / self.requests if self.requests else None
+        }
+
+
+def _open_connections(client) -> Optional[int]:
+    """Best-effort count of live connections in an httpx client's pool"""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return len(connections) if connections is not None else None
+
+
+class LLMClientRegistry:
+    """Shared AsyncOpenAI / httpx clients keyed by (provider, API key, base URL)"""
+
+    def __init__(self):
+        self._openai: Dict[Tuple[str, str, Optional[str]], AsyncOpenAI] = {}
+        self._http: Dict[Tuple[str, str], httpx.AsyncClient] = {}
+        self._stats: Dict[Tuple, PoolStats] = {}
+
+    @staticmethod
+    def _key_id(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+    def openai(self, api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """AsyncOpenAI client sharing one connection pool per API key"""
+        key = ("openai", self._key_id(api_key), base_url)
+        client = self._openai.get(key)
+        if client is None:
+            stats = self._stats.setdefault(key, PoolStats())
+            http_client = openai.DefaultAsyncHttpxClient(
+                http2=HTTP2_ENABLED,
+                event_hooks={"request": [stats.on_request]}
+            )
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            self._openai[key] = client
+        return client
+
+    def http(self, provider: str, api_key: str) -> httpx.AsyncClient:
+        """Raw httpx client for endpoints the SDKs don't cover (e.g. /v1/responses)"""
+        key = (provider, self._key_id(api_key))
+        client = self._http.get(key)
+        if client is None:
+            stats = self._stats.setdefault(key, PoolStats())
+            client = httpx.AsyncClient(
+                http2=HTTP2_ENABLED,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60),
+                event_hooks={"request": [stats.on_request]}
+            )
+            self._http[key] = client
+        return client
+
+    def get_stats(self) -> Dict[str, Any]:
+        pools = []
+        for key, stats in self._stats.items():
+            client = self._openai.get(key)
+            http_client = client._client if client is not None else self._http.get(key)
+            pools.append({
+                "provider": key[0],
+                "key_id": key[1],
+                "kind": "sdk" if client is not None else "http",
+                "http2": HTTP2_ENABLED,
+                "open_connections": _open_connections(http_client),
+                **stats.snapshot()
+            })
+        return {"pools": pools}
+
+    async def aclose(self):
+        """Close every pool (called from the app lifespan on shutdown)"""
+        for client in self._openai.values():
+            await client.close()
+        for client in self._http.values():
+            await client.aclose()
+        self._openai.clear()
+        self._http.clear()
+        self._stats.clear()
+
+
+# Global singleton
+llm_clients = LLMClientRegistry()
@@ -0,0 +1,462 @@
+"""
+Assistant memory store - single-file append-only log with an in-memory version index
+Replaces one pretty-printed JSON file per write with compact JSONL records in data/memory/memory.log
+
+The Node side (server/eidolon/core/memory-store.ts) still uses the file layout,
+so the log stays compatible both ways: every write also refreshes
+{key}.latest.json, and versioned {key}.{version}.json files written later are
+imported into the log when the directory changes.
+"""
+import os
+import re
+import json
+import difflib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+
+MEMORY_DIR = Path(os.getenv("MEMORY_DIR", "data/memory"))
+MEMORY_MAX_VERSIONS = int(os.getenv("MEMORY_MAX_VERSIONS", "0"))  # per key, 0 = unlimited
+MEMORY_MAX_AGE_DAYS = float(os.getenv("MEMORY_MAX_AGE_DAYS", "0"))  # 0 = keep forever
+MEMORY_CACHE_ENTRIES = int(os.getenv("MEMORY_CACHE_ENTRIES", "256"))
+MEMORY_COMPACT_MIN_BYTES = int(os.getenv("MEMORY_COMPACT_MIN_BYTES", str(1024 * 1024)))
+MEMORY_COMPACT_GARBAGE_RATIO = float(os.getenv("MEMORY_COMPACT_GARBAGE_RATIO", "0.5"))
+MEMORY_FSYNC = os.getenv("MEMORY_FSYNC", "false").lower() == "true"
+MEMORY_LATEST_FILES = os.getenv("MEMORY_LATEST_FILES", "true").lower() == "true"  # {key}.latest.json for the Node store
+
+# Per-write files: {key}.{version}.json, version like 2025-10-08T01-12-00-123456 (Python) or ...-123Z (Node)
+LEGACY_VERSION_FILE = re.compile(r"^(?P<key>.+)\.(?P<version>\d{4}-\d{2}-\d{2}T[\d-]+Z?)\.json$")
+
+
+@dataclass
+class MemoryVersion:
+    """Index entry: where one version's record lives in the log"""
+    version: str
+    created_at: str
+    offset: int
+    length: int
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class MemoryLogStore:
+    """
+    Append-only memory log
+
+    Record kinds (one compact JSON object per line):
+        {"k": key, "v": version, "t": created_at, "d": data}   write
+        {"op": "prune", "k": key, "vs": [versions]}            drop versions
+        {"op": "delete", "k": key}                              drop key
+        {"op": "legacy", "m": mtime_ns}                         per-write files imported up to mtime
+
+    The index (key -> versions in write order) is rebuilt by replaying the
+    log at startup. Retention (max versions / max age, the latest version is
+    always kept) only hides versions from the index; compaction rewrites the
+    log with live records once garbage dominates, in a background thread.
+
+    Several processes (e.g. uvicorn workers) may share the log: every
+    operation holds an flock on memory.log.lock (shared for reads, exclusive
+    for appends and compaction) and first catches up on records appended by
+    others, or replays from scratch if the log was replaced by a compaction.
+    A torn tail is only truncated under the exclusive lock.
+
+    Node compatibility: write() refreshes {key}.latest.json (same payload as
+    the Node writeJson) and delete() removes it. Versioned files the Node side
+    writes are imported when the directory mtime changes (the scan takes the
+    exclusive lock); the "legacy" watermark record keeps a file from being
+    imported twice, across restarts and compactions. Deletes made on the Node
+    side by removing files are not mirrored into the log.
+    """
+
+    def __init__(
+        self,
+        directory: Path = MEMORY_DIR,
+        max_versions: int = MEMORY_MAX_VERSIONS,
+        max_age_days: float = MEMORY_MAX_AGE_DAYS,
+        cache_entries: int = MEMORY_CACHE_ENTRIES
+    ):
+        self.directory = Path(directory)
+        self.path = self.directory / "memory.log"
+        self.max_versions = max_versions
+        self.max_age_days = max_age_days
+        self.cache_entries = cache_entries
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, List[MemoryVersion]] = {}
+        self._cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()  # (key, version) -> data
+        self._file = None
+        self._lock_file = None
+        self._lock_depth = 0
+        self._exclusive = False
+        self._size = 0
+        self._legacy_mtime = 0  # newest imported per-write file (ns)
+        self._dir_mtime: Optional[int] = None
+        self._compacting = False
+        self.stats = {
+            "writes": 0, "reads": 0, "cache_hits": 0, "compactions": 0, "retention_dropped": 0, "external_syncs": 0
+        }
+
+    # ------------------------------------------------------------------
+    # Log file
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False):
+        """Thread lock + cross-process file lock, with the index caught up to the log"""
+        with self._lock:
+            if self._lock_file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._lock_file = open(self.path.with_suffix(".log.lock"), "a")
+            outermost = self._lock_depth == 0
+            if outermost:
+                # Opening (torn-tail repair) and importing per-write files append, so they need the exclusive lock
+                exclusive = exclusive or self._file is None or self._directory_changed()
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._exclusive = exclusive or fcntl is None
+            self._lock_depth += 1
+            try:
+                if outermost:
+                    self._open()
+                    self._sync()
+                    if self._exclusive and self._directory_changed():
+                        self._dir_mtime = self._stat_directory()
+                        self._import_legacy(self._legacy_mtime)
+                yield
+            finally:
+                self._lock_depth -= 1
+                if outermost:
+                    self._exclusive = False
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _open(self):
+        """Load the index on first use (per-write files are imported by the directory check that follows)"""
+        if self._file is not None:
+            return
+        self._file = open(self.path, "ab+")
+        self._replay()
+        if self._size and not self._legacy_mtime:
+            # Log from before the watermark: its one-time import already covered older files,
+            # and re-importing them would bring back pruned or deleted versions
+            self._append({"op": "legacy", "m": os.fstat(self._file.fileno()).st_mtime_ns})
+
+    def _stat_directory(self) -> Optional[int]:
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _directory_changed(self) -> bool:
+        """Files were added or removed in the memory directory since the last import scan"""
+        return self._stat_directory() != self._dir_mtime
+
+    def _sync(self):
+        """Pick up changes other processes made since our last look (caller holds the file lock)"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != os.fstat(self._file.fileno()).st_ino:
+            # Compacted elsewhere: the old inode is stale
+            self._file.close()
+            self._file = open(self.path, "ab+")
+            self._replay()
+            self.stats["external_syncs"] += 1
+        elif st.st_size != self._size:
+            self._replay(self._size if st.st_size > self._size else 0)
+            self.stats["external_syncs"] += 1
+
+    def _replay(self, start: int = 0):
+        """Apply records from byte start to the end (0 rebuilds the index)"""
+        if not start:
+            self._index = {}
+            self._legacy_mtime = 0
+        offset = start
+        good = start
+        self._file.seek(start)
+        for line in self._file:
+            length = len(line)
+            if not line.endswith(b"\n"):
+                break  # torn final write
+            try:
+                record = json.loads(line)
+                self._apply(record, offset, length)
+            except (ValueError, KeyError) as e:
+                print(f"[memory] ⚠️ Skipping unreadable record at byte {offset}: {e}")
+            offset += length
+            good = offset
+        if good < self._file.seek(0, os.SEEK_END) and self._exclusive:
+            # Under a shared lock another reader may be replaying too; the next exclusive holder repairs it
+            print(f"[memory] ⚠️ Truncating torn tail of {self.path} at byte {good}")
+            self._file.truncate(good)
+        self._size = good
+        for key in list(self._index):
+            self._enforce_retention(key)
+
+    def _apply(self, record: Dict[str, Any], offset: int, length: int):
+        op = record.get("op")
+        if op == "legacy":
+            self._legacy_mtime = max(self._legacy_mtime, record["m"])
+            return
+        key = record["k"]
+        if op is None:
+            self._index.setdefault(key, []).append(MemoryVersion(record["v"], record["t"], offset, length))
+        elif op == "prune":
+            dropped = set(record["vs"])
+            versions = [v for v in self._index.get(key, []) if v.version not in dropped]
+            if versions:
+                self._index[key] = versions
+            else:
+                self._index.pop(key, None)
+        elif op == "delete":
+            self._index.pop(key, None)
+
+    def _append(self, record: Dict[str, Any]) -> Tuple[int, int]:
+        """Append under the exclusive lock; the offset comes from the file, not our cached size"""
+        data = _dumps(record)
+        offset = os.fstat(self._file.fileno()).st_size
+        if offset != self._size:
+            self._replay(self._size if offset > self._size else 0)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self._file.flush()
+        if MEMORY_FSYNC:
+            os.fsync(self._file.fileno())
+        self._size = offset + len(data)
+        self._apply(record, offset, len(data))
+        return offset, len(data)
+
+    def _read_record(self, entry: MemoryVersion) -> Dict[str, Any]:
+        return json.loads(os.pread(self._file.fileno(), entry.length, entry.offset))
+
+    def _import_legacy(self, since_ns: int = 0):
+        """Import {key}.{version}.json files (old tool / Node store) modified at or after since_ns"""
+        legacy = []
+        newest = since_ns
+        for path in self.directory.glob("*.json"):
+            match = LEGACY_VERSION_FILE.match(path.name)
+            if not match:
+                continue
+            try:
+                mtime = path.stat().st_mtime_ns
+                if mtime <= since_ns or any(v.version == match["version"] for v in self._index.get(match["key"], [])):
+                    continue
+                payload = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            newest = max(newest, mtime)
+            legacy.append((mtime, match["version"], match["key"], payload))
+        for _, version, key, payload in sorted(legacy):
+            self._append({"k": key, "v": version, "t": payload.get("createdAt", ""), "d": payload.get("data")})
+            self._enforce_retention(key)
+        if legacy:
+            self._append({"op": "legacy", "m": newest})
+            print(f"[memory] ✅ Imported {len(legacy)} per-write memory versions into {self.path}")
+
+    def _write_latest_file(self, key: str, version: str, created_at: str, data: Any):
+        """Refresh {key}.latest.json, which the Node memory store reads (atomic rename)"""
+        if not MEMORY_LATEST_FILES or "/" in key or key.startswith("."):
+            return
+        path = self.directory / f"{key}.latest.json"
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps({"version": version, "createdAt": created_at, "data": data}, indent=2, ensure_ascii=False))
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------
+    # Retention / compaction
+    # ------------------------------------------------------------------
+
+    def _enforce_retention(self, key: str):
+        """Hide versions beyond max_versions or older than max_age_days (latest always kept)"""
+        versions = self._index.get(key)
+        if not versions:
+            return
+        keep = versions
+        if self.max_versions:
+            keep = keep[-self.max_versions:]
+        if self.max_age_days:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+            keep = [v for v in keep[:-1] if v.created_at >= cutoff] + keep[-1:]
+        if len(keep) < len(versions):
+            self.stats["retention_dropped"] += len(versions) - len(keep)
+            for v in versions:
+                if v not in keep:
+                    self._cache.pop((key, v.version), None)
+            self._index[key] = keep
+
+    def live_bytes(self) -> int:
+        return sum(v.length for versions in self._index.values() for v in versions)
+
+    def _maybe_compact(self):
+        if self._compacting or self._size < MEMORY_COMPACT_MIN_BYTES:
+            return
+        if 1 - self.live_bytes() / self._size < MEMORY_COMPACT_GARBAGE_RATIO:
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name="memory-compactor", daemon=True).start()
+
+    def compact(self):
+        """Rewrite the log with only live versions (atomic rename)"""
+        try:
+            with self._locked(exclusive=True):
+                before = self._size
+                tmp = self.path.with_suffix(".log.compact")
+                index: Dict[str, List[MemoryVersion]] = {}
+                offset = 0
+                with open(tmp, "wb") as out:
+                    for key, versions in self._index.items():
+                        for entry in versions:
+                            data = os.pread(self._file.fileno(), entry.length, entry.offset)
+                            out.write(data)
+                            index.setdefault(key, []).append(
+                                MemoryVersion(entry.version, entry.created_at, offset, len(data))
+                            )
+                            offset += len(data)
+                    if self._legacy_mtime:
+                        data = _dumps({"op": "legacy", "m": self._legacy_mtime})
+                        out.write(data)
+                        offset += len(data)
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp, self.path)
+                self._file.close()
+                self._file = open(self.path, "ab+")
+                self._index = index
+                self._size = offset
+                self.stats["compactions"] += 1
+                print(f"[memory] ✅ Compacted {self.path}: {before} -> {offset} bytes")
+        finally:
+            self._compacting = False
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def write(self, key: str, data: Any) -> str:
+        """Append a new version of key; returns its version id"""
+        with self._locked(exclusive=True):
+            now = datetime.now()
+            version = now.isoformat().replace(":", "-").replace(".", "-")
+            existing = self._index.get(key)
+            if existing and existing[-1].version >= version:
+                version = f"{existing[-1].version}-1"
+            self._append({"k": key, "v": version, "t": now.isoformat(), "d": data})
+            self._write_latest_file(key, version, now.isoformat(), data)
+            self._cache[(key, version)] = data
+            self._trim_cache()
+            self._enforce_retention(key)
+            self.stats["writes"] += 1
+            self._maybe_compact()
+            return version
+
+    def read(self, key: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """{"version", "createdAt", "data"} for the latest (or given) version, None if absent"""
+        with self._locked():
+            self.stats["reads"] += 1
+            versions = self._index.get(key)
+            if not versions:
+                return None
+            entry = versions[-1] if version is None else next((v for v in versions if v.version == version), None)
+            if entry is None:
+                return None
+            cache_key = (key, entry.version)
+            if cache_key in self._cache:
+                self._cache.move_to_end(cache_key)
+                self.stats["cache_hits"] += 1
+                data = self._cache[cache_key]
+            else:
+                data = self._read_record(entry)["d"]
+                self._cache[cache_key] = data
+                self._trim_cache()
+            return {"version": entry.version, "createdAt": entry.created_at, "data": data}
+
+    def _trim_cache(self):
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def versions(self, key: str) -> List[Dict[str, Any]]:
+        """Live versions of key, oldest first (index only, no file reads)"""
+        with self._locked():
+            return [
+                {"version": v.version, "createdAt": v.created_at, "bytes": v.length}
+                for v in self._index.get(key, [])
+            ]
+
+    def keys(self) -> List[str]:
+        with self._locked():
+            return sorted(self._index)
+
+    def diff(self, key: str, from_version: Optional[str] = None, to_version: Optional[str] = None) -> Optional[str]:
+        """Unified diff between two versions (default: previous -> latest)"""
+        with self._locked():
+            versions = [v["version"] for v in self.versions(key)]
+            if not versions:
+                return None
+            to_version = to_version or versions[-1]
+            if from_version is None:
+                if to_version not in versions or versions.index(to_version) == 0:
+                    return None
+                from_version = versions[versions.index(to_version) - 1]
+            old = self.read(key, from_version)
+            new = self.read(key, to_version)
+        if old is None or new is None:
+            return None
+        render = lambda r: json.dumps(r["data"], indent=2, sort_keys=True, ensure_ascii=False).splitlines(keepends=True)
+        return "".join(difflib.unified_diff(
+            render(old), render(new),
+            fromfile=f"{key}@{from_version}", tofile=f"{key}@{to_version}"
+        ))
+
+    def prune(self, key: str, keep: int = 1) -> int:
+        """Drop all but the newest `keep` versions of key; returns how many were dropped"""
+        with self._locked(exclusive=True):
+            versions = self._index.get(key, [])
+            dropped = [v.version for v in versions[:max(0, len(versions) - max(keep, 0))]]
+            if not dropped:
+                return 0
+            self._append({"op": "prune", "k": key, "vs": dropped})
+            for version in dropped:
+                self._cache.pop((key, version), None)
+            self._maybe_compact()
+            return len(dropped)
+
+    def delete(self, key: str) -> bool:
+        with self._locked(exclusive=True):
+            if key not in self._index:
+                return False
+            self._append({"op": "delete", "k": key})
+            if MEMORY_LATEST_FILES and "/" not in key:
+                (self.directory / f"{key}.latest.json").unlink(missing_ok=True)
+            self._cache = OrderedDict((k, v) for k, v in self._cache.items() if k[0] != key)
+            self._maybe_compact()
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._locked():
+            live = self.live_bytes()
+            return {
+                **self.stats,
+                "keys": len(self._index),
+                "versions": sum(len(v) for v in self._index.values()),
+                "log_bytes": self._size,
+                "live_bytes": live,
+                "garbage_ratio": 1 - live / self._size if self._size else 0,
+                "cache_entries": len(self._cache)
+            }
+
+
+# Global singleton
+memory_store = MemoryLogStore()
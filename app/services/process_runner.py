@@ -0,0 +1,243 @@
+"""
+Async process runner - non-blocking git/ssh execution for route handlers
+Bounded concurrency, per-command timeouts, streamed capture, kill on client disconnect
+"""
+import os
+import asyncio
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Optional, Callable, Union, AsyncIterator
+
+from fastapi import Request
+
+
+PROCESS_MAX_CONCURRENCY = int(os.getenv("PROCESS_MAX_CONCURRENCY", "8"))
+PROCESS_MAX_STREAMS = int(os.getenv("PROCESS_MAX_STREAMS", "16"))  # stream_process: paced by clients, own limit
+CHUNK_SIZE = 64 * 1024
+
+_semaphore = asyncio.Semaphore(PROCESS_MAX_CONCURRENCY)
+_stream_semaphore = asyncio.Semaphore(PROCESS_MAX_STREAMS)
+
+# Server event loop, for run_process_sync callers in worker threads (set at startup)
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class ProcessTimeout(Exception):
+    """Raised when a command exceeds its timeout (the process is killed first)"""
+
+    def __init__(self, cmd: List[str], timeout: float):
+        self.cmd = cmd
+        self.timeout = timeout
+        super().__init__(f"Command timed out after {timeout:g}s: {' '.join(cmd)}")
+
+
+@dataclass
+class ProcessResult:
+    """Completed process output"""
+    cmd: List[str]
+    returncode: int
+    stdout: Union[str, bytes]
+    stderr: Union[str, bytes]
+
+
+async def _drain(stream: asyncio.StreamReader, sink: List[bytes], callback: Optional[Callable[[bytes], None]]):
+    while True:
+        chunk = await stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        sink.append(chunk)
+        if callback:
+            callback(chunk)
+
+
+async def _feed(stream: asyncio.StreamWriter, data: bytes):
+    try:
+        stream.write(data)
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        stream.close()
+
+
+async def _wait_disconnect(request: Request, interval: float = 0.5):
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+
+def _consume(task: asyncio.Future):
+    if not task.cancelled():
+        task.exception()
+
+
+def _kill(proc: asyncio.subprocess.Process):
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+
+
+async def run_process(
+    cmd: List[str],
+    cwd: Optional[Union[str, Path]] = None,
+    timeout: Optional[float] = 60.0,
+    text: bool = True,
+    env: Optional[Dict[str, str]] = None,
+    request: Optional[Request] = None,
+    on_stdout: Optional[Callable[[bytes], None]] = None,
+    input: Optional[bytes] = None,
+) -> ProcessResult:
+    """
+    Run a command without blocking the event loop
+
+    Args:
+        cmd: Program and arguments (no shell)
+        cwd: Working directory
+        timeout: Seconds before the process is killed and ProcessTimeout raised
+        text: Decode stdout/stderr as UTF-8 (bytes otherwise)
+        env: Extra environment variables merged over os.environ
+        request: If given, the process is killed when this client disconnects
+        on_stdout: Called with each stdout chunk as it arrives
+        input: Bytes written to the process's stdin (DEVNULL otherwise)
+
+    Raises:
+        ProcessTimeout on timeout, asyncio.CancelledError on cancel/disconnect
+    """
+    async with _semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=str(cwd) if cwd else None,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, **env} if env else None,
+        )
+        out: List[bytes] = []
+        err: List[bytes] = []
+        io_task = asyncio.ensure_future(asyncio.gather(
+            _drain(proc.stdout, out, on_stdout),
+            _drain(proc.stderr, err, None),
+            *([_feed(proc.stdin, input)] if input is not None else []),
+            proc.wait(),
+        ))
+        io_task.add_done_callback(_consume)
+        disconnect_task = asyncio.ensure_future(_wait_disconnect(request)) if request is not None else None
+
+        try:
+            waiters = {io_task} | ({disconnect_task} if disconnect_task else set())
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if io_task not in done:
+                _kill(proc)
+                if disconnect_task in done:
+                    print(f"[proc] Client disconnected, killed: {' '.join(cmd)}")
+                    raise asyncio.CancelledError()
+                raise ProcessTimeout(cmd, timeout)
+            io_task.result()
+        finally:
+            if disconnect_task:
+                disconnect_task.cancel()
+            if not io_task.done():
+                # Killing the process closes its pipes, letting the readers finish
+                _kill(proc)
+                try:
+                    await asyncio.wait_for(asyncio.shield(io_task), 5)
+                except BaseException:
+                    io_task.cancel()
+
+    stdout = b"".join(out)
+    stderr = b"".join(err)
+    if text:
+        stdout = stdout.decode("utf-8", "replace")
+        stderr = stderr.decode("utf-8", "replace")
+    return ProcessResult(cmd=list(cmd), returncode=proc.returncode, stdout=stdout, stderr=stderr)
+
+
+async def stream_process(
+    cmd: List[str],
+    cwd: Optional[Union[str, Path]] = None,
+    env: Optional[Dict[str, str]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield a command's stdout in chunks as the consumer asks for them
+
+    Nothing is buffered beyond one pipe read, so a slow client throttles the
+    process instead of memory growing. The process is killed as soon as the
+    consumer stops (range satisfied, client gone). stderr is discarded.
+    Streams have their own concurrency limit so long downloads can't starve
+    run_process callers.
+    """
+    async with _stream_semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=str(cwd) if cwd else None,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env={**os.environ, **env} if env else None,
+        )
+        try:
+            while True:
+                chunk = await proc.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            _kill(proc)
+            await proc.wait()
+
+
+def bind_loop(loop: asyncio.AbstractEventLoop):
+    """Register the server's event loop so worker threads can use run_process_sync"""
+    global _loop
+    _loop = loop
+
+
+def run_process_sync(
+    cmd: List[str],
+    cwd: Optional[Union[str, Path]] = None,
+    timeout: Optional[float] = 60.0,
+    text: bool = True,
+    env: Optional[Dict[str, str]] = None,
+    input: Optional[bytes] = None,
+) -> ProcessResult:
+    """
+    Blocking run_process for code running in worker threads (asyncio.to_thread,
+    executor tools, background refreshes). The command runs on the server loop,
+    so it shares the concurrency limit, timeout and kill handling. Without a
+    bound loop (scripts, benchmarks) it falls back to subprocess.run.
+
+    Raises:
+        ProcessTimeout on timeout; RuntimeError if called on the server loop itself
+    """
+    loop = _loop
+    if loop is not None and loop.is_running():
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("run_process_sync called on the event loop; await run_process instead")
+        future = asyncio.run_coroutine_threadsafe(
+            run_process(cmd, cwd=cwd, timeout=timeout, text=text, env=env, input=input), loop
+        )
+        return future.result()
+
+    try:
+        p = subprocess.run(
+            cmd,
+            cwd=str(cwd) if cwd else None,
+            input=input,
+            stdin=None if input is not None else subprocess.DEVNULL,
+            capture_output=True,
+            timeout=timeout,
+            env={**os.environ, **env} if env else None,
+        )
+    except subprocess.TimeoutExpired:
+        raise ProcessTimeout(cmd, timeout)
+    stdout, stderr = p.stdout, p.stderr
+    if text:
+        stdout = stdout.decode("utf-8", "replace")
+        stderr = stderr.decode("utf-8", "replace")
+    return ProcessResult(cmd=list(cmd), returncode=p.returncode, stdout=stdout, stderr=stderr)
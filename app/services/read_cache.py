@@ -0,0 +1,125 @@
+"""
+Conversation read cache - file contents keyed by (path, mtime, size) for the chat read tools
+Unchanged files are served from memory on re-reads; repeats within one turn collapse to a short note
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Tuple
+
+from app.services.file_content import is_binary, SNIFF_BYTES
+
+
+READ_CACHE_MAX_BYTES = int(os.getenv("READ_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))  # per conversation
+READ_CACHE_MAX_CONVERSATIONS = int(os.getenv("READ_CACHE_MAX_CONVERSATIONS", "256"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "1800"))  # seconds since last use
+
+
+class ReadCache:
+    """
+    Files read during one conversation
+
+    Entries are validated against the file's current mtime/size on every
+    read, so edits (ours or anyone's) are always picked up. delivered tracks
+    what was already returned to the model this turn, since those tool
+    results are still in its context.
+    """
+
+    def __init__(self, max_bytes: int = READ_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[int, int, Optional[str]]]" = OrderedDict()  # path -> (mtime_ns, size, text or None if binary)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.delivered: set = set()
+        self.last_used = time.time()
+        self.stats = {"hits": 0, "misses": 0, "repeats": 0}
+
+    def new_turn(self):
+        self.delivered = set()
+        self.last_used = time.time()
+
+    def read(self, path: str) -> Tuple[Optional[str], int, bool]:
+        """(text or None for binary, mtime_ns, served from cache); raises OSError"""
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[2], entry[0], True
+
+        with open(key, "rb") as f:
+            data = f.read()
+        text = None if is_binary(data[:SNIFF_BYTES]) else data.decode("utf-8", "replace")
+        self.stats["misses"] += 1
+
+        if len(data) <= self.max_bytes // 4:
+            with self._lock:
+                old = self._entries.pop(key, None)
+                if old:
+                    self._bytes -= old[1]
+                self._entries[key] = (st.st_mtime_ns, st.st_size, text)
+                self._bytes += st.st_size
+                while self._bytes > self.max_bytes and self._entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted[1]
+        return text, st.st_mtime_ns, False
+
+    def seen_this_turn(self, key: tuple) -> bool:
+        """True if this exact read was already returned this turn (and records it otherwise)"""
+        with self._lock:
+            if key in self.delivered:
+                self.stats["repeats"] += 1
+                return True
+            self.delivered.add(key)
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "files": len(self._entries), "bytes": self._bytes}
+
+
+class ReadCacheRegistry:
+    """ReadCache per conversation_id, dropped after ttl of inactivity or LRU"""
+
+    def __init__(self, max_conversations: int = READ_CACHE_MAX_CONVERSATIONS, ttl: float = READ_CACHE_TTL):
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._caches: "OrderedDict[str, ReadCache]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_conversation(self, conversation_id: Optional[str]) -> ReadCache:
+        """Cache for a conversation, starting a new turn (a throwaway cache without an id)"""
+        if not conversation_id:
+            return ReadCache()
+        with self._lock:
+            now = time.time()
+            for cid in [c for c, cache in self._caches.items() if now - cache.last_used > self.ttl]:
+                del self._caches[cid]
+            cache = self._caches.get(conversation_id)
+            if cache is None:
+                cache = self._caches[conversation_id] = ReadCache()
+            self._caches.move_to_end(conversation_id)
+            while len(self._caches) > self.max_conversations:
+                self._caches.popitem(last=False)
+        cache.new_turn()
+        return cache
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            caches = list(self._caches.values())
+        totals = {"conversations": len(caches), "hits": 0, "misses": 0, "repeats": 0, "bytes": 0}
+        for cache in caches:
+            stats = cache.get_stats()
+            for key in ("hits", "misses", "repeats", "bytes"):
+                totals[key] += stats[key]
+        return totals
+
+
+# Cache of the conversation whose tools are running (set per chat request)
+current_read_cache: ContextVar[Optional[ReadCache]] = ContextVar("current_read_cache", default=None)
+
+# Global singleton
+read_caches = ReadCacheRegistry()
@@ -0,0 +1,372 @@
+"""
+Repository mirror cache - persistent bare mirrors for the /api/ai endpoints
+Keeps one bare clone per owner/repo, fetched incrementally and evicted LRU by disk budget
+"""
+import os
+import re
+import time
+import base64
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+from fastapi import HTTPException
+
+from app.services.process_runner import run_process, stream_process, ProcessResult, ProcessTimeout
+from app.services.file_content import SNIFF_BYTES
+
+
+MIRROR_ROOT = Path(os.getenv("AI_MIRROR_ROOT", str(Path(tempfile.gettempdir()) / "repeditor-mirrors"))).resolve()
+MIRROR_MAX_BYTES = int(os.getenv("AI_MIRROR_MAX_BYTES", str(2 * 1024 ** 3)))  # 2 GiB
+MIRROR_FETCH_TTL = float(os.getenv("AI_MIRROR_FETCH_TTL", "30"))  # seconds between fetches per token
+MIRROR_GIT_TIMEOUT = float(os.getenv("AI_MIRROR_GIT_TIMEOUT", "300"))
+
+# GitHub owner / repository name segment
+REPO_SEGMENT = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+class RepoMirrorCache:
+    """Bare-mirror cache keyed by owner/repo with object-level reads and worktrees for writes"""
+
+    def __init__(
+        self,
+        root: Path = MIRROR_ROOT,
+        max_bytes: int = MIRROR_MAX_BYTES,
+        fetch_ttl: float = MIRROR_FETCH_TTL
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.fetch_ttl = fetch_ttl
+
+        self._repo_locks: Dict[str, asyncio.Lock] = {}
+        self._lru: "OrderedDict[str, int]" = OrderedDict()  # key -> size in bytes
+        self._verified: Dict[tuple, float] = {}  # (key, token hash) -> last fetch time
+        self._in_use: Dict[str, int] = {}
+
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0, "evictions": 0}
+        self._load_existing()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _load_existing(self):
+        """Rebuild LRU order from mirrors left on disk by a previous process"""
+        found = []
+        for path in self.root.glob("*/*.git"):
+            if path.is_dir():
+                key = f"{path.parent.name}/{path.name[:-4]}"
+                found.append((path.stat().st_mtime, key, self._dir_size(path)))
+        for _, key, size in sorted(found):
+            self._lru[key] = size
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    @staticmethod
+    def remote_url(repo_full: str) -> str:
+        """Credential-free remote URL (the only URL ever written to a mirror's config)"""
+        return f"https://github.com/{repo_full}.git"
+
+    @staticmethod
+    def _auth_env(token: str) -> Dict[str, str]:
+        """Per-command GitHub auth via GIT_CONFIG_* - kept out of argv and never stored on disk"""
+        basic = base64.b64encode(f"oauth2:{token}".encode()).decode()
+        return {
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.https://github.com/.extraheader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {basic}"
+        }
+
+    @classmethod
+    async def _git(
+        cls,
+        args: List[str],
+        cwd: Optional[Path] = None,
+        check: bool = True,
+        token: Optional[str] = None
+    ) -> ProcessResult:
+        env = {"GIT_TERMINAL_PROMPT": "0"}
+        if token:
+            env.update(cls._auth_env(token))
+        try:
+            p = await run_process(
+                ["git", *args],
+                cwd=cwd,
+                timeout=MIRROR_GIT_TIMEOUT,
+                text=False,
+                env=env
+            )
+        except ProcessTimeout:
+            raise HTTPException(status_code=504, detail=f"Command timed out: git {args[0]}")
+        if check and p.returncode != 0:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Command failed: git {args[0]}\n{p.stderr.decode('utf-8', 'replace').strip()}"
+            )
+        return p
+
+    def _repo_lock(self, key: str) -> asyncio.Lock:
+        return self._repo_locks.setdefault(key, asyncio.Lock())
+
+    def _pin(self, key: str):
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+
+    def _unpin(self, key: str):
+        self._in_use[key] -= 1
+        if not self._in_use[key]:
+            del self._in_use[key]
+
+    def mirror_path(self, repo_full: str) -> Path:
+        """Mirror directory for owner/repo; rejects anything that could leave the cache root"""
+        owner, _, name = repo_full.partition("/")
+        if not all(REPO_SEGMENT.match(part) and part not in (".", "..") for part in (owner, name)):
+            raise HTTPException(status_code=400, detail="Invalid repo format (use owner/repo)")
+        return self.root / owner / f"{name}.git"
+
+    # ------------------------------------------------------------------
+    # Mirror lifecycle
+    # ------------------------------------------------------------------
+
+    async def ensure(self, repo_full: str, token: str) -> Path:
+        """Return an up-to-date mirror for repo_full, cloning or fetching as needed"""
+        key = repo_full
+        mirror = self.mirror_path(repo_full)
+        remote = self.remote_url(repo_full)
+        token_key = (key, hashlib.sha256(token.encode()).hexdigest())
+
+        async with self._repo_lock(key):
+            if mirror.exists():
+                self.stats["hits"] += 1
+                # Each token must have proven access to the repo via a fetch within the TTL
+                last = self._verified.get(token_key, 0.0)
+                if time.time() - last > self.fetch_ttl:
+                    # Also scrubs credentials that older versions stored in the URL
+                    await self._git(["remote", "set-url", "origin", remote], cwd=mirror)
+                    # Worktrees stay detached and push HEAD directly, so pruning refs/heads
+                    # never deletes a branch a live worktree depends on
+                    await self._git(
+                        ["fetch", "--prune", "--no-tags", "origin", "+refs/heads/*:refs/heads/*"],
+                        cwd=mirror,
+                        token=token
+                    )
+                    self.stats["fetches"] += 1
+                    self._verified[token_key] = time.time()
+                    self._lru[key] = await asyncio.to_thread(self._dir_size, mirror)
+            else:
+                self.stats["misses"] += 1
+                mirror.parent.mkdir(parents=True, exist_ok=True)
+                tmp = mirror.with_name(f".{mirror.name}.{uuid.uuid4().hex[:8]}")
+                try:
+                    await self._git(["clone", "--bare", "--no-tags", remote, str(tmp)], token=token)
+                    tmp.rename(mirror)
+                finally:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                self._verified[token_key] = time.time()
+                self._lru[key] = await asyncio.to_thread(self._dir_size, mirror)
+
+            if key not in self._lru:
+                # Picked for eviction but not removed yet: registering it again keeps it
+                self._lru[key] = await asyncio.to_thread(self._dir_size, mirror)
+            os.utime(mirror)
+            self._lru.move_to_end(key)
+
+        await self._evict(keep=key)
+        return mirror
+
+    @asynccontextmanager
+    async def pinned(self, repo_full: str, token: str):
+        """ensure() the mirror and keep it safe from eviction until the block exits"""
+        self._pin(repo_full)
+        try:
+            yield await self.ensure(repo_full, token)
+        finally:
+            self._unpin(repo_full)
+
+    def hold(self, repo_full: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Pin the mirror (from now) until a response stream reading it ends.
+        Call inside pinned() so there is no unpinned gap before streaming starts.
+        """
+        self._pin(repo_full)
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._unpin(repo_full)
+
+        async def stream():
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                release()
+
+        body = stream()
+        weakref.finalize(body, release)  # a stream that is never started is never finalized by its finally
+        return body
+
+    async def _evict(self, keep: Optional[str] = None):
+        """Drop least-recently-used mirrors until the cache fits the disk budget"""
+        total = sum(self._lru.values())
+        victims = []
+        for key, size in self._lru.items():
+            if total <= self.max_bytes:
+                break
+            if key == keep or self._in_use.get(key):
+                continue
+            victims.append(key)
+            total -= size
+        for key in victims:
+            self._lru.pop(key, None)
+            self._verified = {k: v for k, v in self._verified.items() if k[0] != key}
+
+        for key in victims:
+            async with self._repo_lock(key):
+                # Pinned or re-fetched while we waited for the lock
+                if self._in_use.get(key) or key in self._lru:
+                    continue
+                await asyncio.to_thread(shutil.rmtree, self.mirror_path(key), True)
+            self.stats["evictions"] += 1
+            print(f"[mirror] Evicted {key} (disk budget {self.max_bytes} bytes)")
+
+    # ------------------------------------------------------------------
+    # Object-level reads
+    # ------------------------------------------------------------------
+
+    async def list_tree(self, mirror: Path, ref: str, max_entries: int = 8000) -> List[Dict[str, Any]]:
+        """List every path at ref without checking anything out"""
+        out = (await self._git(["ls-tree", "-r", "-t", "-l", "-z", "--full-tree", ref], cwd=mirror)).stdout
+        entries = [e.split("\t", 1) for e in out.decode("utf-8", "replace").split("\0") if e]
+        items = []
+        for meta, path in sorted(entries, key=lambda e: e[1]):
+            _, kind, _, size = meta.split(None, 3)
+            if kind == "commit":  # submodule gitlink
+                continue
+            items.append({
+                "path": path,
+                "kind": "dir" if kind == "tree" else "file",
+                "size": None if kind == "tree" else int(size)
+            })
+            if len(items) >= max_entries:
+                break
+        return items
+
+    async def read_blob(self, mirror: Path, ref: str, path: str) -> Optional[bytes]:
+        """Read a file's bytes at ref; None if the path is missing or not a file"""
+        spec = f"{ref}:{path}"
+        kind = await self._git(["cat-file", "-t", spec], cwd=mirror, check=False)
+        if kind.returncode != 0 or kind.stdout.strip() != b"blob":
+            return None
+        return (await self._git(["cat-file", "blob", spec], cwd=mirror)).stdout
+
+    async def blob_id(self, mirror: Path, ref: str, path: str) -> Optional[str]:
+        """Object id of the blob at ref:path (None if missing or not a file) - a stable ETag"""
+        p = await self._git(["ls-tree", "-z", "--full-tree", ref, "--", path], cwd=mirror, check=False)
+        entry = p.stdout.split(b"\0", 1)[0].decode("utf-8", "replace") if p.returncode == 0 else ""
+        meta, _, name = entry.partition("\t")
+        if not meta or name != path:
+            return None
+        _, kind, oid = meta.split()
+        return oid if kind == "blob" else None
+
+    async def object_size(self, mirror: Path, oid: str) -> int:
+        """Size in bytes of an object, without reading it"""
+        return int((await self._git(["cat-file", "-s", oid], cwd=mirror)).stdout)
+
+    async def stream_object(
+        self,
+        mirror: Path,
+        oid: str,
+        start: int = 0,
+        end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Bytes [start, end] (end inclusive) of a blob, streamed from git cat-file without buffering it"""
+        offset = 0
+        stream = stream_process(["git", "cat-file", "blob", oid], cwd=mirror, env={"GIT_TERMINAL_PROMPT": "0"})
+        try:
+            async for chunk in stream:
+                chunk_start, offset = offset, offset + len(chunk)
+                if offset <= start:
+                    continue
+                chunk = chunk[max(0, start - chunk_start):]
+                if end is not None and offset > end + 1:
+                    chunk = chunk[:len(chunk) - (offset - end - 1)]
+                if chunk:
+                    yield chunk
+                if end is not None and offset > end:
+                    break
+        finally:
+            await stream.aclose()
+
+    async def object_head(self, mirror: Path, oid: str, size: int = SNIFF_BYTES) -> bytes:
+        """First size bytes of a blob (stops git as soon as they arrive)"""
+        head = b""
+        if size > 0:
+            async for chunk in self.stream_object(mirror, oid, 0, size - 1):
+                head += chunk
+        return head
+
+    # ------------------------------------------------------------------
+    # Writable checkouts
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def worktree(self, repo_full: str, ref: str):
+        """
+        Temporary detached worktree of the mirror at ref, removed on exit.
+        Keep HEAD detached (no local branches) and publish with push().
+        """
+        key = repo_full
+        mirror = self.mirror_path(repo_full)
+        path = Path(tempfile.mkdtemp(prefix="ai-worktree-"))
+        self._pin(key)
+        try:
+            await self._git(["worktree", "add", "--detach", str(path), ref], cwd=mirror)
+            await self._git(["config", "user.name", os.getenv("GIT_AUTHOR_NAME", "RepEditor AI")], cwd=path)
+            await self._git(["config", "user.email", os.getenv("GIT_AUTHOR_EMAIL", "ai@repeditor.dev")], cwd=path)
+            yield path
+        finally:
+            await self._git(["worktree", "remove", "--force", str(path)], cwd=mirror, check=False)
+            shutil.rmtree(path, ignore_errors=True)
+            self._unpin(key)
+
+    async def push(self, worktree: Path, repo_full: str, token: str, branch: str):
+        """Push the worktree's HEAD to branch on GitHub as the requesting user"""
+        await self._git(
+            ["push", self.remote_url(repo_full), f"HEAD:refs/heads/{branch}"],
+            cwd=worktree,
+            token=token
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0,
+            "mirrors": len(self._lru),
+            "disk_bytes": sum(self._lru.values()),
+            "max_bytes": self.max_bytes
+        }
+
+
+# Global singleton
+repo_cache = RepoMirrorCache()
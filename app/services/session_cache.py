@@ -0,0 +1,179 @@
+"""
+Auth session cache - token -> (user, session) with TTL, and batched last_activity writes
+Keeps get_current_session off the database for repeat requests from the same token
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import update, bindparam
+
+from app.core.config import AsyncSessionLocal
+from app.models.auth import User, AuthSession
+
+
+SESSION_CACHE_TTL = float(os.getenv("AUTH_SESSION_CACHE_TTL", "60"))  # seconds
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_SESSION_CACHE_MAX_ENTRIES", "10000"))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("AUTH_ACTIVITY_FLUSH_INTERVAL", "30"))  # seconds
+
+
+def _epoch(value: datetime) -> float:
+    """Timestamp of a DB datetime (naive values are UTC, as written by create_session)"""
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class SessionCache:
+    """
+    TTL cache of resolved sessions plus a buffer of pending last_activity stamps
+
+    Entries expire after ttl or at the session's own expires_at, whichever
+    is first, and are dropped explicitly on logout. Activity stamps are
+    written in one batched UPDATE every flush_interval seconds instead of an
+    UPDATE + COMMIT per request.
+    """
+
+    def __init__(
+        self,
+        ttl: float = SESSION_CACHE_TTL,
+        max_entries: int = SESSION_CACHE_MAX_ENTRIES,
+        flush_interval: float = ACTIVITY_FLUSH_INTERVAL
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+
+        self._entries: "OrderedDict[str, Tuple[float, User, AuthSession]]" = OrderedDict()  # token -> (expires_at, user, session)
+        self._pending: Dict[int, datetime] = {}  # session id -> last activity
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+        self._flushing = False
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "activity_flushes": 0,
+            "activity_rows": 0,
+            "activity_flush_errors": 0
+        }
+        self._auth = {"cached": [0, 0.0], "uncached": [0, 0.0]}  # kind -> [requests, total ms]
+
+    # ------------------------------------------------------------------
+    # Session lookup
+    # ------------------------------------------------------------------
+
+    def get(self, token: str) -> Optional[Tuple[User, AuthSession]]:
+        """Cached (user, session) for token, None on miss or expiry"""
+        with self._lock:
+            item = self._entries.get(token)
+            if item is None or item[0] < time.time():
+                if item is not None:
+                    del self._entries[token]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token)
+            self.stats["hits"] += 1
+            return item[1], item[2]
+
+    def put(self, token: str, user: User, session: AuthSession):
+        """Cache a resolved session (objects must be detached from their DB session)"""
+        expires_at = min(time.time() + self.ttl, _epoch(session.expires_at))
+        with self._lock:
+            self._entries[token] = (expires_at, user, session)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str):
+        """Forget a token (logout) and its pending activity stamp"""
+        with self._lock:
+            item = self._entries.pop(token, None)
+            if item is not None:
+                self._pending.pop(item[2].id, None)
+            self.stats["invalidations"] += 1
+
+    # ------------------------------------------------------------------
+    # last_activity write coalescing
+    # ------------------------------------------------------------------
+
+    def touch(self, session: AuthSession) -> bool:
+        """Record activity; True when a flush is due and nobody else is running one"""
+        now = datetime.utcnow()
+        session.last_activity = now
+        with self._lock:
+            self._pending[session.id] = now
+            if self._flushing or time.time() - self._last_flush < self.flush_interval:
+                return False
+            self._flushing = True
+            return True
+
+    def schedule_flush(self):
+        """Run flush() in the background of the current event loop"""
+        self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Write all pending last_activity stamps in one batched UPDATE"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+        try:
+            if not pending or AsyncSessionLocal is None:
+                return 0
+            async with AsyncSessionLocal() as db:
+                try:
+                    await db.execute(
+                        update(AuthSession.__table__)
+                        .where(AuthSession.__table__.c.id == bindparam("sid"))
+                        .values(last_activity=bindparam("ts")),
+                        [{"sid": sid, "ts": ts} for sid, ts in pending.items()]
+                    )
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    with self._lock:
+                        for sid, ts in pending.items():
+                            self._pending.setdefault(sid, ts)
+                    self.stats["activity_flush_errors"] += 1
+                    print(f"[auth] ⚠️ last_activity flush failed ({len(pending)} sessions): {e}")
+                    return 0
+            self.stats["activity_flushes"] += 1
+            self.stats["activity_rows"] += len(pending)
+            return len(pending)
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    # ------------------------------------------------------------------
+    # Instrumentation
+    # ------------------------------------------------------------------
+
+    def record_auth(self, elapsed_ms: float, cached: bool):
+        """Per-request time spent resolving the session"""
+        bucket = self._auth["cached" if cached else "uncached"]
+        bucket[0] += 1
+        bucket[1] += elapsed_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        requests = sum(b[0] for b in self._auth.values())
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0,
+            "entries": len(self._entries),
+            "pending_activity": len(self._pending),
+            "ttl_seconds": self.ttl,
+            "flush_interval_seconds": self.flush_interval,
+            "auth_requests": requests,
+            "avg_auth_ms": sum(b[1] for b in self._auth.values()) / requests if requests else 0,
+            "avg_auth_ms_cached": self._auth["cached"][1] / self._auth["cached"][0] if self._auth["cached"][0] else 0,
+            "avg_auth_ms_uncached": self._auth["uncached"][1] / self._auth["uncached"][0] if self._auth["uncached"][0] else 0
+        }
+
+
+# Global singleton
+session_cache = SessionCache()
@@ -0,0 +1,186 @@
+"""
+SQL tool pool - shared psycopg2 connections for the chat sql_* tools
+Statement timeout per connection, row-limited server-side cursors, cached schema introspection
+"""
+import os
+import re
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+
+
+SQL_POOL_MIN = int(os.getenv("SQL_TOOL_POOL_MIN", "1"))
+SQL_POOL_MAX = int(os.getenv("SQL_TOOL_POOL_MAX", "4"))
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_TOOL_STATEMENT_TIMEOUT_MS", "15000"))
+SQL_ROW_LIMIT = int(os.getenv("SQL_TOOL_ROW_LIMIT", "50"))
+SQL_SCHEMA_CACHE_TTL = float(os.getenv("SQL_TOOL_SCHEMA_CACHE_TTL", "300"))  # seconds
+
+# Statements that can be wrapped in DECLARE ... CURSOR (everything else uses a plain cursor)
+CURSOR_STATEMENT = re.compile(r"^\s*(\(\s*)*(select|with|values|table)\b", re.IGNORECASE)
+DDL_STATEMENT = re.compile(r"\b(create|alter|drop|truncate|rename|comment\s+on)\b", re.IGNORECASE)
+
+
+class SQLToolPool:
+    """
+    Lazily created ThreadedConnectionPool for the chat SQL tools
+
+    Tool calls run on worker threads, so checkouts wait on a semaphore
+    instead of failing when all connections are busy. Every connection has
+    statement_timeout set, so one runaway query can't hold a worker forever.
+    """
+
+    def __init__(
+        self,
+        min_connections: int = SQL_POOL_MIN,
+        max_connections: int = SQL_POOL_MAX,
+        statement_timeout_ms: int = SQL_STATEMENT_TIMEOUT_MS,
+        schema_ttl: float = SQL_SCHEMA_CACHE_TTL
+    ):
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.statement_timeout_ms = statement_timeout_ms
+        self.schema_ttl = schema_ttl
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._schema: Dict[Optional[str], Tuple[float, List[tuple]]] = {}  # table (None = all) -> (expires_at, rows)
+
+        self.stats = {
+            "checkouts": 0,
+            "wait_ms_total": 0.0,
+            "queries": 0,
+            "truncated": 0,
+            "statements": 0,
+            "schema_hits": 0,
+            "schema_misses": 0,
+            "schema_invalidations": 0
+        }
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    from psycopg2.pool import ThreadedConnectionPool
+                    # Accept SQLAlchemy-style URLs (postgresql+psycopg2://) as well as plain libpq ones
+                    dsn = re.sub(r"^postgres(ql)?\+\w+://", "postgresql://", settings.DATABASE_URL)
+                    self._pool = ThreadedConnectionPool(
+                        self.min_connections,
+                        self.max_connections,
+                        dsn,
+                        options=f"-c statement_timeout={self.statement_timeout_ms}"
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; rolled back and returned on exit, discarded if broken"""
+        start = time.perf_counter()
+        self._slots.acquire()
+        conn = None
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            self.stats["checkouts"] += 1
+            self.stats["wait_ms_total"] += (time.perf_counter() - start) * 1000
+            yield conn
+        finally:
+            if conn is not None:
+                try:
+                    if not conn.closed:
+                        conn.rollback()
+                except Exception:
+                    pass
+                self._pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+
+    # ------------------------------------------------------------------
+    # Tool operations
+    # ------------------------------------------------------------------
+
+    def query(self, sql: str, limit: int = SQL_ROW_LIMIT) -> Tuple[List[str], List[tuple], bool]:
+        """
+        (columns, first `limit` rows, truncated) - SELECTs stream through a
+        named server-side cursor so only limit + 1 rows ever leave the server.
+        Always rolled back: sql_query is for reads.
+        """
+        sql = sql.strip().rstrip(";")
+        with self.connection() as conn:
+            if CURSOR_STATEMENT.match(sql):
+                cur = conn.cursor(name=f"tool_{uuid.uuid4().hex[:12]}")
+                cur.itersize = limit + 1
+            else:
+                cur = conn.cursor()
+            try:
+                cur.execute(sql)
+                rows = cur.fetchmany(limit + 1) if cur.description is not None or cur.name else []
+                columns = [desc[0] for desc in cur.description] if cur.description else []
+            finally:
+                cur.close()
+        self.stats["queries"] += 1
+        truncated = len(rows) > limit
+        if truncated:
+            self.stats["truncated"] += 1
+        return columns, rows[:limit], truncated
+
+    def execute(self, statement: str) -> int:
+        """Run and commit a write; DDL drops the cached schema"""
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(statement)
+                affected = cur.rowcount
+            conn.commit()
+        self.stats["statements"] += 1
+        if DDL_STATEMENT.search(statement):
+            self.invalidate_schema()
+        return affected
+
+    def schema(self, table_name: Optional[str] = None) -> List[tuple]:
+        """Table list (or one table's columns), cached for schema_ttl"""
+        cached = self._schema.get(table_name)
+        if cached and cached[0] > time.time():
+            self.stats["schema_hits"] += 1
+            return cached[1]
+        self.stats["schema_misses"] += 1
+
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                if table_name:
+                    cur.execute("""
+                        SELECT column_name, data_type, is_nullable, column_default
+                        FROM information_schema.columns
+                        WHERE table_name = %s
+                        ORDER BY ordinal_position
+                    """, (table_name,))
+                else:
+                    cur.execute("""
+                        SELECT table_name
+                        FROM information_schema.tables
+                        WHERE table_schema = 'public'
+                        ORDER BY table_name
+                    """)
+                rows = cur.fetchall()
+        self._schema[table_name] = (time.time() + self.schema_ttl, rows)
+        return rows
+
+    def invalidate_schema(self):
+        self._schema.clear()
+        self.stats["schema_invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        checkouts = self.stats["checkouts"]
+        return {
+            **self.stats,
+            "avg_wait_ms": self.stats["wait_ms_total"] / checkouts if checkouts else 0,
+            "max_connections": self.max_connections,
+            "statement_timeout_ms": self.statement_timeout_ms,
+            "schema_entries": len(self._schema)
+        }
+
+
+# Global singleton
+sql_pool = SQLToolPool()
@@ -0,0 +1,374 @@
+"""
+Symbol index - per-repository definitions (classes, functions, methods, imports) with line spans
+Backs the chat find_symbol/read_symbol tools so the agent can read one definition instead of a whole file
+"""
+import io
+import os
+import ast
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from app.services.tree_index import tree_index, RepoTreeIndex, regular_stat, open_regular
+
+
+SYMBOL_INDEX_DIR = Path(os.getenv("SYMBOL_INDEX_DIR", "data/symbol_index"))
+SYMBOL_INDEX_MAX_REPOS = int(os.getenv("SYMBOL_INDEX_MAX_REPOS", "8"))
+SYMBOL_INDEX_MAX_FILE_BYTES = int(os.getenv("SYMBOL_INDEX_MAX_FILE_BYTES", str(2 * 1024 * 1024)))
+SYMBOL_INDEX_REFRESH_INTERVAL = float(os.getenv("SYMBOL_INDEX_REFRESH_INTERVAL", "30"))  # seconds
+SYMBOL_READ_MAX_DEFS = int(os.getenv("SYMBOL_READ_MAX_DEFS", "3"))  # read_symbol: definitions per call
+SYMBOL_READ_MAX_LINES = int(os.getenv("SYMBOL_READ_MAX_LINES", "400"))  # read_symbol: lines per definition
+
+INDEX_FORMAT = 1
+
+# Order results: definitions first, then module/class variables, then imports
+KIND_RANK = {"class": 0, "function": 0, "method": 0, "variable": 1, "import": 2}
+
+
+@dataclass(frozen=True)
+class Symbol:
+    """One definition: qualname is dotted through enclosing classes/functions"""
+    name: str
+    qualname: str
+    kind: str  # class, function, method, variable, import
+    line: int  # first line, including decorators
+    end_line: int
+    signature: str = ""
+
+
+# ------------------------------------------------------------------
+# Extractors: source text -> symbols, registered per file suffix
+# ------------------------------------------------------------------
+
+def python_symbols(source: str) -> List[Symbol]:
+    """Classes, functions, methods, module/class-level assignments and imports via ast"""
+    tree = ast.parse(source)
+    symbols: List[Symbol] = []
+
+    def visit(body, prefix: str, in_class: bool, top_level: bool):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                qualname = f"{prefix}{node.name}"
+                bases = ", ".join(ast.unparse(b) for b in node.bases)
+                start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+                symbols.append(Symbol(node.name, qualname, "class", start, node.end_lineno, f"({bases})" if bases else ""))
+                visit(node.body, f"{qualname}.", True, False)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                qualname = f"{prefix}{node.name}"
+                signature = f"({ast.unparse(node.args)})"
+                if node.returns is not None:
+                    signature += f" -> {ast.unparse(node.returns)}"
+                if isinstance(node, ast.AsyncFunctionDef):
+                    signature += "  (async)"
+                start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+                symbols.append(Symbol(node.name, qualname, "method" if in_class else "function", start, node.end_lineno, signature))
+                visit(node.body, f"{qualname}.", False, False)
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    name = alias.asname or alias.name.split(".")[0]
+                    symbols.append(Symbol(name, f"{prefix}{name}", "import", node.lineno, node.end_lineno, ast.unparse(node)))
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and (top_level or in_class):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for target in targets:
+                    if isinstance(target, ast.Name):
+                        symbols.append(Symbol(target.id, f"{prefix}{target.id}", "variable", node.lineno, node.end_lineno))
+            elif isinstance(node, (ast.If, ast.Try, ast.With)) and top_level:
+                # Conditional definitions (try/except ImportError, if TYPE_CHECKING, ...)
+                for block in (node.body, getattr(node, "orelse", []), getattr(node, "finalbody", []),
+                              *[h.body for h in getattr(node, "handlers", [])]):
+                    visit(block, prefix, in_class, top_level)
+
+    visit(tree.body, "", False, True)
+    return symbols
+
+
+SYMBOL_EXTRACTORS: Dict[str, Callable[[str], List[Symbol]]] = {
+    ".py": python_symbols,
+    ".pyi": python_symbols
+}
+
+
+def register_extractor(suffixes: List[str], extractor: Callable[[str], List[Symbol]]):
+    """Add symbol support for another language (extractor raises SyntaxError on unparsable input)"""
+    for suffix in suffixes:
+        SYMBOL_EXTRACTORS[suffix] = extractor
+
+
+class SymbolIndex:
+    """
+    Symbols of one repository's source files, keyed by file and by name
+
+    Files are re-parsed only when their size/mtime moves: immediately for
+    writes made through the chat tools, on the next lookup after a
+    checkout, and by a periodic background stat sweep otherwise.
+    """
+
+    def __init__(self, root: Path, tree: RepoTreeIndex):
+        self.root = Path(root)
+        self.tree = tree
+        self.index_path = SYMBOL_INDEX_DIR / f"{hashlib.sha1(str(self.root).encode()).hexdigest()[:16]}.idx"
+
+        self._lock = threading.RLock()
+        self.files: Dict[str, Tuple[int, int, List[Symbol]]] = {}  # rel path -> (mtime_ns, size, symbols)
+        self.by_name: Dict[str, List[Tuple[str, Symbol]]] = {}  # lowercased name -> [(rel path, symbol)]
+
+        self._loaded = False
+        self._stale = True
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._refreshing = False
+        self.stats = {"lookups": 0, "refreshes": 0, "files_parsed": 0, "parse_errors": 0, "last_refresh_ms": 0.0}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.index_path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return
+        if state.get("format") != INDEX_FORMAT or state.get("root") != str(self.root):
+            return
+        self.files = state["files"]
+        for rel, (_, _, symbols) in self.files.items():
+            self._link(rel, symbols)
+        print(f"[symbols] ✅ Loaded index for {self.root} ({len(self.files)} files)")
+
+    def save(self):
+        """Write the index atomically (skipped when nothing changed)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            SYMBOL_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump({"format": INDEX_FORMAT, "root": str(self.root), "files": self.files}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def _link(self, rel: str, symbols: List[Symbol]):
+        for symbol in symbols:
+            self.by_name.setdefault(symbol.name.lower(), []).append((rel, symbol))
+
+    def _unlink(self, rel: str):
+        entry = self.files.pop(rel, None)
+        if entry is None:
+            return
+        for symbol in entry[2]:
+            key = symbol.name.lower()
+            remaining = [(r, s) for r, s in self.by_name.get(key, []) if r != rel]
+            if remaining:
+                self.by_name[key] = remaining
+            else:
+                self.by_name.pop(key, None)
+        self._dirty = True
+
+    def _parse_file(self, rel: str, st: os.stat_result, checked: Optional[Dict] = None):
+        self._unlink(rel)
+        symbols: List[Symbol] = []
+        if st.st_size <= SYMBOL_INDEX_MAX_FILE_BYTES:
+            try:
+                f = open_regular(self.root, rel, checked)
+                if f is None:
+                    raise OSError(f"not a regular file inside the repo: {rel}")
+                with f:
+                    source = f.read().decode("utf-8", "replace")
+                symbols = SYMBOL_EXTRACTORS[Path(rel).suffix](source)
+            except (OSError, SyntaxError, ValueError, RecursionError):
+                self.stats["parse_errors"] += 1
+        self.files[rel] = (st.st_mtime_ns, st.st_size, symbols)
+        self._link(rel, symbols)
+        self._dirty = True
+        self.stats["files_parsed"] += 1
+
+    def update_file(self, rel: str):
+        """Re-parse one file now (after a write), or drop it if it's gone"""
+        if Path(rel).suffix not in SYMBOL_EXTRACTORS:
+            return
+        with self._lock:
+            self._load()
+            st = regular_stat(self.root, rel)
+            if st is None:
+                self._unlink(rel)
+                return
+            entry = self.files.get(rel)
+            if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+                self._parse_file(rel, st)
+
+    def refresh(self):
+        """Reconcile with the working tree: re-parse changed files, drop deleted ones"""
+        with self._lock:
+            start = time.time()
+            self._load()
+            seen = set()
+            checked = {}
+            for rel in self.tree.files():
+                if os.path.splitext(rel)[1] not in SYMBOL_EXTRACTORS:
+                    continue
+                st = regular_stat(self.root, rel)
+                if st is None:
+                    # Gone, or a symlink (never followed out of the repo)
+                    continue
+                seen.add(rel)
+                entry = self.files.get(rel)
+                if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+                    self._parse_file(rel, st, checked)
+            for rel in [r for r in self.files if r not in seen]:
+                self._unlink(rel)
+            self._stale = False
+            self._last_refresh = time.time()
+            self.stats["refreshes"] += 1
+            self.stats["last_refresh_ms"] = (time.time() - start) * 1000
+            self.save()
+
+    def mark_stale(self):
+        """Force a full refresh before the next lookup (e.g. after a checkout)"""
+        self._stale = True
+
+    def _ensure_fresh(self):
+        if self._stale:
+            self.refresh()
+        elif time.time() - self._last_refresh > SYMBOL_INDEX_REFRESH_INTERVAL and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, name="symbol-index-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"[symbols] ⚠️ Refresh failed for {self.root}: {e}")
+        finally:
+            self._refreshing = False
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def find(self, query: str, kind: Optional[str] = None, path: str = "", limit: int = 50) -> List[Tuple[str, Symbol]]:
+        """
+        Symbols named query (or whose qualname is query, e.g. "SessionCache.flush").
+        Falls back to case-insensitive substring matches when nothing matches exactly.
+        kind=None returns everything except imports.
+        """
+        with self._lock:
+            self._load()
+            self._ensure_fresh()
+            self.stats["lookups"] += 1
+
+            prefix = path.strip("/")
+            name = query.rsplit(".", 1)[-1]
+            needle = query.lower()
+
+            def wanted(rel: str, symbol: Symbol) -> bool:
+                if kind is None and symbol.kind == "import":
+                    return False
+                if kind is not None and symbol.kind != kind:
+                    return False
+                return not prefix or rel == prefix or rel.startswith(f"{prefix}/")
+
+            candidates = [(r, s) for r, s in self.by_name.get(name.lower(), []) if wanted(r, s)]
+            if "." in query:
+                matches = [(r, s) for r, s in candidates if s.qualname.lower() == needle]
+            else:
+                matches = [(r, s) for r, s in candidates if s.name == query] or candidates
+            if not matches:
+                matches = [
+                    (r, s) for key, entries in self.by_name.items() if name.lower() in key
+                    for r, s in entries if wanted(r, s) and needle in s.qualname.lower()
+                ]
+
+        matches.sort(key=lambda m: (KIND_RANK.get(m[1].kind, 3), len(m[1].name), m[0].count("/"), m[0], m[1].line))
+        return matches[:limit]
+
+    def source(self, rel: str, symbol: Symbol) -> Optional[str]:
+        """Current text of a symbol's span (re-parsing the file first if it changed)"""
+        self.update_file(rel)
+        with self._lock:
+            entry = self.files.get(rel)
+            if entry is None:
+                return None
+            current = next((s for s in entry[2] if s.qualname == symbol.qualname and s.kind == symbol.kind), None)
+        if current is None:
+            return None
+        f = open_regular(self.root, rel)
+        if f is None:
+            return None
+        try:
+            with io.TextIOWrapper(f, encoding="utf-8", errors="replace") as text:
+                lines = text.read().split("\n")
+        except OSError:
+            return None
+        return "\n".join(lines[current.line - 1:current.end_line])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "files": len(self.files),
+            "symbols": sum(len(e[2]) for e in self.files.values()),
+            "index_path": str(self.index_path)
+        }
+
+
+class SymbolIndexRegistry:
+    """One SymbolIndex per repository root, least-recently-used evicted (saved on eviction)"""
+
+    def __init__(self, max_repos: int = SYMBOL_INDEX_MAX_REPOS):
+        self.max_repos = max_repos
+        self._indexes: "OrderedDict[Path, SymbolIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, root: Path) -> SymbolIndex:
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self._indexes[root] = SymbolIndex(root, tree_index.get(root))
+            self._indexes.move_to_end(root)
+            while len(self._indexes) > self.max_repos:
+                _, evicted = self._indexes.popitem(last=False)
+                evicted.save()
+            return index
+
+    def notify_write(self, file_path: str):
+        """Re-parse a written file in whichever open index contains it"""
+        path = Path(file_path).resolve()
+        with self._lock:
+            indexes = list(self._indexes.items())
+        for root, index in indexes:
+            if root in path.parents:
+                index.update_file(path.relative_to(root).as_posix())
+
+    def mark_stale(self, root: Path):
+        with self._lock:
+            index = self._indexes.get(root)
+        if index is not None:
+            index.mark_stale()
+
+    def save_all(self):
+        with self._lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            try:
+                index.save()
+            except Exception as e:
+                print(f"[symbols] ⚠️ Failed to save index for {index.root}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {str(root): index.get_stats() for root, index in self._indexes.items()}
+
+
+# Global singleton
+symbol_index = SymbolIndexRegistry()
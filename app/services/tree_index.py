@@ -0,0 +1,342 @@
+"""
+Repository tree index - per-repo directory listings built once and refreshed incrementally
+Serves paged, directory-scoped /api/repos/tree queries without re-walking the repository
+"""
+import os
+import stat
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, BinaryIO
+
+from app.services.process_runner import run_process_sync, ProcessTimeout
+
+
+TREE_INDEX_MAX_REPOS = int(os.getenv("TREE_INDEX_MAX_REPOS", "16"))
+TREE_INDEX_GIT_TIMEOUT = float(os.getenv("TREE_INDEX_GIT_TIMEOUT", "60"))
+
+# Never listed, even outside a git repo or without a .gitignore
+ALWAYS_IGNORED = {".git"}
+DEFAULT_IGNORED = {".git", "node_modules", ".venv", "venv", "__pycache__", ".mypy_cache", ".pytest_cache", ".tox"}
+
+
+def regular_stat(root: Path, rel: str) -> Optional[os.stat_result]:
+    """lstat of rel under root if it is a regular file (symlinks are never followed)"""
+    try:
+        st = os.lstat(os.path.join(root, rel))
+    except OSError:
+        return None
+    return st if stat.S_ISREG(st.st_mode) else None
+
+
+def open_regular(root: Path, rel: str, checked: Optional[Dict[Optional[str], Any]] = None) -> Optional[BinaryIO]:
+    """
+    Open rel under root for binary reading, or None if it is or passes through
+    a symlink (like grep -r, so indexed content never comes from outside root).
+    checked caches directory verdicts across one batch of reads.
+    """
+    parent = os.path.dirname(rel)
+    if parent:
+        checked = {} if checked is None else checked
+        if parent not in checked:
+            real_root = checked.setdefault(None, os.path.realpath(root))
+            checked[parent] = os.path.realpath(os.path.join(root, parent)) == os.path.join(real_root, parent)
+        if not checked[parent]:
+            return None
+    try:
+        # O_NOFOLLOW refuses a symlink in the last component
+        return os.fdopen(os.open(os.path.join(root, rel), os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0)), "rb")
+    except OSError:
+        return None
+
+
+class RepoTreeIndex:
+    """
+    In-memory tree of one repository: directory -> {child name: is_dir}
+
+    Built once (git ls-files honouring .gitignore/exclude rules, or a pruned
+    walk outside git) and kept fresh by directory mtimes: a query re-scans
+    only the directories it touches whose mtime moved. Edits to ignore files
+    trigger a rebuild since they can change what is visible anywhere.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.is_git = (self.root / ".git").exists()
+        self._lock = threading.RLock()
+        self.dirs: Dict[str, Dict[str, bool]] = {}
+        self.dir_mtimes: Dict[str, int] = {}
+        self.ignore_mtimes: Dict[str, int] = {}
+        self.stats = {"builds": 0, "dir_refreshes": 0, "queries": 0, "last_build_ms": 0.0}
+
+    # ------------------------------------------------------------------
+    # Filesystem / git helpers
+    # ------------------------------------------------------------------
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root, rel) if rel else str(self.root)
+
+    def _mtime(self, rel: str) -> Optional[int]:
+        try:
+            return os.stat(self._abs(rel)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _git(self, args: List[str], stdin: Optional[bytes] = None) -> Optional[bytes]:
+        """Run git via the shared process runner (callers are always off the event loop)"""
+        try:
+            p = run_process_sync(
+                ["git", *args],
+                cwd=self.root,
+                timeout=TREE_INDEX_GIT_TIMEOUT,
+                text=False,
+                env={"GIT_TERMINAL_PROMPT": "0"},
+                input=stdin
+            )
+        except (OSError, ProcessTimeout) as e:
+            print(f"[tree-index] ⚠️ git {args[0]} failed in {self.root}: {e}")
+            return None
+        # check-ignore exits 1 when nothing matched
+        if p.returncode not in (0, 1):
+            return None
+        return p.stdout
+
+    def _git_files(self, rel: str = "") -> Optional[List[str]]:
+        """Tracked + untracked-not-ignored files under rel (None if git is unusable)"""
+        args = ["ls-files", "-z", "--cached", "--others", "--exclude-standard"]
+        if rel:
+            args += ["--", rel]
+        out = self._git(args)
+        if out is None:
+            return None
+        return [p for p in out.decode("utf-8", "surrogateescape").split("\0") if p]
+
+    def _filter_ignored(self, rel: str, entries: Dict[str, bool]) -> Dict[str, bool]:
+        """Drop entries excluded by ignore rules"""
+        entries = {n: d for n, d in entries.items() if n not in (ALWAYS_IGNORED if self.is_git else DEFAULT_IGNORED)}
+        if not self.is_git or not entries:
+            return entries
+        paths = [os.path.join(rel, n) + ("/" if d else "") for n, d in entries.items()]
+        out = self._git(["check-ignore", "-z", "--stdin"], stdin="\0".join(paths).encode("utf-8", "surrogateescape"))
+        if not out:
+            return entries
+        ignored = {os.path.basename(p.rstrip("/")) for p in out.decode("utf-8", "surrogateescape").split("\0") if p}
+        return {n: d for n, d in entries.items() if n not in ignored}
+
+    def _scandir(self, rel: str) -> Optional[Dict[str, bool]]:
+        try:
+            with os.scandir(self._abs(rel)) as it:
+                return {e.name: e.is_dir(follow_symlinks=False) for e in it}
+        except OSError:
+            return None
+
+    def _ignore_files(self) -> Iterable[str]:
+        yield ".gitignore"
+        yield os.path.join(".git", "info", "exclude")
+        for rel, children in self.dirs.items():
+            if rel and ".gitignore" in children:
+                yield os.path.join(rel, ".gitignore")
+
+    # ------------------------------------------------------------------
+    # Build / refresh
+    # ------------------------------------------------------------------
+
+    def _add_files(self, files: Iterable[str]):
+        """Insert file paths (and their parent directories) into the index"""
+        for path in files:
+            parts = path.split("/")
+            parent = ""
+            for i, part in enumerate(parts):
+                is_dir = i < len(parts) - 1
+                self.dirs.setdefault(parent, {})[part] = is_dir
+                if not is_dir:
+                    break
+                parent = f"{parent}/{part}" if parent else part
+                self.dirs.setdefault(parent, {})
+
+    def _walk_into(self, rel: str):
+        """Index the subtree at rel (new directory or initial build)"""
+        files = self._git_files(rel) if self.is_git else None
+        if files is not None:
+            self.dirs.setdefault(rel, {})
+            self._add_files(files)
+        else:
+            pending = [rel]
+            while pending:
+                current = pending.pop()
+                entries = self._filter_ignored(current, self._scandir(current) or {})
+                self.dirs[current] = entries
+                pending.extend(os.path.join(current, n) if current else n for n, d in entries.items() if d)
+        for d in [d for d in self.dirs if d == rel or d.startswith(f"{rel}/") or not rel]:
+            self.dir_mtimes[d] = self._mtime(d)
+
+    def build(self):
+        """Full (re)build of the index"""
+        with self._lock:
+            start = time.time()
+            self.dirs = {}
+            self.dir_mtimes = {}
+            self._walk_into("")
+            self.ignore_mtimes = {p: self._mtime(p) for p in self._ignore_files()}
+            self.stats["builds"] += 1
+            self.stats["last_build_ms"] = (time.time() - start) * 1000
+            files = sum(1 for children in self.dirs.values() for d in children.values() if not d)
+            print(f"[tree-index] ✅ Indexed {self.root} ({files} files, {len(self.dirs)} dirs) in {self.stats['last_build_ms']:.0f}ms")
+
+    def _drop_subtree(self, rel: str):
+        prefix = f"{rel}/"
+        for d in [d for d in self.dirs if d == rel or d.startswith(prefix)]:
+            self.dirs.pop(d, None)
+            self.dir_mtimes.pop(d, None)
+
+    def _refresh_dir(self, rel: str):
+        """Re-scan one directory whose mtime changed (entries added, removed or renamed)"""
+        current = self._scandir(rel)
+        if current is None:
+            self._drop_subtree(rel)
+            return
+        known = self.dirs.get(rel, {})
+        added = {n: d for n, d in current.items() if n not in known or known[n] != d}
+        kept = {n: d for n, d in current.items() if n in known and known[n] == d}
+        children = {**kept, **self._filter_ignored(rel, added)}
+
+        for name, is_dir in known.items():
+            if is_dir and children.get(name) is not True:
+                self._drop_subtree(os.path.join(rel, name) if rel else name)
+        self.dirs[rel] = children
+        self.dir_mtimes[rel] = self._mtime(rel)
+        for name, is_dir in children.items():
+            child = os.path.join(rel, name) if rel else name
+            if is_dir and child not in self.dirs:
+                self._walk_into(child)
+        self.stats["dir_refreshes"] += 1
+
+    def _ensure_fresh(self, rel: str) -> bool:
+        """Refresh rel if its mtime moved; False when it no longer exists"""
+        if rel not in self.dirs:
+            return False
+        if self.dir_mtimes.get(rel) != self._mtime(rel):
+            self._refresh_dir(rel)
+        return rel in self.dirs
+
+    def _ignore_rules_changed(self) -> bool:
+        return any(self._mtime(p) != m for p, m in self.ignore_mtimes.items())
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def list(
+        self,
+        path: str = "",
+        depth: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Entries under path in sorted pre-order (same order as sorted(rglob)),
+        down to depth levels (None = unlimited), paged by offset/limit.
+        Sizes are stat'ed for the returned page only.
+        """
+        rel = path.strip("/")
+        with self._lock:
+            if not self.dirs or self._ignore_rules_changed():
+                self.build()
+            self.stats["queries"] += 1
+            if not self._ensure_fresh(rel):
+                return None
+
+            order = []
+            stack = [(iter(sorted(self.dirs.get(rel, {}))), rel, 1)]
+            while stack:
+                names, current, level = stack[-1]
+                name = next(names, None)
+                if name is None:
+                    stack.pop()
+                    continue
+                child = f"{current}/{name}" if current else name
+                is_dir = self.dirs[current][name]
+                order.append((child, name, is_dir))
+                if is_dir and self._ensure_fresh(child) and (depth is None or level < depth):
+                    stack.append((iter(sorted(self.dirs[child])), child, level + 1))
+
+            total = len(order)
+            items = [self._entry(child, name, is_dir) for child, name, is_dir in order[offset:offset + limit]]
+
+        return {
+            "path": rel,
+            "depth": depth,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "count": len(items),
+            "truncated": offset + len(items) < total,
+            "items": items
+        }
+
+    def files(self) -> List[str]:
+        """Every visible file path, refreshing directories whose mtime moved"""
+        with self._lock:
+            if not self.dirs or self._ignore_rules_changed():
+                self.build()
+            found = []
+            pending = [""]
+            while pending:
+                rel = pending.pop()
+                if not self._ensure_fresh(rel):
+                    continue
+                for name, is_dir in self.dirs[rel].items():
+                    child = f"{rel}/{name}" if rel else name
+                    (pending if is_dir else found).append(child)
+            return found
+
+    def _entry(self, child: str, name: str, is_dir: bool) -> Dict[str, Any]:
+        item = {"path": child, "name": name, "kind": "dir" if is_dir else "file", "size": None}
+        if is_dir:
+            item["children"] = len(self.dirs.get(child, {}))
+        else:
+            try:
+                st = os.lstat(self._abs(child))
+                item["size"] = st.st_size if stat.S_ISREG(st.st_mode) else None
+            except OSError:
+                pass
+        return item
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "dirs": len(self.dirs),
+            "files": sum(1 for children in self.dirs.values() for d in children.values() if not d)
+        }
+
+
+class TreeIndexRegistry:
+    """One RepoTreeIndex per repository root, least-recently-used evicted"""
+
+    def __init__(self, max_repos: int = TREE_INDEX_MAX_REPOS):
+        self.max_repos = max_repos
+        self._indexes: "OrderedDict[Path, RepoTreeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, root: Path) -> RepoTreeIndex:
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self._indexes[root] = RepoTreeIndex(root)
+            self._indexes.move_to_end(root)
+            while len(self._indexes) > self.max_repos:
+                self._indexes.popitem(last=False)
+            return index
+
+    def invalidate(self, root: Path):
+        """Forget a repository (e.g. after a fresh clone replaced it)"""
+        with self._lock:
+            self._indexes.pop(root, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {str(root): index.get_stats() for root, index in self._indexes.items()}
+
+
+# Global singleton
+tree_index = TreeIndexRegistry()
@@ -0,0 +1,106 @@
+"""
+Web search - Perplexity lookups for the chat web_search tool
+Pooled client, in-flight deduplication and a TTL cache keyed by normalized query
+"""
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+from app.core.config import settings
+from app.services.llm_clients import llm_clients
+
+
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+WEB_SEARCH_MODEL = os.getenv("WEB_SEARCH_MODEL", "sonar-pro")
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "30"))
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", "600"))  # seconds
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "256"))
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive cache key"""
+    return " ".join(query.lower().split())
+
+
+class WebSearchClient:
+    """
+    Async Perplexity search shared by every conversation
+
+    Identical queries (after normalization) issued while one is in flight
+    await the same request; successful answers are cached for ttl seconds.
+    """
+
+    def __init__(self, ttl: float = WEB_SEARCH_CACHE_TTL, max_entries: int = WEB_SEARCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # key -> (expires_at, answer)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    async def _fetch(self, query: str) -> str:
+        client = llm_clients.http("perplexity", settings.PERPLEXITY_API_KEY)
+        resp = await client.post(
+            PERPLEXITY_URL,
+            headers={
+                "Authorization": f"Bearer {settings.PERPLEXITY_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": WEB_SEARCH_MODEL,
+                "messages": [{"role": "user", "content": query}]
+            },
+            timeout=WEB_SEARCH_TIMEOUT
+        )
+        resp.raise_for_status()
+        result = resp.json()
+        return result.get("choices", [{}])[0].get("message", {}).get("content", "No results")
+
+    async def search(self, query: str) -> str:
+        """Answer for query from cache, an identical in-flight request, or Perplexity"""
+        if not settings.PERPLEXITY_API_KEY:
+            raise RuntimeError("PERPLEXITY_API_KEY not configured")
+        key = normalize_query(query)
+
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.time():
+            self._cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.create_task(self._fetch(query))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._store(key, t))
+
+        # Shielded so a caller timing out doesn't cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    def _store(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.stats["errors"] += 1
+            return
+        self._cache[key] = (time.time() + self.ttl, task.result())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "hit_rate": (self.stats["hits"] + self.stats["coalesced"]) / lookups if lookups else 0,
+            "entries": len(self._cache),
+            "in_flight": len(self._inflight),
+            "ttl_seconds": self.ttl
+        }
+
+
+# Global singleton
+web_search_client = WebSearchClient()
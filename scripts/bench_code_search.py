@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Code Search Benchmark - Trigram index vs grep -r for grep_code-style queries"""
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+WORDS = [
+    "request", "session", "config", "handler", "router", "client", "token", "stream", "cache", "index",
+    "value", "result", "response", "payload", "model", "user", "query", "buffer", "offset", "limit"
+]
+
+
+def make_repo(root: Path, files: int, lines: int, seed: int):
+    """Synthetic Python-ish repo; one file defines the rare symbol we search for"""
+    rng = random.Random(seed)
+    for n in range(files):
+        d = root / "src" / f"pkg{n % 50:02d}"
+        d.mkdir(parents=True, exist_ok=True)
+        body = []
+        for i in range(lines):
+            a, b, c = rng.sample(WORDS, 3)
+            if i % 25 == 0:
+                body.append(f"def {a}_{b}_{n}_{i}({c}):")
+            else:
+                body.append(f"    {a}_{b} = {c}.get('{a}', {i})  # {b} {c}")
+        if n == files // 2:
+            body.append("class RareWidgetFactory:  # needle")
+        (d / f"module{n:05d}.py").write_text("\n".join(body) + "\n")
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+
+
+def timed(fn, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {"p50_ms": statistics.median(samples), "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the code search index against grep -r")
+    parser.add_argument("--files", type=int, default=5000, help="Files in the synthetic repo")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per file")
+    parser.add_argument("--runs", type=int, default=20, help="Samples per query")
+    parser.add_argument("--seed", type=int, default=7)
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VECTO PILOT™ - CODE SEARCH BENCHMARK")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory(prefix="code-search-bench-") as tmp:
+        root = Path(tmp) / "repo"
+        root.mkdir()
+        os.environ["CODE_SEARCH_INDEX_DIR"] = str(Path(tmp) / "index")
+
+        from app.services.code_search import CodeSearchIndex
+        from app.services.tree_index import RepoTreeIndex
+
+        print(f"\n   Creating {args.files} files x {args.lines} lines...")
+        make_repo(root, args.files, args.lines, args.seed)
+
+        index = CodeSearchIndex(root, RepoTreeIndex(root))
+        t0 = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - t0) * 1000
+        stats = index.get_stats()
+
+        reload_index = CodeSearchIndex(root, RepoTreeIndex(root))
+        t0 = time.perf_counter()
+        reload_index.refresh()
+        reload_ms = (time.perf_counter() - t0) * 1000
+
+        print(f"\n   Index build: {build_ms:.0f}ms ({stats['files']} files, {stats['trigrams']} trigrams)")
+        print(f"   Reload from disk + stat sweep: {reload_ms:.0f}ms\n")
+
+        queries = [
+            ("rare literal", "RareWidgetFactory", False),
+            ("common literal", "payload", False),
+            ("regex", r"def \w+_token_\d+", True),
+        ]
+        print(f"{'query':<18}{'grep -r p50':>14}{'index p50':>12}{'index p95':>12}{'files':>8}")
+        for name, query, regex in queries:
+            grep_cmd = ["grep", "-r", "-n", "-i", *(["-E"] if regex else ["-F"]), query, str(root / "src")]
+            grep = timed(lambda: subprocess.run(grep_cmd, capture_output=True), max(1, args.runs // 4))
+            result = timed(lambda: index.search(query, regex=regex), args.runs)
+            matched = index.search(query, regex=regex)["files_matched"]
+            print(f"{name:<18}{grep['p50_ms']:>14.1f}{result['p50_ms']:>12.1f}{result['p95_ms']:>12.1f}{matched:>8}")
+
+        target = root / "src" / "pkg00" / "module00000.py"
+
+        def after_write():
+            target.write_text(target.read_text() + f"# edit {time.perf_counter_ns()}\n")
+            index.update_file(target.relative_to(root).as_posix())
+            index.search("RareWidgetFactory")
+
+        result = timed(after_write, args.runs)
+        print(f"{'write + search':<18}{'':>14}{result['p50_ms']:>12.1f}{result['p95_ms']:>12.1f}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Repository Tree Benchmark - Index build time and /api/repos/tree query latency"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.tree_index import RepoTreeIndex
+
+
+def make_repo(root: Path, files: int, fanout: int, git: bool):
+    """Synthetic repo: fanout^2 source dirs plus an ignored node_modules of the same size"""
+    per_dir = max(1, files // (fanout * fanout))
+    for tree in ("src", "node_modules"):
+        for i in range(fanout):
+            for j in range(fanout):
+                d = root / tree / f"pkg{i:03d}" / f"mod{j:03d}"
+                d.mkdir(parents=True)
+                for k in range(per_dir):
+                    (d / f"file{k:04d}.py").write_text("x = 1\n")
+    (root / ".gitignore").write_text("node_modules/\n")
+    if git:
+        env = {**os.environ, "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com"}
+        subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+        subprocess.run(["git", "add", "src", ".gitignore"], cwd=root, check=True, env=env)
+
+
+def legacy_tree(root: Path, max_entries: int) -> int:
+    """Pre-index /api/repos/tree: full rglob + stat per entry"""
+    count = 0
+    for p in sorted(root.rglob("*")):
+        if ".git" in p.parts:
+            continue
+        _ = None if p.is_dir() else p.stat().st_size
+        count += 1
+        if count >= max_entries:
+            break
+    return count
+
+
+def timed(fn, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {"p50_ms": statistics.median(samples), "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the repository tree index")
+    parser.add_argument("--files", type=int, default=100000, help="Tracked files in the synthetic repo")
+    parser.add_argument("--fanout", type=int, default=30, help="Packages per level (fanout^2 leaf dirs)")
+    parser.add_argument("--runs", type=int, default=50, help="Samples per query")
+    parser.add_argument("--no-git", action="store_true", help="Benchmark a plain directory instead of a git repo")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VECTO PILOT™ - REPO TREE BENCHMARK")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory(prefix="repo-tree-bench-") as tmp:
+        root = Path(tmp)
+        print(f"\n   Creating {args.files} files (+ {args.files} ignored)...")
+        make_repo(root, args.files, args.fanout, git=not args.no_git)
+
+        index = RepoTreeIndex(root)
+        t0 = time.perf_counter()
+        index.build()
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        leaf = "src/pkg000/mod000"
+        queries = {
+            "legacy rglob (8000)": lambda: legacy_tree(root, 8000),
+            "root, depth=1": lambda: index.list("", depth=1),
+            "leaf dir, depth=1": lambda: index.list(leaf, depth=1),
+            "src, depth=2": lambda: index.list("src", depth=2),
+            "full, page 8000": lambda: index.list("", limit=8000),
+        }
+
+        def after_edit():
+            (root / leaf / f"new{time.perf_counter_ns()}.py").write_text("y = 2\n")
+            index.list(leaf, depth=1)
+
+        print(f"\n   Index build: {build_ms:.0f}ms ({index.get_stats()['files']} files indexed)\n")
+        print(f"{'query':<26}{'p50 ms':>12}{'p95 ms':>12}")
+        for name, fn in queries.items():
+            result = timed(fn, args.runs if "legacy" not in name else max(1, args.runs // 10))
+            print(f"{name:<26}{result['p50_ms']:>12.2f}{result['p95_ms']:>12.2f}")
+        result = timed(after_edit, args.runs)
+        print(f"{'leaf dir after new file':<26}{result['p50_ms']:>12.2f}{result['p95_ms']:>12.2f}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""MLOps Event Store Benchmark - Insert throughput and concurrent read latency"""
+
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.mlops.event_store import MLOpsEventStore
+
+
+class LegacyEventStore(MLOpsEventStore):
+    """Pre-tuning behaviour: fresh connection per operation, default journal and pragmas"""
+
+    @contextmanager
+    def _get_conn(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def maintain(self, force: bool = False):
+        pass
+
+
+def make_store(kind: str, db_path: Path) -> MLOpsEventStore:
+    if kind == "legacy":
+        return LegacyEventStore(str(db_path), write_behind=False)
+    if kind == "tuned":
+        return MLOpsEventStore(str(db_path), write_behind=False)
+    return MLOpsEventStore(str(db_path), write_behind=True)
+
+
+def log_call(store: MLOpsEventStore, i: int):
+    store.log_model_call(
+        model_provider="openai",
+        model_name="gpt-5",
+        call_type=("strategist", "planner", "validator")[i % 3],
+        prompt=f"benchmark prompt {i % 500}",
+        response=f"benchmark response {i}",
+        latency_ms=100 + i % 900,
+        tokens_in=200,
+        tokens_out=400
+    )
+
+
+def bench_inserts(store: MLOpsEventStore, count: int) -> float:
+    """Inserts/sec for sequential log_model_call"""
+    start = time.time()
+    for i in range(count):
+        log_call(store, i)
+    store.flush()
+    return count / (time.time() - start)
+
+
+def bench_concurrent_reads(store: MLOpsEventStore, duration: float, readers: int) -> dict:
+    """get_performance_metrics latency while a writer thread keeps inserting"""
+    stop = threading.Event()
+    latencies = []
+    lock = threading.Lock()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            log_call(store, i)
+            i += 1
+
+    def reader():
+        while not stop.is_set():
+            t0 = time.time()
+            store.get_performance_metrics(hours=1)
+            with lock:
+                latencies.append((time.time() - t0) * 1000)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    store.flush()
+
+    latencies.sort()
+    return {
+        "reads": len(latencies),
+        "p50_ms": statistics.median(latencies) if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MLOps SQLite event store")
+    parser.add_argument("--inserts", type=int, default=2000, help="Model calls to insert per configuration")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of concurrent read/write load")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads")
+    parser.add_argument("--configs", nargs="+", default=["legacy", "tuned", "write-behind"],
+                       choices=["legacy", "tuned", "write-behind"], help="Configurations to compare")
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VECTO PILOT™ - EVENT STORE BENCHMARK")
+    print("=" * 60)
+    print(f"\n   Inserts: {args.inserts}   Read load: {args.duration}s x {args.readers} readers\n")
+    print(f"{'config':<14}{'inserts/sec':>14}{'reads':>10}{'read p50 ms':>14}{'read p95 ms':>14}")
+
+    with tempfile.TemporaryDirectory(prefix="event-store-bench-") as tmp:
+        for kind in args.configs:
+            store = make_store(kind, Path(tmp) / f"{kind}.db")
+            rate = bench_inserts(store, args.inserts)
+            reads = bench_concurrent_reads(store, args.duration, args.readers)
+            store.close()
+            print(f"{kind:<14}{rate:>14.0f}{reads['reads']:>10}{reads['p50_ms']:>14.2f}{reads['p95_ms']:>14.2f}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,9 @@ async def main():
     parser.add_argument("--metrics", nargs="+", 
                        default=["latency", "token_efficiency", "json_validity"],
                        help="Metrics to compute")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max concurrent model calls (default: 4)")
+    parser.add_argument("--rpm", type=float, help="Provider rate limit in requests per minute")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted run from its checkpoint")
     
     args = parser.parse_args()
     
@@ -35,6 +38,7 @@ async def main():
     print(f"\n🔍 Evaluating model: {args.provider}/{args.model}")
     print(f"   Validation file: {args.val_file}")
     print(f"   Metrics: {', '.join(args.metrics)}")
+    print(f"   Concurrency: {args.concurrency}{'  (resuming)' if args.resume else ''}")
     
     # Get API key
     api_key = args.api_key
@@ -52,6 +56,9 @@ async def main():
         model_name=args.model,
         validation_file=args.val_file,
         metrics=args.metrics,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        resume=args.resume,
         api_key=api_key
     )
     
@@ -22,9 +22,17 @@ async def main():
     parser.add_argument("--format", choices=["jsonl", "openai", "anthropic"], 
                        default="jsonl", help="Output format")
     parser.add_argument("--no-compress", action="store_true", help="Don't compress output")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default="gzip",
+                       help="Compression codec (zstd needs the zstandard package)")
+    parser.add_argument("--resume", action="store_true",
+                       help="Only export calls newer than the last export of this dataset")
     parser.add_argument("--split", action="store_true", help="Create train/val split")
     parser.add_argument("--train-ratio", type=float, default=0.8, 
                        help="Train split ratio (default: 0.8)")
+    parser.add_argument("--k-folds", type=int, help="Write k hash-assigned folds instead of train/val")
+    parser.add_argument("--split-key", choices=["prompt", "id"], default="prompt",
+                       help="Field hashed to assign splits (default: prompt)")
+    parser.add_argument("--stratify", action="store_true", help="Stratify the split by call_type")
     
     args = parser.parse_args()
     
@@ -40,25 +48,37 @@ async def main():
         start_date=args.start_date,
         end_date=args.end_date,
         format=args.format,
-        compress=not args.no_compress
+        compress=not args.no_compress,
+        compression=args.compression,
+        resume=args.resume
     )
     
     print(f"\n✅ Dataset exported successfully!")
     print(f"   Records: {metadata['record_count']}")
     print(f"   File: {metadata['file_path']}")
     print(f"   Format: {metadata['format']}")
+    print(f"   Throughput: {metadata['records_per_sec']} records/sec (seq {metadata['after_seq']}→{metadata['last_seq']})")
     
     # Create train/val split if requested
     if args.split:
         print(f"\n🔀 Creating train/validation split (ratio: {args.train_ratio})...")
         split_info = training_pipeline.create_train_val_split(
-            dataset_path=metadata['file_path'].replace('.gz', ''),
-            train_ratio=args.train_ratio
+            dataset_path=metadata['file_path'],
+            train_ratio=args.train_ratio,
+            key=args.split_key,
+            k_folds=args.k_folds,
+            stratify_by="call_type" if args.stratify else None
         )
         
         print(f"\n✅ Split created:")
-        print(f"   Train: {split_info['train']} ({split_info['train_count']} records)")
-        print(f"   Val: {split_info['val']} ({split_info['val_count']} records)")
+        if args.k_folds:
+            for path, count in zip(split_info['folds'], split_info['fold_counts']):
+                print(f"   Fold: {path} ({count} records)")
+        else:
+            print(f"   Train: {split_info['train']} ({split_info['train_count']} records)")
+            print(f"   Val: {split_info['val']} ({split_info['val_count']} records)")
+        for stratum, counts in split_info.get('by_stratum', {}).items():
+            print(f"   {stratum}: {counts}")
     
     # List all datasets
     print(f"\n📚 Available datasets:")
@@ -2,6 +2,12 @@
 import fs from 'node:fs/promises';
 import path from 'node:path';
 
+// The Python memory store (app/services/memory_store.py) keeps versions in
+// data/memory/memory.log and stays compatible with this file layout: it
+// refreshes {name}.latest.json on every write and imports the versioned
+// {name}.{ts}.json files written here. Deleting files here is not mirrored
+// into its log.
+
 function memoryRoot(root: string): string {
   return path.join(root, 'data', 'memory');
 }